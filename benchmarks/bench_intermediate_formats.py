@@ -0,0 +1,84 @@
+"""
+中间文件格式的基准测试：比较 FIRM SpreadsheetML 数据表 (.xml) 与二进制列式中间文件 (.npz, station_npz.py)
+的写出耗时、文件大小、读取耗时以及整体转换 (读取中间文件到生成 JSON 数据) 耗时。
+
+用法:
+    python benchmarks/bench_intermediate_formats.py [--lines 100] [--stations-per-line 300] [--repeat 3]
+
+合成网络与 bench_pipeline.py 相同。读取耗时为用 Highway_map_JSON_producer_4c.iter_input_rows 读出全部数据表行的耗时，
+整体转换耗时为 build_highway_graph_data 的耗时；各项取 --repeat 次中的最短耗时。
+同时检查两种格式读出的数据表行完全相同。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+
+from bench_pipeline import generate_network # noqa: E402
+import Highway_map_JSON_producer_4c as producer # noqa: E402
+import firm_workbook # noqa: E402
+import station_npz # noqa: E402
+
+# 参与比较的中间文件格式：(名称, 文件扩展名, 写出函数)
+INTERMEDIATE_FORMATS = (
+    ('xml', '.xml', firm_workbook.write_firm_workbook),
+    ('npz', station_npz.STATION_NPZ_EXTENSION, station_npz.write_station_npz),
+)
+
+
+def best_time(function, repeat):
+    """运行 repeat 次，返回 (最短耗时, 最后一次的返回值)。"""
+    best_seconds = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best_seconds = min(best_seconds, time.perf_counter() - start)
+    return best_seconds, result
+
+
+def comparable_rows(input_path):
+    """读出全部数据表行，站点记录转换为字典以便比较。"""
+    return [(row[0], row[1].to_dict()) if row[0] == 'station' else row for row in producer.iter_input_rows(input_path)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="中间文件格式 (XML / NPZ) 的基准测试 (合成网络)")
+    parser.add_argument("--lines", type=int, default=100, help="线路数量")
+    parser.add_argument("--stations-per-line", type=int, default=300, help="每条线路的站点数量")
+    parser.add_argument("--seed", type=int, default=42, help="随机数种子")
+    parser.add_argument("--repeat", type=int, default=3, help="计时重复次数 (取最短耗时)")
+    args = parser.parse_args()
+
+    points = generate_network(args.lines, args.stations_per_line, seed=args.seed)
+    with open(os.path.join(REPO_ROOT, 'data', 'highway_firm_model.json'), 'r', encoding='utf-8') as f:
+        template_content = f.read()
+    print(f"合成网络: {args.lines} 条线路 x {args.stations_per_line} 个站点 = {len(points)} 个站点")
+
+    with tempfile.TemporaryDirectory(prefix="bench_intermediate_") as work_directory:
+        producer.configure_logging(os.path.join(work_directory, "logs"), "WARNING")
+        try:
+            results = []
+            input_rows = []
+            for format_name, extension, write_function in INTERMEDIATE_FORMATS:
+                input_path = os.path.join(work_directory, f"synthetic_network{extension}")
+                write_seconds, _ = best_time(lambda: write_function(points, input_path), args.repeat)
+                read_seconds, row_count = best_time(lambda: sum(1 for _ in producer.iter_input_rows(input_path)), args.repeat)
+                convert_seconds, _ = best_time(lambda: producer.build_highway_graph_data(input_path, template_content), args.repeat)
+                results.append((format_name, write_seconds, os.path.getsize(input_path), read_seconds, convert_seconds, row_count))
+                input_rows.append(comparable_rows(input_path))
+        finally:
+            producer.shutdown_logging()
+
+    print(f"\n  {'格式':<6} {'写出 (s)':>10} {'文件 (MB)':>10} {'读取 (s)':>10} {'整体转换 (s)':>13} {'数据行':>8}")
+    for format_name, write_seconds, file_bytes, read_seconds, convert_seconds, row_count in results:
+        print(f"  {format_name:<6} {write_seconds:10.3f} {file_bytes / 1e6:10.2f} {read_seconds:10.3f} {convert_seconds:13.3f} {row_count:8d}")
+    print(f"\n  读出的数据表行{'完全相同' if all(rows == input_rows[0] for rows in input_rows) else '不一致!'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+JSON 后端的基准测试：在合成的 RMP 图 (默认 200000 个节点) 上对比各个已安装后端的解析和编码耗时。
+
+用法:
+    python benchmarks/bench_json_backends.py [节点数量]
+
+节点和边由 Highway_map_JSON_producer_4c.py 的预编译工厂按 V/S/T 3:5:1 生成，边数与节点数相同。
+对每个后端分别测量：解析整个文档、整体编码为缩进格式和紧凑格式，以及通过 rmp_json_writer 流式写出文件；
+并先校验各后端的输出解析后与标准库的结果完全相同，并报告输出是否与标准库逐字节相同。
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+
+import Highway_map_JSON_producer_4c as producer # noqa: E402
+import json_backend # noqa: E402
+import rmp_json_writer # noqa: E402
+
+
+def make_graph(count, seed=42):
+    """
+    生成包含 count 个节点和 count 条边的 RMP JSON 数据 (以 data/highway_firm_model.json 为模板)。
+    """
+    rnd = random.Random(seed)
+    with open(os.path.join(REPO_ROOT, 'data', 'highway_firm_model.json'), 'r', encoding='utf-8') as f:
+        json_data = json.load(f)
+    node_templates, edge_template = producer.extract_graph_templates(json_data)
+    node_factories = producer.compile_node_factories(node_templates)
+    make_edge = producer.compile_edge_factory(edge_template)
+
+    nodes = []
+    for i in range(count):
+        type_code = rnd.choices(['V', 'S', 'T'], [3, 5, 1])[0]
+        transfer_lines = [f"L{rnd.randint(1, 40)}"] if type_code == 'T' else []
+        node = node_factories[type_code](f"stn_{i:09d}", f"ID{i}", round(rnd.uniform(0, 1000), 3), round(rnd.uniform(0, 1000), 3),
+                                         f"站{i}", f"Station {i}", transfer_lines)
+        node["attributes"].update({"color": "#E3002B", "direction": "SN", "seq": f"L{i % 40}_{i:02d}", "Firm_Highway_Number": f"G{i % 40}"})
+        nodes.append(node)
+    edges = [make_edge(f"line_ID{i}_ID{i + 1}", f"stn_{i:09d}", f"stn_{i + 1:09d}", "#E3002B") for i in range(count)]
+    json_data['graph']['nodes'] = nodes
+    json_data['graph']['edges'] = edges
+    return json_data
+
+
+def measure(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed:8.3f} s")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    json_data = make_graph(count)
+    stdlib_backend = json_backend.get_json_backend('json')
+    reference_indented = stdlib_backend.dumps_indented(json_data)
+    reference_compact = stdlib_backend.dumps_compact(json_data)
+    print(f"{count} 个节点，{count} 条边；缩进格式 {len(reference_indented.encode('utf-8')) / 1e6:.1f} MB，"
+          f"紧凑格式 {len(reference_compact.encode('utf-8')) / 1e6:.1f} MB\n")
+
+    output_path = os.path.join(tempfile.gettempdir(), "bench_json_backends.json")
+    for backend_name in json_backend.JSON_BACKEND_NAMES:
+        try:
+            backend = json_backend.get_json_backend(backend_name)
+        except RuntimeError:
+            print(f"{backend_name}: 未安装，跳过\n")
+            continue
+        print(f"{backend_name}:")
+        measure("解析 (缩进格式文档)", lambda: backend.loads(reference_indented))
+        indented = measure("整体编码 (缩进格式)", lambda: backend.dumps_indented(json_data))
+        compact = measure("整体编码 (紧凑格式)", lambda: backend.dumps_compact(json_data))
+        measure("流式写出文件 (缩进格式)", lambda: rmp_json_writer.write_rmp_json(json_data, output_path, 'indent', json_backend=backend))
+        measure("流式写出文件 (紧凑格式)", lambda: rmp_json_writer.write_rmp_json(json_data, output_path, 'compact', json_backend=backend))
+
+        if json.loads(indented) != json_data or json.loads(compact) != json_data:
+            raise SystemExit(f"错误: {backend_name} 的输出解析后与原数据不一致。")
+        print(f"  输出与标准库逐字节相同: 缩进格式 {indented == reference_indented}，紧凑格式 {compact == reference_compact}\n")
+    os.remove(output_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+XML 到 RMP JSON 转换流程的基准测试：生成合成的高速公路网络，测量 process_highway_data 整体及各阶段的耗时和内存峰值。
+
+用法:
+    python benchmarks/bench_pipeline.py [--lines 100] [--stations-per-line 300] [--type-shares 3,5,1]
+                                        [--shared-coord-rate 0.05] [--repeat 3] [--output results.json]
+                                        [--compare baseline.json]
+
+合成网络按线路生成：每条线路的站点沿随机游走的经纬度排列，站点类型按 --type-shares 给出的 V:S:T 比例随机选择；
+每个站点以 --shared-coord-rate 的概率复用之前某个站点的坐标 (模拟换乘站、共线路段)，使节点去重和类型覆盖的逻辑得到执行。
+网络由 firm_workbook.write_firm_workbook 写出为与 QGIS 导出相同的 FIRM SpreadsheetML 数据表。
+
+测量内容：
+- 整体：process_highway_data (读取XML到生成缩进格式的JSON字符串)，取 --repeat 次中的最短耗时；
+- 各阶段：通过 process_highway_data 的阶段分析钩子 (stage_profiler) 记录解析 (parse)、排序 (sort)、坐标投影 (project)、
+  节点去重 (dedupe)、边生成 (edge_build) 和写出JSON文件 (serialize)；
+- 内存：在单独的一次运行中用 tracemalloc 记录整体及各阶段的内存峰值 (tracemalloc 会显著拖慢运行，因此不与计时混在一起)。
+结果保存为 JSON 文件；使用 --compare 时与之前保存的结果逐项对比，便于发现不同版本之间的性能回退。
+"""
+import argparse
+from datetime import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+
+import numpy as np # noqa: E402
+
+import Highway_map_JSON_producer_4c as producer # noqa: E402
+import firm_workbook # noqa: E402
+import rmp_json_writer # noqa: E402
+from stage_profiler import StageProfiler # noqa: E402
+
+# 报告中各阶段的顺序
+STAGE_NAMES = ('parse', 'sort', 'project', 'dedupe', 'edge_build', 'serialize')
+
+
+def generate_network(line_count, stations_per_line, type_shares=(3, 5, 1), shared_coord_rate=0.05, seed=42):
+    """
+    生成合成的高速公路网络。
+
+    参数:
+        line_count (int): 线路数量。
+        stations_per_line (int): 每条线路的站点数量。
+        type_shares (tuple): V、S、T 三种站点类型的相对比例。
+        shared_coord_rate (float): 每个站点复用之前某个站点坐标的概率。
+        seed (int): 随机数种子，相同参数生成完全相同的网络。
+
+    返回:
+        list: 点数据 (dict，键为 FIRM 数据表的列名)，已按 export_sort_key 排序。
+    """
+    rnd = random.Random(seed)
+    line_names = [f"G{line_index}" for line_index in range(1, line_count + 1)]
+    previous_coords = [] # 之前生成的所有站点坐标，供复用
+    points = []
+    for line_index, line_name in enumerate(line_names, start=1):
+        line_color = f"#{rnd.randrange(0x1000000):06X}"
+        lon, lat = rnd.uniform(100.0, 120.0), rnd.uniform(22.0, 40.0)
+        for station_index in range(1, stations_per_line + 1):
+            lon += rnd.uniform(-0.03, 0.03)
+            lat += rnd.uniform(-0.03, 0.03)
+            coords = (f"{lon:.6f}", f"{lat:.6f}")
+            if previous_coords and rnd.random() < shared_coord_rate:
+                coords = rnd.choice(previous_coords)
+            else:
+                previous_coords.append(coords)
+
+            station_type = rnd.choices(('V', 'S', 'T'), type_shares)[0]
+            point_data = {
+                "name": line_name, "color": line_color, "direction": "SN",
+                "seq": f"L{line_index}_{station_index:02d}", "type": station_type,
+                "name_zh": f"{line_name}站{station_index}" if station_type != 'V' else "",
+                "name_en": f"{line_name} Station {station_index}" if station_type != 'V' else "",
+                "x": coords[0], "y": coords[1], "id": f"{line_name}_{station_index}",
+                "Firm_Highway_Number": line_name
+            }
+            if station_type == 'T':
+                point_data["transfer_line_1"] = rnd.choice(line_names)
+            points.append(point_data)
+    points.sort(key=firm_workbook.export_sort_key)
+    return points
+
+
+def run_stages(xml_path, template_content, json_output_path, trace_memory):
+    """
+    通过 process_highway_data 使用的阶段分析钩子运行一次 build_highway_graph_data 并写出JSON文件。
+
+    返回:
+        tuple: ({阶段名称: 阶段报告}, {'nodes': 节点数量, 'edges': 边数量})
+    """
+    profiler = StageProfiler(trace_memory=trace_memory)
+    json_data, _ = producer.build_highway_graph_data(xml_path, template_content, profiler=profiler)
+    with profiler.stage('serialize'):
+        rmp_json_writer.write_rmp_json(json_data, json_output_path)
+    stage_reports = {stage_report['name']: stage_report for stage_report in profiler.report()['stages']}
+    counts = {"nodes": len(json_data['graph']['nodes']), "edges": len(json_data['graph']['edges'])}
+    return stage_reports, counts
+
+
+def run_benchmark(args, work_directory):
+    type_shares = tuple(float(share) for share in args.type_shares.split(','))
+    points = generate_network(args.lines, args.stations_per_line, type_shares, args.shared_coord_rate, args.seed)
+    xml_path = os.path.join(work_directory, "synthetic_network.xml")
+    json_output_path = os.path.join(work_directory, "synthetic_network.json")
+    firm_workbook.write_firm_workbook(points, xml_path)
+    with open(os.path.join(REPO_ROOT, 'data', 'highway_firm_model.json'), 'r', encoding='utf-8') as f:
+        template_content = f.read()
+    print(f"合成网络: {args.lines} 条线路 x {args.stations_per_line} 个站点 = {len(points)} 个站点，"
+          f"XML {os.path.getsize(xml_path) / 1e6:.1f} MB")
+
+    # 整体耗时
+    end_to_end_runs = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        output_json_string = producer.process_highway_data(xml_path, template_content)
+        end_to_end_runs.append(time.perf_counter() - start)
+    output_json_bytes = len(output_json_string.encode('utf-8'))
+    del output_json_string
+
+    # 各阶段耗时：每个阶段取 --repeat 次中的最短耗时
+    stage_runs = [run_stages(xml_path, template_content, json_output_path, trace_memory=False) for _ in range(args.repeat)]
+    counts = stage_runs[0][1]
+
+    # 内存峰值：单独运行一次整体流程和一次分阶段流程
+    tracemalloc.start()
+    producer.process_highway_data(xml_path, template_content)
+    _, end_to_end_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    memory_stage_reports, _ = run_stages(xml_path, template_content, json_output_path, trace_memory=True)
+
+    stages = {}
+    for stage_name in STAGE_NAMES:
+        stages[stage_name] = {
+            "seconds": min(stage_reports[stage_name]["seconds"] for stage_reports, _ in stage_runs),
+            "peak_memory_mb": memory_stage_reports[stage_name]["peak_memory_mb"],
+            "counts": stage_runs[0][0][stage_name]["counts"]
+        }
+
+    return {
+        "benchmark": "pipeline",
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "git_commit": get_git_commit(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "json_backend": producer.get_json_backend().name
+        },
+        "network": {
+            "lines": args.lines,
+            "stations_per_line": args.stations_per_line,
+            "type_shares": list(type_shares),
+            "shared_coord_rate": args.shared_coord_rate,
+            "seed": args.seed,
+            "stations": len(points),
+            "xml_bytes": os.path.getsize(xml_path)
+        },
+        "repeat": args.repeat,
+        "end_to_end": {
+            "seconds": min(end_to_end_runs),
+            "runs": end_to_end_runs,
+            "peak_memory_mb": round(end_to_end_peak / 1e6, 3)
+        },
+        "stages": stages,
+        "output": dict(counts, json_bytes=output_json_bytes)
+    }
+
+
+def get_git_commit():
+    """当前仓库的提交哈希；不在 git 仓库中或未安装 git 时返回 None。"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    """打印结果；提供 baseline 时同时打印基准结果及比值 (当前 / 基准，大于 1 表示变慢或占用更多内存)。"""
+    rows = [("end_to_end", results["end_to_end"])] + list(results["stages"].items())
+    baseline_rows = dict([("end_to_end", baseline["end_to_end"])] + list(baseline["stages"].items())) if baseline else {}
+    print(f"\n  {'阶段':<12} {'耗时 (s)':>10} {'内存峰值 (MB)':>14}" + (f" {'基准耗时':>10} {'耗时比':>7} {'内存比':>7}" if baseline else ""))
+    for stage_name, stage in rows:
+        line = f"  {stage_name:<12} {stage['seconds']:10.3f} {stage['peak_memory_mb']:14.1f}"
+        baseline_stage = baseline_rows.get(stage_name)
+        if baseline_stage:
+            time_ratio = stage['seconds'] / baseline_stage['seconds'] if baseline_stage['seconds'] else float('nan')
+            memory_ratio = stage['peak_memory_mb'] / baseline_stage['peak_memory_mb'] if baseline_stage['peak_memory_mb'] else float('nan')
+            line += f" {baseline_stage['seconds']:10.3f} {time_ratio:7.2f} {memory_ratio:7.2f}"
+        print(line)
+    print(f"\n  输出: {results['output']['nodes']} 个节点，{results['output']['edges']} 条边，"
+          f"JSON {results['output']['json_bytes'] / 1e6:.1f} MB")
+    if baseline and baseline.get("network") != results["network"]:
+        print("  注意: 基准结果的合成网络参数与本次不同，比值仅供参考。")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="XML 到 RMP JSON 转换流程的基准测试 (合成网络)")
+    parser.add_argument("--lines", type=int, default=100, help="线路数量")
+    parser.add_argument("--stations-per-line", type=int, default=300, help="每条线路的站点数量")
+    parser.add_argument("--type-shares", default="3,5,1", help="V,S,T 三种站点类型的相对比例")
+    parser.add_argument("--shared-coord-rate", type=float, default=0.05, help="站点复用已有坐标的概率")
+    parser.add_argument("--seed", type=int, default=42, help="随机数种子")
+    parser.add_argument("--repeat", type=int, default=3, help="计时重复次数 (取最短耗时)")
+    parser.add_argument("--log-level", default="WARNING", choices=list(producer.LOG_LEVELS), help="转换过程的最低日志级别")
+    parser.add_argument("--output", help="结果JSON文件路径")
+    parser.add_argument("--compare", help="之前保存的结果JSON文件，与本次结果对比")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as work_directory:
+        producer.configure_logging(os.path.join(work_directory, "logs"), args.log_level)
+        try:
+            results = run_benchmark(args, work_directory)
+        finally:
+            producer.shutdown_logging()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+        print(f"\n结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+序列号排序的微基准测试：对比原实现 (每次调用都重新尝试 int() 和解析正则) 与 seq_keys 模块的实现。
+
+用法:
+    python benchmarks/bench_seq_keys.py [序列号数量] [线路数量]
+
+输出每种实现排序所用的时间，并先校验两种实现的排序结果完全一致。
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import seq_keys # noqa: E402
+
+
+def legacy_try_int(s):
+    """
+    原实现 (优化前 qgis_xml_producer_V2a.py 中的 _try_int)，仅作为对照。
+    """
+    try:
+        return (int(s),)
+    except ValueError:
+        match = re.match(r'([A-Za-z]+)(\d+)_(\d+)', s)
+        if match:
+            prefix, line_num, station_num = match.groups()
+            return (prefix, int(line_num), int(station_num))
+        match = re.match(r'(\d+)_(\d+)', s)
+        if match:
+            line_num, station_num = match.groups()
+            return (int(line_num), int(station_num))
+        return (s,)
+
+
+def legacy_parse_seq_key(seq_str):
+    """
+    原实现 (优化前 Highway_map_JSON_producer_4c.py 中的 parse_seq_key，去掉日志输出)，仅作为对照。
+    """
+    match = re.match(r'([A-Za-z]+)(\d+)_(\d+)', seq_str)
+    if match:
+        return (match.group(1), int(match.group(2)), int(match.group(3)))
+    return (seq_str, 0, 0)
+
+
+def new_parse_seq_key(seq_str):
+    """与 Highway_map_JSON_producer_4c.py 中 parse_seq_key 相同的组合方式 (去掉日志输出)。"""
+    key = seq_keys.line_station_seq_key(seq_str)
+    return key if key is not None else (seq_str, 0, 0)
+
+
+def make_seqs(count, line_count, seed=42):
+    """
+    生成 count 个序列号：绝大部分为 "L<线路>_<站号>"，少量为无法解析的字符串。
+    纯数字与带前缀的序列号生成的元组之间无法比较 (原实现同样会抛出 TypeError)，因此不混入同一次排序。
+    同一序列号在真实数据中会在多个图层中重复出现，这里的站号范围也保证有大量重复。
+    """
+    rnd = random.Random(seed)
+    seqs = []
+    for _ in range(count):
+        r = rnd.random()
+        line_num = rnd.randint(1, line_count)
+        station_num = rnd.randint(1, 60)
+        if r < 0.98:
+            seqs.append(f"L{line_num}_{station_num:02d}")
+        else:
+            seqs.append(rnd.choice(["", "abc", "L_1", "X12"]))
+    return seqs
+
+
+def measure(label, func, count):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:8.3f} s   {count / elapsed:12,.0f} seqs/s")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    line_count = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    seqs = make_seqs(count, line_count)
+
+    if sorted(seqs, key=legacy_try_int) != sorted(seqs, key=seq_keys.qgis_seq_sort_key):
+        raise SystemExit("错误: qgis_seq_sort_key 的排序结果与原 _try_int 不一致。")
+    prefixed_seqs = [s for s in seqs if seq_keys.line_station_seq_key(s) is not None]
+    if sorted(prefixed_seqs, key=legacy_parse_seq_key) != sorted(prefixed_seqs, key=new_parse_seq_key):
+        raise SystemExit("错误: line_station_seq_key 的排序结果与原 parse_seq_key 不一致。")
+    print(f"已校验 {count} 个序列号的排序结果与原实现一致 ({line_count} 条线路)。\n")
+
+    measure("原 _try_int", lambda: sorted(seqs, key=legacy_try_int), count)
+    seq_keys.qgis_seq_sort_key.cache_clear()
+    measure("qgis_seq_sort_key (冷缓存)", lambda: sorted(seqs, key=seq_keys.qgis_seq_sort_key), count)
+    measure("qgis_seq_sort_key (热缓存)", lambda: sorted(seqs, key=seq_keys.qgis_seq_sort_key), count)
+
+    measure("原 parse_seq_key", lambda: sorted(prefixed_seqs, key=legacy_parse_seq_key), len(prefixed_seqs))
+    seq_keys.line_station_seq_key.cache_clear()
+    measure("line_station_seq_key (冷缓存)", lambda: sorted(prefixed_seqs, key=new_parse_seq_key), len(prefixed_seqs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+稳定ID生成的微基准测试：对比原实现 (完整 Base62 编码后截取) 与 stable_id 模块的实现。
+
+用法:
+    python benchmarks/bench_stable_id.py [坐标数量] [重复坐标比例]
+
+输出每种实现每秒生成的ID数量，并先校验两种实现的结果逐字节一致。
+"""
+import hashlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import stable_id # noqa: E402
+
+
+def legacy_generate_stable_id_from_coords(x, y, target_length=9):
+    """
+    原实现 (优化前 qgis_xml_producer_V2a.py / Highway_map_JSON_producer_4c.py 中的版本)，仅作为对照。
+    """
+    coord_string = f"{x:.6f},{y:.6f}"
+    sha256_hash = hashlib.sha256(coord_string.encode('utf-8')).hexdigest()
+    hash_as_int = int(sha256_hash, 16)
+    return stable_id.base_encode(hash_as_int, stable_id.BASE62_CHARS)[:target_length]
+
+
+def make_coords(count, repeat_ratio, seed=42):
+    """
+    生成 count 个 SVG 范围内的坐标，其中约 repeat_ratio 比例为之前出现过的坐标 (模拟共用坐标的换乘站)。
+    """
+    rnd = random.Random(seed)
+    xs, ys = [], []
+    for _ in range(count):
+        if xs and rnd.random() < repeat_ratio:
+            i = rnd.randrange(len(xs))
+            xs.append(xs[i])
+            ys.append(ys[i])
+        else:
+            xs.append(round(rnd.uniform(0, 1000), 3))
+            ys.append(round(rnd.uniform(0, 1000), 3))
+    return xs, ys
+
+
+def measure(label, func, count):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:8.3f} s   {count / elapsed:12,.0f} IDs/s")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    repeat_ratio = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    xs, ys = make_coords(count, repeat_ratio)
+
+    legacy_ids = [legacy_generate_stable_id_from_coords(x, y) for x, y in zip(xs, ys)]
+    if legacy_ids != stable_id.generate_stable_ids_from_coords(xs, ys):
+        raise SystemExit("错误: 新实现生成的ID与原实现不一致。")
+    print(f"已校验 {count} 个坐标的ID与原实现一致 (重复坐标比例 {repeat_ratio})。\n")
+
+    measure("原实现 (逐个完整编码)",
+            lambda: [legacy_generate_stable_id_from_coords(x, y) for x, y in zip(xs, ys)], count)
+
+    stable_id._cached_stable_id_for_coord_string.cache_clear()
+    measure("generate_stable_id_from_coords (冷缓存)",
+            lambda: [stable_id.generate_stable_id_from_coords(x, y) for x, y in zip(xs, ys)], count)
+    measure("generate_stable_id_from_coords (热缓存)",
+            lambda: [stable_id.generate_stable_id_from_coords(x, y) for x, y in zip(xs, ys)], count)
+    measure("generate_stable_ids_from_coords (批量)",
+            lambda: stable_id.generate_stable_ids_from_coords(xs, ys), count)
+
+
+if __name__ == "__main__":
+    main()
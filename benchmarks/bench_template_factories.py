@@ -0,0 +1,114 @@
+"""
+节点/边创建的基准测试：对比逐个 copy.deepcopy 模板再修改字典 (原实现) 与预编译的节点/边工厂。
+
+用法:
+    python benchmarks/bench_template_factories.py [站点数量]
+
+默认模拟 150000 个站点 (V/S/T 按 3:5:1 混合) 及同样数量的边，并先校验两种方式生成的结构完全一致。
+"""
+import copy
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+
+import Highway_map_JSON_producer_4c as producer # noqa: E402
+
+
+def legacy_make_node(node_templates, type_code, node_key, original_xml_id, svg_x, svg_y, name_zh, name_en, transfer_lines):
+    """
+    原实现中按类型深拷贝模板并逐项修改的过程，仅作为对照。
+    """
+    node = copy.deepcopy(node_templates[type_code])
+    node['key'] = node_key
+    if type_code == 'V':
+        node['attributes']['id'] = original_xml_id
+        node['attributes']['virtual'] = {}
+        node['attributes']['type'] = 'virtual'
+    elif type_code == 'S':
+        node['attributes']['shmetro-basic']['names'] = [name_zh, name_en]
+        node['attributes']['type'] = 'shmetro-basic'
+    else:
+        node['attributes']['shmetro-osysi']['names'] = [name_zh, name_en]
+        if 'line_transfer_info' in node['attributes']: del node['attributes']['line_transfer_info']
+        node['attributes']['type'] = 'shmetro-osysi'
+        for transfer_line in transfer_lines:
+            if "transferLines" not in node["attributes"]["shmetro-osysi"]:
+                node["attributes"]["shmetro-osysi"]["transferLines"] = []
+            node["attributes"]["shmetro-osysi"]["transferLines"].append(transfer_line)
+    if 'reconcileId' in node['attributes']: del node['attributes']['reconcileId']
+    node['attributes']['x'] = svg_x
+    node['attributes']['y'] = svg_y
+    return node
+
+
+def legacy_make_edge(edge_template, edge_key, source, target, line_color):
+    """
+    原实现中深拷贝边模板并逐项修改的过程，仅作为对照。
+    """
+    edge = copy.deepcopy(edge_template)
+    edge['key'] = edge_key
+    edge['source'] = source
+    edge['target'] = target
+    if 'single-color' not in edge['attributes']: edge['attributes']['single-color'] = {}
+    if 'color' not in edge['attributes']['single-color'] or not isinstance(edge['attributes']['single-color']['color'], list) or len(edge['attributes']['single-color']['color']) < 4:
+        edge['attributes']['single-color']['color'] = ["other", "other", "#000000", "#FFFFFF"]
+    edge['attributes']['single-color']['color'][2] = line_color
+    if 'line_name' in edge['attributes']: del edge['attributes']['line_name']
+    if 'color' in edge['attributes']: del edge['attributes']['color']
+    edge['attributes']['reconcileId'] = edge_key
+    return edge
+
+
+def make_station_args(count, seed=42):
+    rnd = random.Random(seed)
+    stations = []
+    for i in range(count):
+        type_code = rnd.choices(['V', 'S', 'T'], [3, 5, 1])[0]
+        transfer_lines = [f"L{rnd.randint(1, 40)}"] if type_code == 'T' else []
+        stations.append((type_code, f"stn_{i:09d}", f"ID{i}", round(rnd.uniform(0, 1000), 3),
+                         round(rnd.uniform(0, 1000), 3), f"站{i}", f"Station {i}", transfer_lines))
+    return stations
+
+
+def measure(label, func, count):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed:8.3f} s   {count / elapsed:12,.0f} 个/s")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 150000
+    producer.configure_logging(os.path.join(tempfile.gettempdir(), "json_producer_bench_logs"), min_level="ERROR")
+
+    with open(os.path.join(REPO_ROOT, 'data', 'highway_firm_model.json'), 'r', encoding='utf-8') as f:
+        json_data = json.load(f)
+    node_templates, edge_template = producer.extract_graph_templates(json_data)
+    stations = make_station_args(count)
+
+    legacy_nodes = measure("节点: copy.deepcopy", lambda: [
+        legacy_make_node(node_templates, *station) for station in stations], count)
+    node_factories = producer.compile_node_factories(node_templates)
+    factory_nodes = measure("节点: 预编译工厂", lambda: [
+        node_factories[station[0]](*station[1:]) for station in stations], count)
+
+    legacy_edges = measure("边: copy.deepcopy", lambda: [
+        legacy_make_edge(edge_template, f"line_{i}", f"stn_{i}", f"stn_{i + 1}", "#E3002B") for i in range(count)], count)
+    make_edge = producer.compile_edge_factory(edge_template)
+    factory_edges = measure("边: 预编译工厂", lambda: [
+        make_edge(f"line_{i}", f"stn_{i}", f"stn_{i + 1}", "#E3002B") for i in range(count)], count)
+
+    if json.dumps(legacy_nodes) != json.dumps(factory_nodes) or json.dumps(legacy_edges) != json.dumps(factory_edges):
+        raise SystemExit("错误: 工厂生成的节点/边与原实现不一致。")
+    print(f"\n已校验 {count} 个节点和 {count} 条边与原实现完全一致。")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,32 @@
 import xml.etree.ElementTree as ET # 导入XML解析库，用于处理XML文件
 import json # 导入JSON库，用于处理JSON数据
 import os # 导入操作系统库，用于文件路径操作、目录创建等
-import tkinter as tk # 导入Tkinter库，用于创建图形用户界面（GUI），例如文件选择对话框
-from tkinter import filedialog, messagebox # 从Tkinter导入文件对话框和消息框模块
-import re # 导入正则表达式库，用于字符串匹配和处理
-import copy # 导入copy库，用于深拷贝对象（如JSON模板），避免修改原始模板
+import argparse # 用于解析无界面批处理模式的命令行参数
+import glob # 用于展开命令行中的XML文件通配符
+from concurrent.futures import ProcessPoolExecutor # 用于批处理模式下多进程并行转换
+import copy # 导入copy库，用于在预编译节点/边工厂时深拷贝一次JSON模板，避免修改原始模板
 import random # 导入random库，用于生成随机ID
 import datetime # 导入datetime库，用于获取当前时间，用于日志记录
-import hashlib # 用于SHA256哈希，生成稳定ID
+import hashlib # 用于计算输入文件的SHA256，判断增量构建时输入是否变化
+import logging # 导入日志库，用于缓冲写入日志文件
+import logging.handlers # 导入日志处理器，用于内存缓冲 (MemoryHandler)
+import atexit # 用于在程序退出时写出缓冲的日志
+import sys
+import collections # 用于定义坐标变换参数的具名元组
+import numpy as np # 用于批量 (向量化) 计算站点坐标
+
+from stable_id import generate_stable_id_from_coords # 与 qgis_xml_producer_V2a.py 共用的稳定ID生成
+from seq_keys import line_station_seq_key # 与 qgis_xml_producer_V2a.py 共用的序列号排序键
+from station_record import StationRecord # 与 qgis_xml_producer_V2a.py 共用的紧凑站点记录
+from station_table import StationTable # 列式站点表：按线路分组、排序和生成边
+from rmp_json_writer import (JSON_OUTPUT_FORMATS, DEFAULT_JSON_OUTPUT_FORMAT, JSON_COMPRESSION_SUFFIXES, DEFAULT_JSON_COMPRESSION,
+                             rmp_json_output_path, write_rmp_json, read_rmp_json_text) # 流式写出 (可压缩的) RMP JSON
+from json_backend import JSON_BACKEND_NAMES, DEFAULT_JSON_BACKEND, get_json_backend # orjson / ujson / 标准库 json
+from node_grid_index import SvgNodeGridIndex # 按吸附容差合并相邻节点的空间网格索引
+from stage_profiler import NULL_PROFILER, StageProfiler, profile_report_path # 按阶段记录耗时、内存峰值和数据量
+from firm_workbook import iter_point_rows, parse_line_title # FIRM 数据表的行结构 (不经过XML直接转换时使用)
+from station_npz import STATION_NPZ_EXTENSION, is_station_npz_path, iter_station_npz_rows # 二进制列式中间格式 (.npz)
+from lod_simplify import lod_index_path, parse_lod_tolerances, remove_lod_files, write_lod_files # 多级细节 (LOD) 输出
 
 # --- 配置常量 ---
 # 设置一个SVG输出维度的上限。这是为了控制生成地图的最大尺寸，
@@ -30,6 +49,10 @@ MAX_VIEWBOX_MIN_COORD = 300.0
 # NOMINAL_VIEWBOX_SIZE 可以理解为我们希望在理想情况下（例如缩放为1时）视图框的尺寸。
 NOMINAL_VIEWBOX_SIZE_FOR_ZOOM_CALC = 1000.0 # 用于计算zoom的基准视图框大小
 
+# 节点吸附容差 (SVG 坐标单位)。SVG 坐标距离不超过该值的站点会合并为同一节点；
+# 为 0 时仅合并SVG坐标完全相同的站点。
+DEFAULT_SNAP_TOLERANCE = 0.0
+
 # 【新增常量】节点类型优先级映射 (同时包含简化和完整类型名)
 NODE_TYPE_PRIORITY = {
     't': 3,
@@ -57,41 +80,9 @@ FULL_NODE_TYPE_NAMES = {
     'v': 'virtual'
 }
 
-# --- 辅助函数：生成稳定ID (从 qgis_xml_producer_V2a.py 复制过来) ---
-# Base62编码的字符集：0-9, A-Z, a-z
-BASE62_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
-
-def base_encode(number, base_chars):
-    """
-    将一个整数编码为指定字符集的字符串。
-    用于将大整数（如哈希值）转换为更短的字符串形式。
-    """
-    if number == 0:
-        return base_chars[0]
-    base = len(base_chars)
-    encoded_string = []
-    while number > 0:
-        encoded_string.append(base_chars[number % base])
-        number //= base
-    return "".join(reversed(encoded_string))
-
-
-def generate_stable_id_from_coords(x, y, target_length=9):
-    """
-    根据给定的 (x, y) 坐标生成一个稳定、确定性且长度为 target_length 的短 ID。
-    """
-    # 确保坐标精度一致，防止浮点数精度问题导致哈希不一致。
-    coord_string = f"{x:.6f},{y:.6f}"
-
-    sha256_hash = hashlib.sha256(coord_string.encode('utf-8')).hexdigest()
-
-    hash_as_int = int(sha256_hash, 16)
-
-    base62_encoded = base_encode(hash_as_int, BASE62_CHARS)
-
-    final_id = base62_encoded[:target_length]
-
-    return final_id
+# SpreadsheetML (Excel XML) 命名空间
+SS_NAMESPACE = 'urn:schemas-microsoft-com:office:spreadsheet'
+SS_NS_MAP = {'ss': SS_NAMESPACE}
 
 # 【新增辅助函数】获取节点类型的优先级
 def get_type_priority(node_type_str):
@@ -119,6 +110,8 @@ def select_file_dialog(file_type_name, file_extensions):
     """
     显示文件选择对话框，让用户选择指定类型的文件。
     """
+    import tkinter as tk # 仅在图形界面模式下导入Tkinter
+    from tkinter import filedialog
     root = tk.Tk()
     root.withdraw()
     file_path = filedialog.askopenfilename(title=f"请选择 {file_type_name}", filetypes=file_extensions)
@@ -163,25 +156,31 @@ def parse_row_to_column_dict(row_cells, ns_map):
 def parse_seq_key(seq_str):
     """
     解析 'LX_Y' 格式的站点序列字符串，生成一个可用于正确排序的元组。
+    解析结果由 seq_keys 模块缓存；不符合格式的序列号每次都会记录警告。
     """
-    match = re.match(r'([A-Za-z]+)(\d+)_(\d+)', seq_str)
-    if match:
-        try:
-            line_prefix = match.group(1)
-            line_num = int(match.group(2))
-            station_num = int(match.group(3))
-            return (line_prefix, line_num, station_num)
-        except ValueError:
-            log_message("WARNING", "Parsing Error", f"Could not parse numeric part of sequence '{seq_str}'.", f"无法解析序列号 '{seq_str}' 中的数字部分。")
-            return (seq_str, 0, 0)
-    else:
+    seq_key = line_station_seq_key(seq_str)
+    if seq_key is None:
         log_message("WARNING", "Parsing Error", f"Sequence string '{seq_str}' does not match expected 'LX_Y' format.", f"序列号字符串 '{seq_str}' 不符合预期格式 'LX_Y'。")
         return (seq_str, 0, 0)
+    return seq_key
 
-def convert_lonlat_to_svg_coords(lon, lat, min_lon, max_lon, min_lat, max_lat,
-                                 target_svg_width, target_svg_height, padding_factor=0.05):
+# 经纬度到SVG坐标的仿射变换参数。各分量的运算顺序与逐点计算时完全一致，保证结果逐位相同。
+SvgProjection = collections.namedtuple('SvgProjection', [
+    'min_lon', 'max_lat', 'unified_scale_factor',
+    'offset_x_padding', 'offset_y_padding', 'center_offset_x', 'center_offset_y'
+])
+
+# SVG坐标保留的小数位数 (节点稳定ID基于此精度的坐标生成，修改会改变所有节点ID)
+SVG_COORD_DECIMALS = 3
+
+
+def compute_svg_projection(min_lon, max_lon, min_lat, max_lat,
+                           target_svg_width, target_svg_height, padding_factor=0.05):
     """
-    将经纬度 (lon, lat) 转换为 SVG 坐标 (svg_x, svg_y)。
+    根据经纬度范围计算一次经纬度到SVG坐标的仿射变换 (统一缩放比例、留白和居中偏移)。
+
+    返回:
+        SvgProjection: 可重复用于所有站点的变换参数。
     """
     lon_range = max_lon - min_lon
     lat_range = max_lat - min_lat
@@ -206,103 +205,386 @@ def convert_lonlat_to_svg_coords(lon, lat, min_lon, max_lon, min_lat, max_lat,
     center_offset_x = (effective_drawable_width - scaled_map_width) / 2
     center_offset_y = (effective_drawable_height - scaled_map_height) / 2
 
-    svg_x = (lon - min_lon) * unified_scale_factor + offset_x_padding + center_offset_x
-    svg_y = (max_lat - lat) * unified_scale_factor + offset_y_padding + center_offset_y
+    return SvgProjection(min_lon, max_lat, unified_scale_factor,
+                         offset_x_padding, offset_y_padding, center_offset_x, center_offset_y)
 
-    return round(svg_x, 3), round(svg_y, 3)
 
-# --- 主处理函数 ---
+def round_coords_array(values, ndigits=SVG_COORD_DECIMALS):
+    """
+    对 NumPy 数组按小数位数四舍五入，结果与逐个调用 Python 内置 round(value, ndigits) 逐位相同。
+    np.round 先乘 10**ndigits 再取整，恰好落在 .5 附近的值可能与 round() 的结果不同，
+    这些少数值单独交给 round() 处理。
+    """
+    factor = 10.0 ** ndigits
+    scaled = values * factor
+    rounded = np.rint(scaled) / factor
+
+    distance_to_half = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5)
+    for i in np.flatnonzero(distance_to_half < 1e-6):
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
 
-def process_highway_data(xml_content, json_template_content):
+
+def project_lonlat_arrays_to_svg(lons, lats, projection):
     """
-    读取XML数据，结合JSON模板，生成新的JSON文件。
-    此函数负责解析XML，提取节点和边的信息，并填充到JSON结构中。
-    特别处理基于SVG坐标的节点去重，并动态调整SVG视图框参数。
-    实现了节点类型覆盖等级：T > S > V。
+    批量将经纬度数组转换为 SVG 坐标数组。
 
     参数:
-        xml_content (str): XML数据表的字符串内容。
-        json_template_content (str): JSON模板文件的字符串内容。
+        lons (array-like): 经度数组。
+        lats (array-like): 纬度数组。
+        projection (SvgProjection): compute_svg_projection 返回的变换参数。
 
     返回:
-        str: 包含生成的JSON数据的字符串。
+        tuple: (svg_xs, svg_ys)，两个 float64 的 NumPy 数组，已保留 SVG_COORD_DECIMALS 位小数。
+    """
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+
+    svg_xs = (lons - projection.min_lon) * projection.unified_scale_factor + projection.offset_x_padding + projection.center_offset_x
+    svg_ys = (projection.max_lat - lats) * projection.unified_scale_factor + projection.offset_y_padding + projection.center_offset_y
+
+    return round_coords_array(svg_xs), round_coords_array(svg_ys)
+
+
+def convert_lonlat_to_svg_coords(lon, lat, min_lon, max_lon, min_lat, max_lat,
+                                 target_svg_width, target_svg_height, padding_factor=0.05):
     """
-    # 定义XML命名空间
-    ns = {'ss': 'urn:schemas-microsoft-com:office:spreadsheet'}
+    将经纬度 (lon, lat) 转换为 SVG 坐标 (svg_x, svg_y)。
+    转换大量站点时应先调用 compute_svg_projection，再使用 project_lonlat_arrays_to_svg 批量转换。
+    """
+    projection = compute_svg_projection(min_lon, max_lon, min_lat, max_lat,
+                                        target_svg_width, target_svg_height, padding_factor)
+
+    svg_x = (lon - projection.min_lon) * projection.unified_scale_factor + projection.offset_x_padding + projection.center_offset_x
+    svg_y = (projection.max_lat - lat) * projection.unified_scale_factor + projection.offset_y_padding + projection.center_offset_y
+
+    return round(svg_x, SVG_COORD_DECIMALS), round(svg_y, SVG_COORD_DECIMALS)
+
+def iter_spreadsheet_rows(xml_source):
+    """
+    以流式方式 (iterparse) 逐行读取 SpreadsheetML 数据表，每处理完一行立即释放其元素。
+    与一次性构建整棵XML树相比，内存占用不随数据行数增长。
+
+    参数:
+        xml_source (str | file object): XML数据表的文件路径或已打开的文件对象。
+
+    产出:
+        tuple: 以下三种之一：
+            ('header', header_names)          表头行，header_names 为 {列索引: 列名}；
+            ('line', line_name, line_color)   线路标题行；
+            ('station', station_info)         站点数据行，station_info 为 StationRecord。
+    """
+    row_tag = f'{{{SS_NAMESPACE}}}Row'
+    table_tag = f'{{{SS_NAMESPACE}}}Table'
+    worksheet_tag = f'{{{SS_NAMESPACE}}}Worksheet'
+
+    header_names = None
+    tag_stack = [] # 当前元素的祖先标签栈，用于判断 Row 是否直接位于 Worksheet/Table 之下
+    table_element = None
+
+    for event, element in ET.iterparse(xml_source, events=('start', 'end')):
+        if event == 'start':
+            tag_stack.append(element.tag)
+            if element.tag == table_tag:
+                table_element = element
+            continue
+
+        tag_stack.pop()
+        if element.tag != row_tag or tag_stack[-2:] != [worksheet_tag, table_tag]:
+            continue
+
+        if header_names is None:
+            # 第一行为表头行，建立列索引到列名的映射
+            header_cells = element.findall('ss:Cell', SS_NS_MAP)
+            header_names = {i + 1: get_cell_text(cell, SS_NS_MAP) for i, cell in enumerate(header_cells)}
+            yield ('header', header_names)
+        else:
+            parsed_row = _parse_data_row(element, header_names)
+            if parsed_row is not None:
+                yield parsed_row
+
+        # 当前行已消费完毕，释放该行及其之前已处理的兄弟元素
+        element.clear()
+        if table_element is not None:
+            table_element.clear()
+
+
+def _parse_data_row(row_element, header_names):
+    """
+    解析表头之后的一行：识别线路标题行，或将站点数据行转换为 StationRecord (标准列之外的列保存在附加字段中)。
+    空行与无法识别的合并单元格行返回 None。
+    """
+    # 识别并处理线路标题行
+    merged_cell = row_element.find('ss:Cell[@ss:MergeAcross]', SS_NS_MAP)
+    if merged_cell is not None and row_element.get(f'{{{SS_NAMESPACE}}}Height') == "24":
+        line_title = parse_line_title(get_cell_text(merged_cell, SS_NS_MAP))
+        return ('line',) + line_title if line_title else None
+
+    # 站点数据行处理
+    row_cells = row_element.findall('ss:Cell', SS_NS_MAP)
+    if not row_cells:
+        return None
+
+    row_data = parse_row_to_column_dict(row_cells, SS_NS_MAP)
+
+    station_info = StationRecord()
+    for col_idx, value in row_data.items():
+        col_name = header_names.get(col_idx)
+        if col_name:
+            station_info[col_name] = value
+    return ('station', station_info)
+
+
+def iter_input_rows(input_source):
+    """
+    按输入文件的类型读取数据表行：扩展名为 .npz 的文件为二进制中间格式 (见 station_npz.py)，其他为 SpreadsheetML 数据表。
+    两种格式产出的数据表行相同。
+
+    参数:
+        input_source (str | file object): 输入文件路径，或已打开的XML文件对象。
+    """
+    if isinstance(input_source, str) and is_station_npz_path(input_source):
+        return iter_station_npz_rows(input_source)
+    return iter_spreadsheet_rows(input_source)
+
+# --- JSON 模板预编译：节点/边工厂 ---
+# 换乘线路字段 (XML表头中的列名)
+TRANSFER_LINE_FIELDS = [f"transfer_line_{i}" for i in range(1, 7)]
+
+# JSON模板缺少某类节点或边模板时使用的默认模板
+DEFAULT_NODE_TEMPLATES = {
+    'V': { "key": "", "attributes": {"visible": True, "zIndex": 0, "x": 0, "y": 0, "type": "virtual", "virtual": {}} },
+    'S': { "key": "", "attributes": {"visible": True, "zIndex": 0, "x": 0, "y": 0, "type": "shmetro-basic", "shmetro-basic": {"names": ["", ""], "nameOffsetX": "right", "nameOffsetY": "top"}} },
+    'T': { "key": "", "attributes": {"visible": True, "zIndex": 0, "x": 0, "y": 0, "type": "shmetro-osysi", "shmetro-osysi": {"names": ["", ""], "nameOffsetX": "right", "nameOffsetY": "top"}} }
+}
+
+DEFAULT_EDGE_TEMPLATE = {
+    "key": "line_DEFAULTEDGE", 
+    "source": "", "target": "",
+    "attributes": {
+        "visible": True, "zIndex": 0, "type": "diagonal", 
+        "diagonal": {"startFrom": "from", "offsetFrom": 0, "offsetTo": 0, "roundCornerFactor": 10},
+        "style": "single-color",
+        "single-color": {"color": ["other", "other", "#000000", "#FFFFFF"]},
+        "reconcileId": "", "parallelIndex": -1
+    }
+}
+
+
+def extract_graph_templates(json_data):
+    """
+    从JSON模板中提取各类型节点模板 (V/S/T) 和边模板。
+
+    返回:
+        tuple: (node_templates, edge_template)，node_templates 为 {'V'|'S'|'T': 模板}。
+    """
+    node_templates = {}
+    if json_data['graph']['nodes']:
+        for node_t in json_data['graph']['nodes']:
+            node_type_attr = node_t.get('attributes', {}).get('type')
+            base_type = node_type_attr.split('-')[-1].lower() if node_type_attr else ''
+            
+            if base_type == 'virtual':
+                node_templates['V'] = node_t
+            elif base_type == 'basic':
+                node_templates['S'] = node_t
+            elif base_type == 'osysi':
+                node_templates['T'] = node_t
+    else:
+        log_message("WARNING", "模板错误", "JSON template's 'graph.nodes' array is empty. Using default node templates.", "JSON模板的'graph.nodes'数组为空。将使用默认节点模板。")
+        node_templates = dict(DEFAULT_NODE_TEMPLATES)
+
+    edge_template = None
+    if json_data.get('graph', {}).get('edges'):
+        edge_template = json_data['graph']['edges'][0]
     
-    # 从XML字符串解析出根元素
-    root = ET.fromstring(xml_content)
-    # 在整个工作表中查找所有行
-    rows = root.findall('.//ss:Worksheet/ss:Table/ss:Row', ns)
+    if edge_template is None:
+        log_message("WARNING", "模板错误", "Edge template not found in JSON model. Using default minimal edge template.", "JSON模板中未找到边模板。将使用默认最小边模板。")
+        edge_template = DEFAULT_EDGE_TEMPLATE
 
-    if not rows:
-        log_message("ERROR", "Processing Error", "No data rows found in XML. Please check XML structure.", "未在XML中找到任何数据行。请检查XML结构。")
-        raise ValueError("未在XML中找到任何数据行。请检查XML结构。")
+    return node_templates, edge_template
+
+
+def _compile_copier(value):
+    """
+    为 JSON 值生成复制函数。不可变的标量返回 None，表示可直接共享而无需复制。
+    """
+    if isinstance(value, dict):
+        nested_copiers = [(key, _compile_copier(item)) for key, item in value.items()]
+        if all(copier is None for _, copier in nested_copiers):
+            return value.copy
+        entries = [(key, copier, value[key]) for key, copier in nested_copiers]
+        return lambda: {key: (copier() if copier is not None else item) for key, copier, item in entries}
+    if isinstance(value, list):
+        nested_copiers = [_compile_copier(item) for item in value]
+        if all(copier is None for copier in nested_copiers):
+            return value.copy
+        entries = list(zip(nested_copiers, value))
+        return lambda: [copier() if copier is not None else item for copier, item in entries]
+    return None
+
+
+def compile_template_copier(template):
+    """
+    将 JSON 模板 (仅含 dict/list/标量) 预编译为一个无参函数，每次调用返回模板的一份全新副本。
+    结果与 copy.deepcopy(template) 相同，但省去了 deepcopy 的 memo 字典和逐对象的类型分派。
+    调用方不得再修改 template 本身。
+    """
+    copier = _compile_copier(template)
+    return copier if copier is not None else (lambda: template)
 
-    # 解析表头行，建立列名到索引的映射
-    header_row = rows[0]
-    header_cells = header_row.findall('ss:Cell', ns)
-    header_names = {i + 1: get_cell_text(cell, ns) for i, cell in enumerate(header_cells)}
 
+def compile_node_factories(node_templates):
+    """
+    将各类型节点模板预编译为节点工厂函数。模板只在此处深拷贝并清理一次
+    (移除 reconcileId、line_transfer_info，写入完整类型名)，之后每个节点只复制清理后的结构。
+
+    参数:
+        node_templates (dict): {'V'|'S'|'T': 节点模板}，缺少的类型使用 DEFAULT_NODE_TEMPLATES。
+
+    返回:
+        dict: {'V'|'S'|'T': make_node}，
+              make_node(node_key, original_xml_id, svg_x, svg_y, station_name_zh, station_name_en, transfer_lines)
+              返回一个新的节点字典。
+    """
+    return {
+        type_code: _compile_node_factory(type_code, node_templates.get(type_code) or DEFAULT_NODE_TEMPLATES[type_code])
+        for type_code in ('V', 'S', 'T')
+    }
+
+
+def _compile_node_factory(type_code, node_template):
+    """
+    为单一节点类型生成节点工厂函数。
+    """
+    simplified_type = type_code.lower()
+    cleaned_template = copy.deepcopy(node_template)
+    attributes = cleaned_template['attributes']
+
+    if simplified_type == 'v':
+        attributes['id'] = None
+        attributes['virtual'] = {}
+    else:
+        # 站名在创建节点时写入，模板中的示例站名不必逐个复制
+        attributes[get_full_node_type_name(simplified_type)]['names'] = None
+    if simplified_type == 't':
+        attributes.pop('line_transfer_info', None)
+    attributes['type'] = get_full_node_type_name(simplified_type)
+    attributes.pop('reconcileId', None)
+
+    copy_template = compile_template_copier(cleaned_template)
+    type_attr_key = attributes['type']
+
+    def make_node(node_key, original_xml_id, svg_x, svg_y, station_name_zh, station_name_en, transfer_lines=()):
+        node = copy_template()
+        node['key'] = node_key # 带有前缀的key
+        node_attributes = node['attributes']
+        if simplified_type == 'v':
+            node_attributes['id'] = original_xml_id
+        else:
+            type_specific_attributes = node_attributes[type_attr_key]
+            type_specific_attributes['names'] = [station_name_zh, station_name_en]
+            if simplified_type == 't' and transfer_lines:
+                if "transferLines" not in type_specific_attributes:
+                    type_specific_attributes["transferLines"] = []
+                type_specific_attributes["transferLines"].extend(transfer_lines)
+        # 设置节点的x, y坐标为转换后的SVG坐标
+        node_attributes['x'] = svg_x
+        node_attributes['y'] = svg_y
+        return node
+
+    return make_node
+
+
+def compile_edge_factory(edge_template):
+    """
+    将边模板预编译为边工厂函数。模板只在此处清理一次
+    (补全 single-color 颜色列表，移除 line_name 和 color)。
+
+    返回:
+        function: make_edge(edge_key, source_node_key, target_node_key, line_color)，返回一个新的边字典。
+    """
+    cleaned_template = copy.deepcopy(edge_template)
+    attributes = cleaned_template['attributes']
+    if 'single-color' not in attributes: attributes['single-color'] = {}
+    if 'color' not in attributes['single-color'] or not isinstance(attributes['single-color']['color'], list) or len(attributes['single-color']['color']) < 4:
+        attributes['single-color']['color'] = ["other", "other", "#000000", "#FFFFFF"]
+    attributes.pop('line_name', None)
+    attributes.pop('color', None)
+    attributes['reconcileId'] = None
+
+    copy_template = compile_template_copier(cleaned_template)
+
+    def make_edge(edge_key, source_node_key, target_node_key, line_color):
+        edge = copy_template()
+        edge['key'] = edge_key
+        edge['source'] = source_node_key
+        edge['target'] = target_node_key
+        edge_attributes = edge['attributes']
+        edge_attributes['single-color']['color'][2] = line_color
+        edge_attributes['reconcileId'] = edge_key
+        return edge
+
+    return make_edge
+
+# --- 主处理函数 ---
+
+def _read_station_rows(station_rows):
+    """
+    逐行读取数据表，验证每个站点数据行，并收集线路颜色和经纬度。
+
+    参数:
+        station_rows (iterable): iter_input_rows (流式读取XML或读取二进制中间文件) 或 iter_point_rows (直接读取点数据) 产出的数据表行。
+
+    返回:
+        tuple: (站点数据行列表 (StationRecord，x / y 已转换为浮点数), {线路名称: 线路颜色}, 经度列表, 纬度列表)
+    """
     actual_station_data_rows = [] # 存储所有实际的站点数据行
     line_colors = {} # 存储线路颜色
 
     all_longitudes = [] # 收集所有有效站点的经度
     all_latitudes = [] # 收集所有有效站点的纬度
 
-    # 从XML的第二行开始遍历
-    for i in range(1, len(rows)):
-        row_element = rows[i]
-        
-        # 识别并处理线路标题行
-        merged_cell = row_element.find('ss:Cell[@ss:MergeAcross]', ns)
-        if merged_cell is not None and row_element.get('{urn:schemas-microsoft-com:office:spreadsheet}Height') == "24":
-            data_text = get_cell_text(merged_cell, ns)
-            match = re.search(r'线路名称:\s*([^ ]+)\s*\(颜色:\s*(#[0-9a-fA-F]+)', data_text)
-            if match:
-                line_name_from_header = match.group(1).strip()
-                line_color_from_header = match.group(2).strip()
-                line_colors[line_name_from_header] = line_color_from_header
-                log_message("NORMAL", "XML解析", 
-                            f"Identified line header: Line='{line_name_from_header}', Color='{line_color_from_header}'.",
-                            f"识别到线路标题: 线路='{line_name_from_header}', 颜色='{line_color_from_header}'。")
+    header_found = False
+
+    # 逐行读取XML，表头之后依次为线路标题行和站点数据行
+    for row_kind, *row_payload in station_rows:
+        if row_kind == 'header':
+            header_found = True
             continue
 
-        # 站点数据行处理
-        row_cells = row_element.findall('ss:Cell', ns)
-        if not row_cells:
+        if row_kind == 'line':
+            line_name_from_header, line_color_from_header = row_payload
+            line_colors[line_name_from_header] = line_color_from_header
+            log_message("NORMAL", "XML解析",
+                        f"Identified line header: Line='{line_name_from_header}', Color='{line_color_from_header}'.",
+                        f"识别到线路标题: 线路='{line_name_from_header}', 颜色='{line_color_from_header}'。")
             continue
 
-        row_data = parse_row_to_column_dict(row_cells, ns)
-        
-        station_info = {}
-        for col_idx, value in row_data.items():
-            col_name = header_names.get(col_idx)
-            if col_name:
-                station_info[col_name] = value
-        
+        station_info = row_payload[0]
+
         # 核心必填字段验证
-        core_required_fields = ['name', 'seq', 'x', 'y', 'type', 'id'] 
+        core_required_fields = ['name', 'seq', 'x', 'y', 'type', 'id']
         if not all(station_info.get(field) for field in core_required_fields):
-            log_message("WARNING", "数据验证错误", 
-                        f"Skipping row due to missing core critical station fields: {station_info.get('name_zh', '')}_{station_info.get('seq', '')}", 
+            log_message("WARNING", "数据验证错误",
+                        f"Skipping row due to missing core critical station fields: {station_info.get('name_zh', '')}_{station_info.get('seq', '')}",
                         f"由于缺少核心关键站点字段，跳过行: {station_info.get('name_zh', '')}_{station_info.get('seq', '')}")
             continue
 
         station_type = station_info.get('type')
         if station_type == 'T':
             if not station_info.get('name_zh') or not station_info.get('name_en'):
-                log_message("WARNING", "数据验证错误", 
-                            f"Skipping transfer station '{station_info.get('name', '')}_{station_info.get('seq', '')}' due to missing Chinese or English names.", 
+                log_message("WARNING", "数据验证错误",
+                            f"Skipping transfer station '{station_info.get('name', '')}_{station_info.get('seq', '')}' due to missing Chinese or English names.",
                             f"由于缺少中文或英文名称，跳过换乘站 '{station_info.get('name', '')}_{station_info.get('seq', '')}'。")
                 continue
-        
+
         station_line_name = station_info.get('name')
         if not station_line_name:
-            log_message("WARNING", "数据解析错误", f"Station row missing 'name' field after initial validation: {row_data}", f"站点行缺少'name'字段: {row_data}")
-            continue 
-            
-        station_info['color'] = line_colors.get(station_line_name, '#000000')
+            log_message("WARNING", "数据解析错误", f"Station row missing 'name' field after initial validation: {station_info}", f"站点行缺少'name'字段: {station_info}")
+            continue
+
+        station_info.color = line_colors.get(station_line_name, '#000000')
 
         # 收集经纬度数据并处理类型转换错误
         try:
@@ -310,6 +592,9 @@ def process_highway_data(xml_content, json_template_content):
             lat = float(station_info.get('y'))
             all_longitudes.append(lon)
             all_latitudes.append(lat)
+            station_info.x = lon
+            station_info.y = lat
+            station_info.intern_shared_text()
             actual_station_data_rows.append(station_info)
         except ValueError:
             log_message("WARNING", "数据解析错误",
@@ -317,24 +602,552 @@ def process_highway_data(xml_content, json_template_content):
                       f"站点 '{station_info.get('name_zh', station_info.get('name', ''))}_{station_info.get('seq', '')}' 的经纬度无效。跳过此行。")
             continue
 
-    # 准备JSON数据结构
-    json_data = json.loads(json_template_content)
+    if not header_found:
+        log_message("ERROR", "Processing Error", "No data rows found in XML. Please check XML structure.", "未在XML中找到任何数据行。请检查XML结构。")
+        raise ValueError("未在XML中找到任何数据行。请检查XML结构。")
+
+    return actual_station_data_rows, line_colors, all_longitudes, all_latitudes
+
+
+def _merge_station_node(station_info, svg_x, svg_y, base_node_id_from_coords, seen_svg_coords_info, node_factories):
+    """
+    将一个站点数据行合并到节点集合中：坐标首次出现时创建新节点，否则按 T > S > V 的类型优先级
+    升级或合并已有节点。
+
+    参数:
+        station_info (StationRecord): 站点数据行。
+        svg_x, svg_y (float): 站点的SVG坐标。
+        base_node_id_from_coords (str): 节点的基础ID (不带前缀)，同一基础ID的站点合并为一个节点。
+        seen_svg_coords_info (dict): {基础ID: 节点信息}，记录已创建的节点，会被原地更新。
+        node_factories (dict): compile_node_factories 生成的节点工厂。
+
+    返回:
+        tuple: (该站点对应的节点key, 新创建的节点对象 或 None (合并到已有节点时))
+    """
+    line_name = station_info.get('name')
+    seq = station_info.get('seq')
+
+    # 原始XML中的节点类型 (可能是 'V', 'S', 'T' 或完整的 'shmetro-basic' 等)
+    # current_xml_node_type_raw 用于实际输出的JSON 'type' 属性
+    current_xml_node_type_raw = station_info.get('type', 'S')
+    # current_xml_node_type_simplified 用于优先级比较和前缀查找
+    current_xml_node_type_simplified = current_xml_node_type_raw.lower().split('-')[-1][0]
+
+    line_color_for_edge = station_info.get('color', '#000000') # 从station_info获取颜色
+    original_xml_id = station_info.get('id')
+
+    station_name_zh = station_info.get('name_zh', '')
+    station_name_en = station_info.get('name_en', '')
+
+    # 初始的最终节点key（带有当前行数据对应的类型前缀）
+    final_node_key = get_key_prefix(current_xml_node_type_simplified) + base_node_id_from_coords
+
+    # 【核心去重与覆盖逻辑】
+    if base_node_id_from_coords in seen_svg_coords_info: # 使用不带前缀的base_node_id_from_coords进行去重判断
+        # 坐标已存在，需要进行类型比较和数据合并
+        existing_node_info = seen_svg_coords_info[base_node_id_from_coords]
+        existing_node_object = existing_node_info['node_object'] # 获取已存在的节点对象的引用
+        existing_node_type_in_json_full = existing_node_object['attributes']['type'] # 获取已存在节点的完整类型名
+        existing_node_type_in_json_simplified = existing_node_type_in_json_full.lower().split('-')[-1][0] # 简化
+
+        current_priority = get_type_priority(current_xml_node_type_simplified)
+        existing_priority = get_type_priority(existing_node_type_in_json_simplified)
+
+        # 更新 final_node_key 为已存在的带前缀的key，以确保一致性 (即使前缀可能在后面类型升级时改变)
+        final_node_key = existing_node_object['key']
+
+        # ====== 节点类型优先级判断和更新 ======
+        if current_priority > existing_priority:
+            # 【类型升级】当前XML行的数据具有更高的优先级
+            log_message("NORMAL", "节点类型升级",
+                        f"Upgrading node type for key '{final_node_key}' from '{existing_node_type_in_json_full}' to '{get_full_node_type_name(current_xml_node_type_simplified)}'.",
+                        f"节点 '{final_node_key}' 类型从 '{existing_node_type_in_json_full}' 升级到 '{get_full_node_type_name(current_xml_node_type_simplified)}'。")
+
+            # 更新现有节点对象的类型为新的完整类型名
+            existing_node_object['attributes']['type'] = get_full_node_type_name(current_xml_node_type_simplified)
+
+            # 更新key的前缀（如果类型升级导致前缀改变）
+            new_key_prefix = get_key_prefix(current_xml_node_type_simplified)
+            if not final_node_key.startswith(new_key_prefix): # 检查当前key前缀是否需要改变
+                final_node_key = new_key_prefix + base_node_id_from_coords
+                existing_node_object['key'] = final_node_key
+                log_message("NORMAL", "节点Key更新", f"Updated node key to '{final_node_key}' due to type upgrade.", f"由于类型升级，更新节点键为 '{final_node_key}'。")
+
+
+            # 清除旧的类型特定属性，并添加新的
+            for attr_key in ['virtual', 'shmetro-basic', 'shmetro-osysi']:
+                if attr_key in existing_node_object['attributes']:
+                    del existing_node_object['attributes'][attr_key]
+
+            # 根据新类型填充属性
+            if current_xml_node_type_simplified == 't': # 换乘节点
+                existing_node_object['attributes']['shmetro-osysi'] = {
+                    "names": [station_name_zh, station_name_en],
+                    "nameOffsetX": "right", "nameOffsetY": "top",
+                    "transferLines": []
+                }
+                # 合并换乘线路信息
+                for i in range(1, 7):
+                    transfer_line_key = f"transfer_line_{i}"
+                    if transfer_line_key in station_info and station_info[transfer_line_key] and \
+                       station_info[transfer_line_key] not in existing_node_object['attributes']['shmetro-osysi']['transferLines']:
+                        existing_node_object['attributes']['shmetro-osysi']['transferLines'].append(station_info[transfer_line_key])
+            elif current_xml_node_type_simplified == 's': # 普通站点
+                existing_node_object['attributes']['shmetro-basic'] = {
+                    "names": [station_name_zh, station_name_en],
+                    "nameOffsetX": "right", "nameOffsetY": "top"
+                }
+            elif current_xml_node_type_simplified == 'v': # 虚拟节点 (这个分支在类型升级时通常不会被触发，除非从0到V)
+                existing_node_object['attributes']['virtual'] = {}
+
+            # 更新其他通用属性 (以更高优先级数据为准)
+            existing_node_object['attributes']['color'] = station_info.get('color', '')
+            existing_node_object['attributes']['direction'] = station_info.get('direction', '')
+            existing_node_object['attributes']['Firm_Highway_Number'] = station_info.get('Firm_Highway_Number', '')
+            existing_node_object['attributes']['seq'] = station_info.get('seq', '') # 更新seq
+
+        elif current_priority == existing_priority and current_xml_node_type_simplified == 't':
+            # 【同类型合并】如果都是换乘站，则合并 transferLines
+            log_message("NORMAL", "节点信息合并",
+                        f"Merging transfer lines for existing node '{final_node_key}' (Type: 'T').",
+                        f"合并节点 '{final_node_key}' (类型: 'T') 的换乘线路。")
+            if 'shmetro-osysi' in existing_node_object['attributes'] and \
+               'transferLines' in existing_node_object['attributes']['shmetro-osysi']:
+                for i in range(1, 7):
+                    transfer_line_key = f"transfer_line_{i}"
+                    if transfer_line_key in station_info and station_info[transfer_line_key] and \
+                       station_info[transfer_line_key] not in existing_node_object['attributes']['shmetro-osysi']['transferLines']:
+                        existing_node_object['attributes']['shmetro-osysi']['transferLines'].append(station_info[transfer_line_key])
+
+            # 可以选择性更新其他通用属性，这里选择以最新数据为准
+            existing_node_object['attributes']['color'] = station_info.get('color', '')
+            existing_node_object['attributes']['direction'] = station_info.get('direction', '')
+            existing_node_object['attributes']['Firm_Highway_Number'] = station_info.get('Firm_Highway_Number', '')
+            existing_node_object['attributes']['seq'] = station_info.get('seq', '') # 更新seq
+
+        else:
+            # 【类型保持不变】当前优先级低于或等于现有优先级（且非T同类型合并）
+            log_message("NORMAL", "节点去重 (坐标)",
+                        f"Skipping node update for key '{final_node_key}' as current type '{current_xml_node_type_simplified}' is not higher priority than '{existing_node_type_in_json_simplified}'.",
+                        f"由于当前类型 '{current_xml_node_type_simplified}' 优先级不高于现有类型 '{existing_node_type_in_json_simplified}'，跳过节点 '{final_node_key}' 的更新。")
+
+        # 更新 seen_svg_coords_info 中的 info，以便存储最新的原始数据或合并后的状态
+        seen_svg_coords_info[base_node_id_from_coords]['data'] = station_info # 存储当前行数据作为参考
+        seen_svg_coords_info[base_node_id_from_coords]['line_color'] = line_color_for_edge
+        seen_svg_coords_info[base_node_id_from_coords]['zh_name'] = station_name_zh
+        seen_svg_coords_info[base_node_id_from_coords]['en_name'] = station_name_en
+
+        # 不重复添加节点，调用方只需更新原始XML ID到节点key的映射
+        return final_node_key, None
+
+    # 如果是新的SVG坐标，则创建新节点
+    # 根据当前XML类型选择对应的节点工厂，工厂生成的节点已填好key、坐标、名称等字段
+    if current_xml_node_type_simplified in ('v', 's', 't'):
+        make_node = node_factories[current_xml_node_type_simplified.upper()]
+    else: # 未知或空类型，默认为普通站点 'shmetro-basic'
+        log_message("WARNING", "处理错误",
+                    f"Station '{station_name_zh or line_name}_{seq}' has unknown or empty type '{current_xml_node_type_raw}'. Defaulting to 'shmetro-basic'.",
+                    f"站点 '{station_name_zh or line_name}_{seq}' 类型 '{current_xml_node_type_raw}' 未知或为空。默认为 'shmetro-basic' 类型。")
+        make_node = node_factories['S']
+
+    # 换乘线路信息 (transfer_line_1 到 transfer_line_6)，仅换乘节点使用
+    transfer_lines = [station_info[field] for field in TRANSFER_LINE_FIELDS if station_info.get(field)]
+    node_to_add = make_node(final_node_key, original_xml_id, svg_x, svg_y,
+                            station_name_zh, station_name_en, transfer_lines)
+
+    # 添加其他额外的属性，如果XML中存在 (标准列之外的列都保存在站点记录的附加字段中)
+    if station_info.extra_fields:
+        node_to_add["attributes"].update(station_info.extra_fields)
+
+    # 添加color, direction, seq, Firm_Highway_Number到attributes
+    node_to_add["attributes"]["color"] = station_info.get('color', '')
+    node_to_add["attributes"]["direction"] = station_info.get('direction', '')
+    node_to_add["attributes"]["seq"] = station_info.get('seq', '')
+    node_to_add["attributes"]["Firm_Highway_Number"] = station_info.get('Firm_Highway_Number', '')
+
+    log_message("NORMAL", "节点创建",
+                f"Created NEW node (based on SVG coords) for '{station_name_zh}' (Type: {node_to_add['attributes']['type']}, Key: {final_node_key}, SVG_X:{svg_x}, SVG_Y:{svg_y}). Original XML ID: {original_xml_id}",
+                f"基于SVG坐标创建了新节点 '{station_name_zh}' (类型: {node_to_add['attributes']['type']}, 键: {final_node_key}, SVG_X:{svg_x}, SVG_Y:{svg_y})。原始XML ID: {original_xml_id}")
+
+    # 记录新创建的节点信息
+    seen_svg_coords_info[base_node_id_from_coords] = { # 用不带前缀的基础ID作为key
+        'node_object': node_to_add, # 存储对实际节点对象的引用
+        'data': station_info,
+        'line_color': line_color_for_edge,
+        'zh_name': station_name_zh,
+        'en_name': station_name_en
+    }
+    return final_node_key, node_to_add
+
+
+def _build_line_edges(line_name, station_records, source_rows, target_rows, line_color, node_id_to_key_map, make_edge,
+                      skip_self_loops=False):
+    """
+    为一条线路生成相邻站点之间的边。
+
+    参数:
+        line_name (str): 线路名称。
+        station_records (list): 列式站点表中的全部站点记录。
+        source_rows, target_rows (np.ndarray): 该线路每条边的起点行和终点行 (StationTable.edge_pairs_by_line 的结果)。
+        line_color (str): 线路颜色。
+        node_id_to_key_map (dict): {原始XML ID: 最终节点key}。
+        make_edge (callable): compile_edge_factory 生成的边工厂。
+        skip_self_loops (bool): 为 True 时不生成起点和终点为同一节点的边 (启用节点吸附时，
+                                相邻站点吸附到同一节点后，二者之间的边应随之合并掉)。
+
+    返回:
+        list: 该线路的边对象列表。
+    """
+    line_edges = []
+    for source_row, target_row in zip(source_rows.tolist(), target_rows.tolist()):
+        prev_station_info = station_records[source_row]
+        station_info = station_records[target_row]
+        prev_original_xml_id = prev_station_info.get('id')
+        current_original_xml_id = station_info.get('id')
+
+        # 从 node_id_to_key_map 中获取源节点和目标节点的最终key
+        source_node_key_for_edge = node_id_to_key_map.get(prev_original_xml_id)
+        target_node_key_for_edge = node_id_to_key_map.get(current_original_xml_id)
+
+        if skip_self_loops and source_node_key_for_edge is not None and source_node_key_for_edge == target_node_key_for_edge:
+            log_message("NORMAL", "节点吸附",
+                        f"Skipping edge for '{line_name}' between {prev_original_xml_id} and {current_original_xml_id}: both stations snapped onto node '{source_node_key_for_edge}'.",
+                        f"线路 '{line_name}' 中 {prev_original_xml_id} 与 {current_original_xml_id} 吸附到同一节点 '{source_node_key_for_edge}'，不生成二者之间的边。")
+        elif source_node_key_for_edge and target_node_key_for_edge:
+            edge_key = f"line_{prev_original_xml_id}_{current_original_xml_id}"
+
+            # 【核心修正】确保边的颜色使用线路的实际颜色
+            edge = make_edge(edge_key, source_node_key_for_edge, target_node_key_for_edge, line_color)
+
+            line_edges.append(edge)
+            log_message("NORMAL", "边创建",
+                        f"Created edge for '{line_name}' from {prev_station_info.get('name_zh', prev_station_info.get('name', ''))} (Key: {source_node_key_for_edge}) to {station_info.get('name_zh', line_name)} (Key: {target_node_key_for_edge}). Color: {line_color}", # Added color to log
+                        f"为线路 '{line_name}' 创建了从 {prev_station_info.get('name_zh', prev_station_info.get('name', ''))} (键: {source_node_key_for_edge}) 到 {station_info.get('name_zh', line_name)} (键: {target_node_key_for_edge}) 的边。颜色: {line_color}")
+        else:
+            log_message("WARNING", "边创建错误",
+                      f"Could not find source ({prev_original_xml_id}) or target ({current_original_xml_id}) node key for edge '{line_name}'. Skipping edge creation.",
+                      f"无法为线路 '{line_name}' 的边找到源 ({prev_original_xml_id}) 或目标 ({current_original_xml_id}) 节点的键。跳过边创建。")
+    return line_edges
+
+
+def compute_line_rows_digest(line_rows):
+    """
+    计算一条线路全部站点数据行 (含线路颜色) 的 SHA256，用于判断线路在两次转换之间是否变化。
+    """
+    serialized_rows = json.dumps([station_info.to_dict() for station_info in line_rows], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serialized_rows.encode('utf-8')).hexdigest()
+
+
+def _make_line_state(line_rows, base_node_ids, node_keys, edge_count):
+    """
+    生成一条线路的增量重建状态：内容摘要、每个站点的原始XML ID、基础节点ID和最终节点key，以及边的数量。
+    """
+    return {
+        "digest": compute_line_rows_digest(line_rows),
+        "ids": [station_info.get('id') for station_info in line_rows],
+        "base_ids": base_node_ids,
+        "keys": node_keys,
+        "edge_count": edge_count
+    }
+
+
+def _strip_node_key_prefix(node_key):
+    """
+    去掉节点key的类型前缀 (stn_ / misc_node_)，返回基础节点ID。
+    """
+    for key_prefix in set(NODE_KEY_PREFIX.values()):
+        if node_key.startswith(key_prefix):
+            return node_key[len(key_prefix):]
+    return node_key
+
+
+def _build_all_lines(station_table, node_factories, make_edge, line_colors, snap_tolerance, profiler=NULL_PROFILER):
+    """
+    完整构建：处理全部线路的节点和边。
+
+    参数:
+        station_table (StationTable): 已按线路和序列号排序、并已计算SVG坐标的列式站点表。
+        profiler (StageProfiler): 分别记录节点去重 ('dedupe') 和边生成 ('edge_build') 两个阶段。
+
+    返回:
+        tuple: (节点列表, 边列表, {线路名称: 线路增量状态})
+    """
     new_nodes = [] # 存储所有最终生成的节点对象
     new_edges = []
 
     # 【核心修改】用于跟踪已处理的SVG坐标及其对应的节点key和节点对象引用
     # 存储 {final_node_base_id: {'node_object': <reference_to_node_in_new_nodes>, 'data': station_info, 'current_simplified_type': 's', ...}}
-    seen_svg_coords_info = {} 
+    seen_svg_coords_info = {}
     # 用于存储原始XML ID到最终生成的节点key的映射
-    node_id_to_key_map = {} 
+    node_id_to_key_map = {}
+    # 吸附容差大于 0 时，用空间网格索引查找容差范围内的已有节点
+    node_grid_index = SvgNodeGridIndex(snap_tolerance) if snap_tolerance > 0 else None
+
+    station_records = station_table.records
+    station_svg_xs = station_table.svg_xs.tolist()
+    station_svg_ys = station_table.svg_ys.tolist()
+    line_slices = station_table.line_slices()
+
+    line_states = {}
+    with profiler.stage("dedupe") as dedupe_stage:
+        for line_name, line_start, line_stop in line_slices:
+            line_base_ids = []
+            line_keys = []
+            for station_info, svg_x, svg_y in zip(station_records[line_start:line_stop], station_svg_xs[line_start:line_stop],
+                                                  station_svg_ys[line_start:line_stop]):
+                # 根据SVG坐标生成基础ID (不带前缀)
+                base_node_id_from_coords = generate_stable_id_from_coords(svg_x, svg_y, target_length=9)
+
+                # 坐标不完全相同、但在吸附容差范围内存在已有节点时，归并到该节点
+                if node_grid_index is not None and base_node_id_from_coords not in seen_svg_coords_info:
+                    snapped_base_node_id = node_grid_index.find_nearest(svg_x, svg_y)
+                    if snapped_base_node_id is not None:
+                        log_message("NORMAL", "节点吸附",
+                                    f"Snapping '{station_info.get('name_zh', '') or line_name}_{station_info.get('seq')}' (SVG_X:{svg_x}, SVG_Y:{svg_y}) onto existing node '{snapped_base_node_id}' within tolerance {snap_tolerance}.",
+                                    f"站点 '{station_info.get('name_zh', '') or line_name}_{station_info.get('seq')}' (SVG_X:{svg_x}, SVG_Y:{svg_y}) 在容差 {snap_tolerance} 内吸附到已有节点 '{snapped_base_node_id}'。")
+                        base_node_id_from_coords = snapped_base_node_id
+
+                final_node_key, node_to_add = _merge_station_node(
+                    station_info, svg_x, svg_y, base_node_id_from_coords, seen_svg_coords_info, node_factories
+                )
+                if node_to_add is not None:
+                    new_nodes.append(node_to_add) # 将新创建的节点添加到列表中
+                    if node_grid_index is not None:
+                        node_grid_index.add(svg_x, svg_y, base_node_id_from_coords)
+                node_id_to_key_map[station_info.get('id')] = final_node_key # 将原始XML ID映射到最终节点key (带前缀)
+                line_base_ids.append(base_node_id_from_coords)
+                line_keys.append(final_node_key)
+            line_states[line_name] = (line_base_ids, line_keys)
+        dedupe_stage.set_count("stations", len(station_records))
+        dedupe_stage.set_count("nodes", len(new_nodes))
+
+    # --- 边生成逻辑 ---
+    # 所有节点处理完毕后再逐条线路生成边，确保节点的类型和key都是最终确定的。
+    # 边的颜色代表线路本身，优先使用线路标题中提取的颜色。
+    with profiler.stage("edge_build") as edge_stage:
+        edge_pairs_by_line = station_table.edge_pairs_by_line()
+        for line_name, line_start, line_stop in line_slices:
+            line_edges = _build_line_edges(line_name, station_records, *edge_pairs_by_line[line_name],
+                                           line_colors.get(line_name, '#000000'), node_id_to_key_map, make_edge,
+                                           skip_self_loops=snap_tolerance > 0)
+            new_edges.extend(line_edges)
+            line_base_ids, line_keys = line_states[line_name]
+            line_states[line_name] = _make_line_state(station_records[line_start:line_stop], line_base_ids, line_keys, len(line_edges))
+        edge_stage.set_count("lines", len(line_slices))
+        edge_stage.set_count("edges", len(new_edges))
+
+    return new_nodes, new_edges, line_states
+
+
+def _patch_changed_lines(station_table, node_factories, make_edge, line_colors, previous_graph, previous_line_states):
+    """
+    按线路增量重建：只重新计算内容有变化的线路，以及与这些线路共用坐标的节点，其余节点和边直接沿用上次的结果。
+    输出与完整构建逐字节相同 (仅适用于吸附容差为 0、经纬度范围未变化的情况)。
+
+    参数:
+        station_table (StationTable): 已按线路和序列号排序、并已计算SVG坐标的列式站点表。
+        previous_graph (dict): 上次生成的JSON中的 'graph' 对象。
+        previous_line_states (dict): 上次转换保存的 {线路名称: 线路增量状态}。
+
+    返回:
+        tuple: (节点列表, 边列表, {线路名称: 线路增量状态})
+    """
+    station_records = station_table.records
+    station_svg_xs = station_table.svg_xs.tolist()
+    station_svg_ys = station_table.svg_ys.tolist()
+    line_starts = {}
+    rows_by_line = {}
+    for line_name, line_start, line_stop in station_table.line_slices():
+        line_starts[line_name] = line_start
+        rows_by_line[line_name] = station_records[line_start:line_stop]
+
+    line_digests = {line_name: compute_line_rows_digest(line_rows) for line_name, line_rows in rows_by_line.items()}
+    changed_lines = [
+        line_name for line_name in rows_by_line
+        if line_name not in previous_line_states or previous_line_states[line_name]["digest"] != line_digests[line_name]
+    ]
+    removed_lines = [line_name for line_name in previous_line_states if line_name not in rows_by_line]
+    log_message("INFO", "增量构建",
+                f"{len(changed_lines)} changed, {len(removed_lines)} removed, {len(rows_by_line) - len(changed_lines)} unchanged line(s).",
+                f"线路变化 {len(changed_lines)} 条，删除 {len(removed_lines)} 条，未变化 {len(rows_by_line) - len(changed_lines)} 条。")
+
+    # 只对有变化的线路计算基础节点ID
+    line_base_ids = {line_name: previous_line_states[line_name]["base_ids"] for line_name in rows_by_line if line_name not in changed_lines}
+    for line_name in changed_lines:
+        line_start = line_starts[line_name]
+        line_stop = line_start + len(rows_by_line[line_name])
+        line_base_ids[line_name] = [
+            generate_stable_id_from_coords(svg_x, svg_y, target_length=9)
+            for svg_x, svg_y in zip(station_svg_xs[line_start:line_stop], station_svg_ys[line_start:line_stop])
+        ]
+
+    # 受影响的坐标：变化或删除的线路在上次和本次经过的所有坐标
+    affected_base_ids = set()
+    for line_name in changed_lines + removed_lines:
+        if line_name in previous_line_states:
+            affected_base_ids.update(previous_line_states[line_name]["base_ids"])
+    for line_name in changed_lines:
+        affected_base_ids.update(line_base_ids[line_name])
+
+    # 按与完整构建相同的顺序，重新执行受影响坐标上的 T > S > V 合并 (未变化的线路中经过受影响坐标的站点也参与)
+    seen_svg_coords_info = {}
+    line_keys = {}
+    for line_name, line_rows in rows_by_line.items():
+        if line_name in changed_lines:
+            keys = [None] * len(line_rows)
+        else:
+            keys = list(previous_line_states[line_name]["keys"])
+        line_start = line_starts[line_name]
+        for row_index, base_node_id in enumerate(line_base_ids[line_name]):
+            if base_node_id in affected_base_ids:
+                keys[row_index], _ = _merge_station_node(
+                    line_rows[row_index], station_svg_xs[line_start + row_index], station_svg_ys[line_start + row_index],
+                    base_node_id, seen_svg_coords_info, node_factories
+                )
+        line_keys[line_name] = keys
+
+    # 节点顺序与完整构建一致：按坐标在排序后的站点数据中首次出现的顺序排列
+    previous_nodes_by_base_id = {_strip_node_key_prefix(node['key']): node for node in previous_graph['nodes']}
+    new_nodes = []
+    emitted_base_ids = set()
+    for line_name in rows_by_line:
+        for base_node_id in line_base_ids[line_name]:
+            if base_node_id in emitted_base_ids:
+                continue
+            emitted_base_ids.add(base_node_id)
+            if base_node_id in affected_base_ids:
+                new_nodes.append(seen_svg_coords_info[base_node_id]['node_object'])
+            else:
+                new_nodes.append(previous_nodes_by_base_id[base_node_id])
+
+    # 原始XML ID到节点key的映射以最后出现的站点为准；映射有变化的线路也需要重新生成边
+    line_ids = {line_name: [station_info.get('id') for station_info in line_rows] for line_name, line_rows in rows_by_line.items()}
+    node_id_to_key_map = {}
+    for line_name in rows_by_line:
+        node_id_to_key_map.update(zip(line_ids[line_name], line_keys[line_name]))
+    previous_node_id_to_key_map = {}
+    previous_edges_by_line = {}
+    edge_offset = 0
+    for line_name, line_state in previous_line_states.items():
+        previous_node_id_to_key_map.update(zip(line_state["ids"], line_state["keys"]))
+        previous_edges_by_line[line_name] = previous_graph['edges'][edge_offset:edge_offset + line_state["edge_count"]]
+        edge_offset += line_state["edge_count"]
+
+    new_edges = []
+    line_states = {}
+    edge_pairs_by_line = station_table.edge_pairs_by_line()
+    for line_name in rows_by_line:
+        if line_name in changed_lines or any(node_id_to_key_map[original_xml_id] != previous_node_id_to_key_map.get(original_xml_id)
+                                             for original_xml_id in line_ids[line_name]):
+            line_edges = _build_line_edges(line_name, station_records, *edge_pairs_by_line[line_name],
+                                           line_colors.get(line_name, '#000000'), node_id_to_key_map, make_edge)
+        else:
+            line_edges = previous_edges_by_line[line_name]
+        new_edges.extend(line_edges)
+        line_states[line_name] = {
+            "digest": line_digests[line_name],
+            "ids": line_ids[line_name],
+            "base_ids": line_base_ids[line_name],
+            "keys": line_keys[line_name],
+            "edge_count": len(line_edges)
+        }
+
+    return new_nodes, new_edges, line_states
+
+
+def process_highway_data(xml_source, json_template_content, snap_tolerance=DEFAULT_SNAP_TOLERANCE, profiler=None):
+    """
+    读取XML数据，结合JSON模板，生成新的JSON文件。
+    此函数负责解析XML，提取节点和边的信息，并填充到JSON结构中。
+    特别处理基于SVG坐标的节点去重，并动态调整SVG视图框参数。
+    实现了节点类型覆盖等级：T > S > V。
+
+    参数:
+        xml_source (str | file object): XML数据表的文件路径或已打开的文件对象，以流式方式读取；
+                                        也可以是二进制中间文件 (.npz) 的路径。
+        json_template_content (str): JSON模板文件的字符串内容。
+        snap_tolerance (float): 节点吸附容差 (SVG 坐标单位)。大于 0 时，与已有节点距离不超过该值的站点
+                                合并到该节点，并同样执行 T > S > V 类型覆盖和换乘线路合并。
+        profiler (StageProfiler | None): 传入时按阶段 (parse、sort、project、dedupe、edge_build、serialize) 记录耗时、
+                                         内存峰值和数据量，调用结束后通过 profiler.report() 获取报告。默认不记录。
+
+    返回:
+        str: 包含生成的JSON数据的字符串。
+    """
+    output_json_string, _ = build_highway_graph(xml_source, json_template_content, snap_tolerance=snap_tolerance, profiler=profiler)
+    return output_json_string
+
+
+def build_highway_graph(xml_source, json_template_content, snap_tolerance=DEFAULT_SNAP_TOLERANCE, previous_build=None,
+                        json_backend=None, profiler=None):
+    """
+    与 process_highway_data 相同，但同时返回按线路增量重建所需的状态，并可基于上次的结果只重建有变化的线路。
+
+    参数:
+        previous_build (dict | None): 上次转换的结果 {'json': 上次生成的JSON字符串, 'state': 上次返回的增量状态}。
+                                      为 None、与本次参数不兼容或经纬度范围发生变化时执行完整构建。
+        json_backend (JsonBackend | None): 解析模板和编码输出使用的JSON后端，默认为 get_json_backend() 自动选择的后端。
+
+    返回:
+        tuple: (JSON字符串 (缩进4格), 增量状态 dict)
+    """
+    json_backend = json_backend or get_json_backend()
+    profiler = profiler or NULL_PROFILER
+    json_data, build_state = build_highway_graph_data(xml_source, json_template_content, snap_tolerance=snap_tolerance,
+                                                      previous_build=previous_build, json_backend=json_backend, profiler=profiler)
+    with profiler.stage("serialize") as serialize_stage:
+        output_json_string = json_backend.dumps_indented(json_data)
+        serialize_stage.set_count("chars", len(output_json_string))
+    return output_json_string, build_state
+
+
+def build_highway_graph_data(xml_source, json_template_content, snap_tolerance=DEFAULT_SNAP_TOLERANCE, previous_build=None,
+                             json_backend=None, profiler=None):
+    """
+    与 build_highway_graph 相同，但返回JSON数据对象而不是字符串，供 write_rmp_json 以流式方式写出。
+    profiler 记录的阶段不包含 serialize。
+
+    返回:
+        tuple: (JSON数据 dict, 增量状态 dict)
+    """
+    return _build_graph_data_from_rows(iter_input_rows(xml_source), json_template_content, snap_tolerance=snap_tolerance,
+                                       previous_build=previous_build, json_backend=json_backend, profiler=profiler)
 
-    last_station_info_by_line = {} # 存储每条线路的最后一个站点信息，用于生成边
+
+def build_highway_graph_data_from_points(points, json_template_content, snap_tolerance=DEFAULT_SNAP_TOLERANCE, previous_build=None,
+                                         json_backend=None, profiler=None):
+    """
+    与 build_highway_graph_data 相同，但直接使用内存中的点数据 (如 QGIS 导出的点数据)，不经过XML数据表的写出和解析。
+    结果与先用 firm_workbook.write_firm_workbook 写出XML再转换完全相同 (见 iter_point_rows)。
+
+    参数:
+        points (list): 点数据 (StationRecord 或 dict)，应已按 firm_workbook.export_sort_key 排序。
+
+    返回:
+        tuple: (JSON数据 dict, 增量状态 dict)
+    """
+    return _build_graph_data_from_rows(iter_point_rows(points), json_template_content, snap_tolerance=snap_tolerance,
+                                       previous_build=previous_build, json_backend=json_backend, profiler=profiler)
+
+
+def _build_graph_data_from_rows(station_rows, json_template_content, snap_tolerance=DEFAULT_SNAP_TOLERANCE, previous_build=None,
+                                json_backend=None, profiler=None):
+    """由数据表行 (iter_input_rows 或 iter_point_rows 产出) 构建JSON数据，参数与返回值见 build_highway_graph_data。"""
+    json_backend = json_backend or get_json_backend()
+    profiler = profiler or NULL_PROFILER
+    with profiler.stage("parse") as parse_stage:
+        actual_station_data_rows, line_colors, all_longitudes, all_latitudes = _read_station_rows(station_rows)
+        parse_stage.set_count("stations", len(actual_station_data_rows))
+        parse_stage.set_count("lines", len(line_colors))
+
+    # 准备JSON数据结构
+    json_data = json_backend.loads(json_template_content)
 
     # 动态计算SVG ViewBox参数
     if not all_longitudes or not all_latitudes:
         log_message("ERROR", "数据错误", "No valid longitude/latitude data found for SVG viewbox calculation. Cannot generate map.", "未找到有效的经纬度数据，无法进行SVG视图框计算。")
         raise ValueError("未找到有效的经纬度数据，无法进行SVG视图框计算。")
-    
+
     min_lon, max_lon = min(all_longitudes), max(all_longitudes)
     min_lat, max_lat = min(all_latitudes), max(all_latitudes)
 
@@ -363,346 +1176,77 @@ def process_highway_data(xml_content, json_template_content):
 
     log_message("INFO", "SVG参数", f"Calculated svgViewBoxMin.x: {json_data['svgViewBoxMin']['x']}", f"计算得到svgViewBoxMin.x: {json_data['svgViewBoxMin']['x']}")
     log_message("INFO", "SVG参数", f"Calculated svgViewBoxMin.y: {json_data['svgViewBoxMin']['y']}", f"计算得到svgViewBoxMin.y: {json_data['svgViewBoxMin']['y']}")
-    
-    svg_padding_factor = 0.05 
+
+    svg_padding_factor = 0.05
 
     svg_output_width = NOMINAL_VIEWBOX_SIZE_FOR_ZOOM_CALC
     svg_output_height = NOMINAL_VIEWBOX_SIZE_FOR_ZOOM_CALC
 
-    log_message("NORMAL", "坐标缩放", 
+    log_message("NORMAL", "坐标缩放",
                 f"Calculated geographical bounds: Lon({min_lon}, {max_lon}), Lat({min_lat}, {max_lat}).",
                 f"计算的地理边界: 经度({min_lon}, {max_lon}), 纬度({min_lat}, {max_lat})。")
-    log_message("NORMAL", "坐标缩放", 
+    log_message("NORMAL", "坐标缩放",
                 f"Used nominal SVG output size for coordinate conversion: Width={round(svg_output_width, 2)}, Height={round(svg_output_height, 2)}.",
                 f"用于坐标转换的SVG名义输出尺寸: 宽度={round(svg_output_width, 2)}, 高度={round(svg_output_height, 2)}。")
 
 
-    # 提取节点和边模板
-    node_templates = {}
-    if json_data['graph']['nodes']:
-        for node_t in json_data['graph']['nodes']:
-            node_type_attr = node_t.get('attributes', {}).get('type')
-            base_type = node_type_attr.split('-')[-1].lower() if node_type_attr else ''
-            
-            if base_type == 'virtual':
-                node_templates['V'] = node_t
-            elif base_type == 'basic':
-                node_templates['S'] = node_t
-            elif base_type == 'osysi':
-                node_templates['T'] = node_t
-    else:
-        log_message("WARNING", "模板错误", "JSON template's 'graph.nodes' array is empty. Using default node templates.", "JSON模板的'graph.nodes'数组为空。将使用默认节点模板。")
-        node_templates['V'] = { "key": "", "attributes": {"visible": True, "zIndex": 0, "x": 0, "y": 0, "type": "virtual", "virtual": {}} }
-        node_templates['S'] = { "key": "", "attributes": {"visible": True, "zIndex": 0, "x": 0, "y": 0, "type": "shmetro-basic", "shmetro-basic": {"names": ["", ""], "nameOffsetX": "right", "nameOffsetY": "top"}} }
-        node_templates['T'] = { "key": "", "attributes": {"visible": True, "zIndex": 0, "x": 0, "y": 0, "type": "shmetro-osysi", "shmetro-osysi": {"names": ["", ""], "nameOffsetX": "right", "nameOffsetY": "top"}} }
-
-    edge_template_from_model = None
-    if json_data.get('graph', {}).get('edges'):
-        edge_template_from_model = json_data['graph']['edges'][0]
-    
-    if edge_template_from_model is None:
-        log_message("WARNING", "模板错误", "Edge template not found in JSON model. Using default minimal edge template.", "JSON模板中未找到边模板。将使用默认最小边模板。")
-        edge_template_from_model = {
-            "key": "line_DEFAULTEDGE", 
-            "source": "", "target": "",
-            "attributes": {
-                "visible": True, "zIndex": 0, "type": "diagonal", 
-                "diagonal": {"startFrom": "from", "offsetFrom": 0, "offsetTo": 0, "roundCornerFactor": 10},
-                "style": "single-color",
-                "single-color": {"color": ["other", "other", "#000000", "#FFFFFF"]},
-                "reconcileId": "", "parallelIndex": -1
-            }
-        }
+    # 提取节点和边模板，并预编译为节点/边工厂函数
+    node_templates, edge_template_from_model = extract_graph_templates(json_data)
+    node_factories = compile_node_factories(node_templates)
+    make_edge = compile_edge_factory(edge_template_from_model)
 
     # 核心处理逻辑：遍历站点数据，创建节点和边
-    actual_station_data_rows.sort(key=lambda x: (x.get('name', ''), parse_seq_key(x.get('seq', ''))))
+    # 站点数据转为列式表，按线路名称和解析后的序列键排序 (lexsort)，之后按线路切片
+    with profiler.stage("sort") as sort_stage:
+        station_table = StationTable.from_records(actual_station_data_rows, parse_seq_key).sorted_by_line_and_seq()
+        sort_stage.set_count("stations", len(station_table))
     log_message("NORMAL", "排序", "Station data rows sorted by line name and parsed sequence key.", "站点数据行已按线路名称和解析后的序列键排序。")
 
-
-    for station_info in actual_station_data_rows: 
-        line_name = station_info.get('name')
-        seq = station_info.get('seq')
-        lon = float(station_info.get('x'))
-        lat = float(station_info.get('y'))
-        
-        # 原始XML中的节点类型 (可能是 'V', 'S', 'T' 或完整的 'shmetro-basic' 等)
-        # current_xml_node_type_raw 用于实际输出的JSON 'type' 属性
-        current_xml_node_type_raw = station_info.get('type', 'S') 
-        # current_xml_node_type_simplified 用于优先级比较和前缀查找
-        current_xml_node_type_simplified = current_xml_node_type_raw.lower().split('-')[-1][0] 
-        
-        line_color_for_edge = station_info.get('color', '#000000') # 从station_info获取颜色
-        original_xml_id = station_info.get('id')
-        
-        station_name_zh = station_info.get('name_zh', '')
-        station_name_en = station_info.get('name_en', '')
-
-        # 调用坐标转换函数，将经纬度转换为SVG坐标
-        svg_x, svg_y = convert_lonlat_to_svg_coords(
-            lon, lat,
+    # 一次性计算坐标变换参数，并批量将所有站点的经纬度转换为SVG坐标
+    with profiler.stage("project") as project_stage:
+        svg_projection = compute_svg_projection(
             min_lon, max_lon, min_lat, max_lat,
-            NOMINAL_VIEWBOX_SIZE_FOR_ZOOM_CALC, NOMINAL_VIEWBOX_SIZE_FOR_ZOOM_CALC,
+            svg_output_width, svg_output_height,
             svg_padding_factor
         )
-
-        # 根据SVG坐标生成基础ID (不带前缀)
-        base_node_id_from_coords = generate_stable_id_from_coords(svg_x, svg_y, target_length=9)
-        
-        # 初始的最终节点key（带有当前行数据对应的类型前缀）
-        final_node_key = get_key_prefix(current_xml_node_type_simplified) + base_node_id_from_coords
-
-        # 【核心去重与覆盖逻辑】
-        if base_node_id_from_coords in seen_svg_coords_info: # 使用不带前缀的base_node_id_from_coords进行去重判断
-            # 坐标已存在，需要进行类型比较和数据合并
-            existing_node_info = seen_svg_coords_info[base_node_id_from_coords]
-            existing_node_object = existing_node_info['node_object'] # 获取已存在的节点对象的引用
-            existing_node_type_in_json_full = existing_node_object['attributes']['type'] # 获取已存在节点的完整类型名
-            existing_node_type_in_json_simplified = existing_node_type_in_json_full.lower().split('-')[-1][0] # 简化
-            
-            current_priority = get_type_priority(current_xml_node_type_simplified)
-            existing_priority = get_type_priority(existing_node_type_in_json_simplified)
-
-            # 更新 final_node_key 为已存在的带前缀的key，以确保一致性 (即使前缀可能在后面类型升级时改变)
-            final_node_key = existing_node_object['key'] 
-
-            # ====== 节点类型优先级判断和更新 ======
-            if current_priority > existing_priority:
-                # 【类型升级】当前XML行的数据具有更高的优先级
-                log_message("NORMAL", "节点类型升级", 
-                            f"Upgrading node type for key '{final_node_key}' from '{existing_node_type_in_json_full}' to '{get_full_node_type_name(current_xml_node_type_simplified)}'.", 
-                            f"节点 '{final_node_key}' 类型从 '{existing_node_type_in_json_full}' 升级到 '{get_full_node_type_name(current_xml_node_type_simplified)}'。")
-                
-                # 更新现有节点对象的类型为新的完整类型名
-                existing_node_object['attributes']['type'] = get_full_node_type_name(current_xml_node_type_simplified)
-                
-                # 更新key的前缀（如果类型升级导致前缀改变）
-                new_key_prefix = get_key_prefix(current_xml_node_type_simplified)
-                if not final_node_key.startswith(new_key_prefix): # 检查当前key前缀是否需要改变
-                    final_node_key = new_key_prefix + base_node_id_from_coords
-                    existing_node_object['key'] = final_node_key
-                    log_message("NORMAL", "节点Key更新", f"Updated node key to '{final_node_key}' due to type upgrade.", f"由于类型升级，更新节点键为 '{final_node_key}'。")
-
-
-                # 清除旧的类型特定属性，并添加新的
-                for attr_key in ['virtual', 'shmetro-basic', 'shmetro-osysi']:
-                    if attr_key in existing_node_object['attributes']:
-                        del existing_node_object['attributes'][attr_key]
-
-                # 根据新类型填充属性
-                if current_xml_node_type_simplified == 't': # 换乘节点
-                    existing_node_object['attributes']['shmetro-osysi'] = {
-                        "names": [station_name_zh, station_name_en],
-                        "nameOffsetX": "right", "nameOffsetY": "top",
-                        "transferLines": []
-                    }
-                    # 合并换乘线路信息
-                    for i in range(1, 7):
-                        transfer_line_key = f"transfer_line_{i}"
-                        if transfer_line_key in station_info and station_info[transfer_line_key] and \
-                           station_info[transfer_line_key] not in existing_node_object['attributes']['shmetro-osysi']['transferLines']:
-                            existing_node_object['attributes']['shmetro-osysi']['transferLines'].append(station_info[transfer_line_key])
-                elif current_xml_node_type_simplified == 's': # 普通站点
-                    existing_node_object['attributes']['shmetro-basic'] = {
-                        "names": [station_name_zh, station_name_en],
-                        "nameOffsetX": "right", "nameOffsetY": "top"
-                    }
-                elif current_xml_node_type_simplified == 'v': # 虚拟节点 (这个分支在类型升级时通常不会被触发，除非从0到V)
-                    existing_node_object['attributes']['virtual'] = {}
-                
-                # 更新其他通用属性 (以更高优先级数据为准)
-                existing_node_object['attributes']['color'] = station_info.get('color', '')
-                existing_node_object['attributes']['direction'] = station_info.get('direction', '')
-                existing_node_object['attributes']['Firm_Highway_Number'] = station_info.get('Firm_Highway_Number', '')
-                existing_node_object['attributes']['seq'] = station_info.get('seq', '') # 更新seq
-
-            elif current_priority == existing_priority and current_xml_node_type_simplified == 't':
-                # 【同类型合并】如果都是换乘站，则合并 transferLines
-                log_message("NORMAL", "节点信息合并", 
-                            f"Merging transfer lines for existing node '{final_node_key}' (Type: 'T').", 
-                            f"合并节点 '{final_node_key}' (类型: 'T') 的换乘线路。")
-                if 'shmetro-osysi' in existing_node_object['attributes'] and \
-                   'transferLines' in existing_node_object['attributes']['shmetro-osysi']:
-                    for i in range(1, 7):
-                        transfer_line_key = f"transfer_line_{i}"
-                        if transfer_line_key in station_info and station_info[transfer_line_key] and \
-                           station_info[transfer_line_key] not in existing_node_object['attributes']['shmetro-osysi']['transferLines']:
-                            existing_node_object['attributes']['shmetro-osysi']['transferLines'].append(station_info[transfer_line_key])
-                
-                # 可以选择性更新其他通用属性，这里选择以最新数据为准
-                existing_node_object['attributes']['color'] = station_info.get('color', '')
-                existing_node_object['attributes']['direction'] = station_info.get('direction', '')
-                existing_node_object['attributes']['Firm_Highway_Number'] = station_info.get('Firm_Highway_Number', '')
-                existing_node_object['attributes']['seq'] = station_info.get('seq', '') # 更新seq
-
-            else:
-                # 【类型保持不变】当前优先级低于或等于现有优先级（且非T同类型合并）
-                log_message("NORMAL", "节点去重 (坐标)", 
-                            f"Skipping node update for key '{final_node_key}' as current type '{current_xml_node_type_simplified}' is not higher priority than '{existing_node_type_in_json_simplified}'.", 
-                            f"由于当前类型 '{current_xml_node_type_simplified}' 优先级不高于现有类型 '{existing_node_type_in_json_simplified}'，跳过节点 '{final_node_key}' 的更新。")
-            
-            # 无论是否更新节点对象，都需要更新 original_xml_id 到 final_node_key 的映射
-            node_id_to_key_map[original_xml_id] = final_node_key
-            # 更新 seen_svg_coords_info 中的 info，以便存储最新的原始数据或合并后的状态
-            seen_svg_coords_info[base_node_id_from_coords]['data'] = station_info # 存储当前行数据作为参考
-            seen_svg_coords_info[base_node_id_from_coords]['line_color'] = line_color_for_edge
-            seen_svg_coords_info[base_node_id_from_coords]['zh_name'] = station_name_zh
-            seen_svg_coords_info[base_node_id_from_coords]['en_name'] = station_name_en
-
-            # 跳过本次循环的节点创建部分，直接进入边生成逻辑
-            continue # 确保不重复添加节点
-        
-        # 如果是新的SVG坐标，则创建新节点
-        node_to_add = None 
-
-        # 根据当前XML类型选择对应的模板，并填充数据
-        node_full_type_name = get_full_node_type_name(current_xml_node_type_simplified)
-
-        if current_xml_node_type_simplified == 'v':
-            node_to_add = copy.deepcopy(node_templates.get('V'))
-            if node_to_add:
-                node_to_add['key'] = final_node_key # 带有前缀的key
-                node_to_add['attributes']['id'] = original_xml_id
-                node_to_add['attributes']['virtual'] = {}
-            else:
-                node_to_add = {
-                    "key": final_node_key, "attributes": { "visible": True, "zIndex": 0, "x": 0, "y": 0, "type": "virtual", "virtual": {}, "id": original_xml_id }
-                }
-            node_to_add['attributes']['type'] = node_full_type_name
-
-        elif current_xml_node_type_simplified == 's':
-            node_to_add = copy.deepcopy(node_templates.get('S'))
-            if node_to_add:
-                node_to_add['key'] = final_node_key # 带有前缀的key
-                node_to_add['attributes']['shmetro-basic']['names'] = [station_name_zh, station_name_en]
-            else:
-                node_to_add = {
-                    "key": final_node_key, "attributes": { "visible": True, "zIndex": 0, "x": 0, "y": 0, "type": "shmetro-basic", "shmetro-basic": {"names": ["", ""], "nameOffsetX": "right", "nameOffsetY": "top"} }
-                }
-            node_to_add['attributes']['type'] = node_full_type_name
-
-        elif current_xml_node_type_simplified == 't':
-            node_to_add = copy.deepcopy(node_templates.get('T'))
-            if node_to_add:
-                node_to_add['key'] = final_node_key # 带有前缀的key
-                node_to_add['attributes']['shmetro-osysi']['names'] = [station_name_zh, station_name_en]
-                if 'line_transfer_info' in node_to_add['attributes']: del node_to_add['attributes']['line_transfer_info']
-            else:
-                node_to_add = {
-                    "key": final_node_key, "attributes": { "visible": True, "zIndex": 0, "x": 0, "y": 0, "type": "shmetro-osysi", "shmetro-osysi": {"names": ["", ""], "nameOffsetX": "right", "nameOffsetY": "top"} }
-                }
-            node_to_add['attributes']['type'] = node_full_type_name
-
-            # 添加换乘线路信息 (transfer_line_1 到 transfer_line_6)
-            if 'shmetro-osysi' in node_to_add['attributes']:
-                for i in range(1, 7):
-                    transfer_line_key = f"transfer_line_{i}"
-                    if transfer_line_key in station_info and station_info[transfer_line_key]:
-                        if "transferLines" not in node_to_add["attributes"]["shmetro-osysi"]:
-                            node_to_add["attributes"]["shmetro-osysi"]["transferLines"] = []
-                        node_to_add["attributes"]["shmetro-osysi"]["transferLines"].append(station_info[transfer_line_key])
-
-        else: # 未知或空类型，默认为普通站点 'shmetro-basic'
-            log_message("WARNING", "处理错误", 
-                        f"Station '{station_name_zh or line_name}_{seq}' has unknown or empty type '{current_xml_node_type_raw}'. Defaulting to 'shmetro-basic'.", 
-                        f"站点 '{station_name_zh or line_name}_{seq}' 类型 '{current_xml_node_type_raw}' 未知或为空。默认为 'shmetro-basic' 类型。")
-            node_to_add = copy.deepcopy(node_templates.get('S')) if node_templates.get('S') else {
-                "key": final_node_key, "attributes": { "visible": True, "zIndex": 0, "x": 0, "y": 0, "type": "shmetro-basic", "shmetro-basic": {"names": ["", ""], "nameOffsetX": "right", "nameOffsetY": "top"} }
-            }
-            node_to_add['attributes']['type'] = 'shmetro-basic' # Fallback to full type name
-            node_to_add['attributes']['shmetro-basic']['names'] = [station_name_zh, station_name_en] # Fixed: station_en_name to station_name_en
-
-        # 确保移除不必要的reconcileId (如果模板中存在)
-        if 'reconcileId' in node_to_add['attributes']: del node_to_add['attributes']['reconcileId']
-
-        # 设置节点的x, y坐标为转换后的SVG坐标
-        node_to_add['attributes']['x'] = svg_x
-        node_to_add['attributes']['y'] = svg_y
-
-        # 添加其他额外的属性，如果XML中存在
-        for key, value in station_info.items():
-            if key not in ['id', 'x', 'y', 'name', 'name_zh', 'name_en', 'type', 'color', 'direction', 'seq', 'Firm_Highway_Number', 'transfer_line_1', 'transfer_line_2', 'transfer_line_3', 'transfer_line_4', 'transfer_line_5', 'transfer_line_6']:
-                node_to_add["attributes"][key] = value
-
-        # 添加color, direction, seq, Firm_Highway_Number到attributes
-        node_to_add["attributes"]["color"] = station_info.get('color', '')
-        node_to_add["attributes"]["direction"] = station_info.get('direction', '')
-        node_to_add["attributes"]["seq"] = station_info.get('seq', '')
-        node_to_add["attributes"]["Firm_Highway_Number"] = station_info.get('Firm_Highway_Number', '')
-
-
-        new_nodes.append(node_to_add) # 将新创建的节点添加到列表中
-
-        log_message("NORMAL", "节点创建", 
-                    f"Created NEW node (based on SVG coords) for '{station_name_zh}' (Type: {node_to_add['attributes']['type']}, Key: {final_node_key}, SVG_X:{svg_x}, SVG_Y:{svg_y}). Original XML ID: {original_xml_id}",
-                    f"基于SVG坐标创建了新节点 '{station_name_zh}' (类型: {node_to_add['attributes']['type']}, 键: {final_node_key}, SVG_X:{svg_x}, SVG_Y:{svg_y})。原始XML ID: {original_xml_id}")
-
-        # 记录新创建的节点信息
-        seen_svg_coords_info[base_node_id_from_coords] = { # 用不带前缀的基础ID作为key
-            'node_object': node_to_add, # 存储对实际节点对象的引用
-            'data': station_info,
-            'line_color': line_color_for_edge,
-            'zh_name': station_name_zh,
-            'en_name': station_name_en
-        }
-        node_id_to_key_map[original_xml_id] = final_node_key # 将原始XML ID映射到最终节点key (带前缀)
-        
-    # --- 边生成逻辑 ---
-    # 重新遍历 actual_station_data_rows，这次只为生成边。
-    # 这样可以确保在生成边时，所有节点都已经被处理完毕，并且它们的类型和key都是最终确定的。
-    for station_info in actual_station_data_rows: 
-        line_name = station_info.get('name')
-        original_xml_id = station_info.get('id')
-        
-        # 为了确保边的颜色是正确的线路颜色，这里应该从 line_colors 字典中获取
-        # 或者从已经处理过的节点信息中获取 (如果节点颜色被优先级覆盖，则使用最终的节点颜色)
-        # 考虑到边的颜色通常代表线路本身，使用line_colors字典更合适。
-        current_line_color = line_colors.get(line_name, '#000000') # 优先使用线路标题中提取的颜色
-
-        if line_name not in last_station_info_by_line:
-            last_station_info_by_line[line_name] = None
-
-        if last_station_info_by_line[line_name] is not None:
-            prev_station_info = last_station_info_by_line[line_name]
-            
-            edge = copy.deepcopy(edge_template_from_model)
-            
-            prev_original_xml_id = prev_station_info.get('id')
-            current_original_xml_id = original_xml_id
-
-            # 从 node_id_to_key_map 中获取源节点和目标节点的最终key
-            source_node_key_for_edge = node_id_to_key_map.get(prev_original_xml_id)
-            target_node_key_for_edge = node_id_to_key_map.get(current_original_xml_id)
-
-            if source_node_key_for_edge and target_node_key_for_edge:
-                edge_key = f"line_{prev_original_xml_id}_{current_original_xml_id}" 
-                
-                edge['key'] = edge_key
-                edge['source'] = source_node_key_for_edge
-                edge['target'] = target_node_key_for_edge
-                
-                if 'single-color' not in edge['attributes']: edge['attributes']['single-color'] = {}
-                if 'color' not in edge['attributes']['single-color'] or not isinstance(edge['attributes']['single-color']['color'], list) or len(edge['attributes']['single-color']['color']) < 4:
-                    edge['attributes']['single-color']['color'] = ["other", "other", "#000000", "#FFFFFF"] 
-                
-                # 【核心修正】确保边的颜色使用线路的实际颜色
-                edge['attributes']['single-color']['color'][2] = current_line_color 
-                
-                if 'line_name' in edge['attributes']: del edge['attributes']['line_name']
-                if 'color' in edge['attributes']: del edge['attributes']['color']
-                
-                edge['attributes']['reconcileId'] = edge_key
-
-                new_edges.append(edge)
-                log_message("NORMAL", "边创建", 
-                            f"Created edge for '{line_name}' from {prev_station_info.get('name_zh', prev_station_info.get('name', ''))} (Key: {source_node_key_for_edge}) to {station_info.get('name_zh', line_name)} (Key: {target_node_key_for_edge}). Color: {current_line_color}", # Added color to log
-                            f"为线路 '{line_name}' 创建了从 {prev_station_info.get('name_zh', prev_station_info.get('name', ''))} (键: {source_node_key_for_edge}) 到 {station_info.get('name_zh', line_name)} (键: {target_node_key_for_edge}) 的边。颜色: {current_line_color}")
-            else:
-                log_message("WARNING", "边创建错误",
-                          f"Could not find source ({prev_original_xml_id}) or target ({current_original_xml_id}) node key for edge '{line_name}'. Skipping edge creation.",
-                          f"无法为线路 '{line_name}' 的边找到源 ({prev_original_xml_id}) 或目标 ({current_original_xml_id}) 节点的键。跳过边创建。")
-
-        # 更新当前线路的最后一个站点信息为当前处理的站点
-        last_station_info_by_line[line_name] = station_info 
+        station_table.set_svg_coords(*project_lonlat_arrays_to_svg(station_table.lons, station_table.lats, svg_projection))
+        project_stage.set_count("stations", len(station_table))
+
+    # 增量状态：只有转换器版本、模板、吸附容差和经纬度范围都与上次相同时，上次的节点和边才可以沿用
+    build_state = {
+        "converter_version": CONVERTER_VERSION,
+        "template_sha256": hashlib.sha256(json_template_content.encode('utf-8')).hexdigest(),
+        "snap_tolerance": snap_tolerance,
+        "bounds": [min_lon, max_lon, min_lat, max_lat]
+    }
+    previous_state = previous_build.get('state') if previous_build else None
+    patched_graph = None
+    if previous_state is None:
+        pass
+    elif snap_tolerance > 0:
+        log_message("INFO", "增量构建", "Snap tolerance is enabled; performing a full rebuild.", "已启用节点吸附，执行完整构建。")
+    elif any(previous_state.get(field) != build_state[field] for field in build_state):
+        log_message("INFO", "增量构建",
+                    "Converter version, template, snap tolerance or lon/lat bounds changed; performing a full rebuild.",
+                    "转换器版本、模板、吸附容差或经纬度范围发生变化，执行完整构建。")
+    else:
+        try:
+            with profiler.stage("incremental_patch") as patch_stage:
+                previous_graph = json_backend.loads(previous_build['json'])['graph']
+                patched_graph = _patch_changed_lines(station_table, node_factories, make_edge, line_colors,
+                                                     previous_graph, previous_state['lines'])
+                patch_stage.set_count("nodes", len(patched_graph[0]))
+                patch_stage.set_count("edges", len(patched_graph[1]))
+        except (KeyError, TypeError, ValueError) as e:
+            log_message("WARNING", "增量构建", f"Previous build is inconsistent ({type(e).__name__}: {e}); performing a full rebuild.",
+                        f"上次的构建结果不一致 ({type(e).__name__}: {e})，执行完整构建。")
+
+    if patched_graph is not None:
+        new_nodes, new_edges, line_states = patched_graph
+    else:
+        new_nodes, new_edges, line_states = _build_all_lines(station_table, node_factories, make_edge,
+                                                             line_colors, snap_tolerance, profiler)
+    build_state["lines"] = line_states
 
     # --- 最终JSON结构组装 ---
     json_data['graph']['nodes'] = new_nodes
@@ -730,44 +1274,523 @@ def process_highway_data(xml_content, json_template_content):
 
     log_message("INFO", "SVG参数", f"Calculated svgViewBoxMin.x: {json_data['svgViewBoxMin']['x']}", f"计算得到svgViewBoxMin.x: {json_data['svgViewBoxMin']['x']}")
     log_message("INFO", "SVG参数", f"Calculated svgViewBoxMin.y: {json_data['svgViewBoxMin']['y']}", f"计算得到svgViewBoxMin.y: {json_data['svgViewBoxMin']['y']}")
-    
-    return json.dumps(json_data, indent=4, ensure_ascii=False)
+
+    return json_data, build_state
+
+
+# --- 日志记录 (与主处理函数中的log_message区分开，用于独立运行模式) ---
+# 默认日志目录 (图形界面模式)，日志文件按日期命名
+DEFAULT_LOG_DIRECTORY = r"D:\map_maker\json_output\json_producer_logs"
+# 批处理模式未指定 --log-dir 时，日志写入输出目录下的该子目录
+CLI_LOG_SUBDIRECTORY = "json_producer_logs"
+# 默认最低日志级别。生产环境可设为 "INFO"，关闭逐节点/逐边的 NORMAL 级别详细日志。
+DEFAULT_LOG_LEVEL = "NORMAL"
+# 日志缓冲的条数上限，达到上限或出现 ERROR 级别日志时写入文件
+LOG_BUFFER_CAPACITY = 1000
+
+# 自定义的 NORMAL 级别 (介于 DEBUG 与 INFO 之间)，用于记录处理过程中的常规明细
+NORMAL_LEVEL = 15
+logging.addLevelName(NORMAL_LEVEL, "NORMAL")
+
+LOG_LEVELS = {
+    "NORMAL": NORMAL_LEVEL,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR
+}
+
+_logger = logging.getLogger("json_producer")
+_logger.propagate = False
+
+
+class BilingualLogFormatter(logging.Formatter):
+    """
+    按原有的中英双语格式输出日志条目：
+    [时间] Level: 级别, Type: 类型 / English Message / 中文解释
+    """
+    def format(self, record):
+        current_time = self.formatTime(record, "%Y-%m-%d %H:%M:%S")
+        return f"[{current_time}] Level: {record.levelname}, Type: {getattr(record, 'log_type', '')}\n" \
+               f"    English Message: {record.getMessage()}\n" \
+               f"    中文解释: {getattr(record, 'message_cn', '')}\n"
+
+
+def configure_logging(log_directory=None, min_level=DEFAULT_LOG_LEVEL, buffer_capacity=LOG_BUFFER_CAPACITY):
+    """
+    配置日志系统：日志文件只打开一次，日志条目先在内存中缓冲，再批量写入文件。
+    可重复调用以更换日志目录或最低级别，调用前已缓冲的日志会先写出。
+
+    参数:
+        log_directory (str): 日志目录，默认为 DEFAULT_LOG_DIRECTORY。
+        min_level (str): 最低记录级别，取值 "NORMAL"、"INFO"、"WARNING" 或 "ERROR"。
+        buffer_capacity (int): 缓冲的日志条数上限。
+    """
+    if min_level not in LOG_LEVELS:
+        raise ValueError(f"未知的日志级别: {min_level}，可选值: {', '.join(LOG_LEVELS)}")
+
+    shutdown_logging()
+
+    log_directory = log_directory or DEFAULT_LOG_DIRECTORY
+    try:
+        os.makedirs(log_directory, exist_ok=True)
+        today_date = datetime.datetime.now().strftime("%Y-%m-%d")
+        log_file_path = os.path.join(log_directory, f"JSON_producer_log_{today_date}.txt")
+        target_handler = logging.FileHandler(log_file_path, mode="a", encoding="utf-8")
+    except OSError as e:
+        # 无法创建日志目录或文件时，退回到控制台输出，避免丢失日志
+        print(f"ERROR: Failed to open log file in '{log_directory}': {e}. Logging to console instead.")
+        target_handler = logging.StreamHandler(sys.stderr)
+    target_handler.setFormatter(BilingualLogFormatter())
+
+    buffered_handler = logging.handlers.MemoryHandler(
+        buffer_capacity, flushLevel=logging.ERROR, target=target_handler
+    )
+    _logger.addHandler(buffered_handler)
+    _logger.setLevel(LOG_LEVELS[min_level])
+
+
+def flush_logs():
+    """
+    将缓冲区中的日志立即写入文件。
+    """
+    for handler in _logger.handlers:
+        handler.flush()
+
+
+def shutdown_logging():
+    """
+    写出缓冲的日志并关闭日志文件。程序退出时自动调用。
+    """
+    for handler in list(_logger.handlers):
+        handler.flush()
+        _logger.removeHandler(handler)
+        target_handler = getattr(handler, "target", None)
+        handler.close()
+        if target_handler is not None:
+            target_handler.close()
+
+
+atexit.register(shutdown_logging)
 
 
-# --- 日志记录函数 (与主处理函数中的log_message区分开，用于独立运行模式) ---
 def log_message(level, log_type, message_en, message_cn):
     """
     记录不同级别的日志信息到每日文件中。
-    日志文件将按日期命名，并存放在 D:\map_maker\output\logs 目录下。
+    首次调用时若尚未配置日志系统，则使用默认目录和默认级别进行配置。
+    低于最低级别的日志会被直接丢弃。
+    """
+    if not _logger.handlers:
+        configure_logging()
+
+    level_no = LOG_LEVELS.get(level, logging.INFO)
+    if _logger.isEnabledFor(level_no):
+        _logger.log(level_no, message_en, extra={"log_type": log_type, "message_cn": message_cn})
+
+
+# --- 文件转换 (图形界面与批处理模式共用) ---
+# 图形界面模式下JSON文件的输出目录
+DEFAULT_OUTPUT_DIRECTORY = r"D:\map_maker\json_output"
+
+# 批处理模式的退出码
+EXIT_OK = 0 # 全部转换成功
+EXIT_CONVERSION_FAILED = 1 # 至少有一个输入转换失败或不存在
+EXIT_USAGE_ERROR = 2 # 参数错误、模板不可用或没有任何输入
+
+
+# 按线路增量重建时，保存在输出JSON旁边的增量状态文件后缀
+LINE_STATE_SUFFIX = ".linestate.json"
+
+
+def convert_xml_file(xml_file_path, json_template_content, output_directory, snap_tolerance=DEFAULT_SNAP_TOLERANCE, incremental=False,
+                     json_format=DEFAULT_JSON_OUTPUT_FORMAT, compression=DEFAULT_JSON_COMPRESSION, json_backend_name=DEFAULT_JSON_BACKEND,
+                     profile=False, lod_tolerances=()):
+    """
+    将一个XML数据表 (或二进制中间文件 .npz) 转换为JSON文件，输出文件与输入文件同名 (扩展名为 .json，压缩时追加 .gz / .br)。
+
+    参数:
+        incremental (bool): 为 True 时读取上次的输出JSON和增量状态文件，只重建内容有变化的线路，
+                            并在输出JSON旁边保存新的增量状态文件。
+        json_format (str): 输出格式，'indent' (缩进4格) 或 'compact' (紧凑分隔符，无换行)。
+        compression (str): 输出压缩方式，'none'、'gzip' 或 'brotli'。
+        json_backend_name (str): JSON后端，'auto' (默认，优先 orjson，其次 ujson，最后标准库) 或指定的后端名称。
+        profile (bool): 为 True 时按阶段记录耗时、内存峰值和数据量，并将分析报告保存在输出JSON旁边 (追加 .profile.json)。
+        lod_tolerances (tuple): 多级细节 (LOD) 输出的简化容差 (SVG坐标单位)。不为空时每个容差另外输出一个删减了虚拟节点的
+                                简化JSON (<文件名>.lod<级别>.json)，并在输出JSON旁保存从粗到细列出各级文件的索引 (.lod.json)，
+                                见 lod_simplify.py。默认不输出。
+
+    返回:
+        str: 生成的JSON文件路径。
     """
-    log_directory = r"D:\map_maker\json_output\json_producer_logs" 
+    profiler = StageProfiler() if profile else NULL_PROFILER
+    base_xml_filename = os.path.splitext(os.path.basename(xml_file_path))[0]
+    output_file_name = _convert_rows_to_json_file(
+        iter_input_rows(xml_file_path), xml_file_path, base_xml_filename, json_template_content, output_directory,
+        snap_tolerance, incremental, json_format, compression, json_backend_name, profiler, lod_tolerances
+    )
+    if profiler.enabled:
+        report_file_name = profile_report_path(output_file_name)
+        profiler.write_report(report_file_name)
+        log_message("INFO", "性能分析", f"Stage profile report saved to: {report_file_name}", f"阶段性能分析报告已保存到: {report_file_name}")
+    return output_file_name
+
+
+def convert_points_to_json_file(points, output_name, json_template_content, output_directory, snap_tolerance=DEFAULT_SNAP_TOLERANCE,
+                                incremental=False, json_format=DEFAULT_JSON_OUTPUT_FORMAT, compression=DEFAULT_JSON_COMPRESSION,
+                                json_backend_name=DEFAULT_JSON_BACKEND, profiler=None, lod_tolerances=()):
+    """
+    与 convert_xml_file 相同，但直接转换内存中的点数据 (如 QGIS 导出的点数据)，不经过XML数据表。
+    输出内容与先导出XML再用 convert_xml_file 转换完全相同。
+
+    参数:
+        points (list): 点数据 (StationRecord 或 dict)，应已按 firm_workbook.export_sort_key 排序。
+        output_name (str): 输出文件名 (不含扩展名)，输出文件为 <output_name>.json (压缩时追加 .gz / .br)。
+        profiler (StageProfiler | None): 传入时在其中记录各阶段 (parse 到 serialize)，分析报告由调用方保存。
+        其他参数见 convert_xml_file。
+
+    返回:
+        str: 生成的JSON文件路径。
+    """
+    return _convert_rows_to_json_file(
+        iter_point_rows(points), output_name, output_name, json_template_content, output_directory,
+        snap_tolerance, incremental, json_format, compression, json_backend_name, profiler or NULL_PROFILER, lod_tolerances
+    )
+
+
+def _convert_rows_to_json_file(station_rows, source_label, output_name, json_template_content, output_directory, snap_tolerance,
+                               incremental, json_format, compression, json_backend_name, profiler, lod_tolerances=()):
+    """
+    将数据表行转换为JSON文件 (convert_xml_file 与 convert_points_to_json_file 共用)。
+
+    参数:
+        station_rows (iterable): iter_input_rows 或 iter_point_rows 产出的数据表行。
+        source_label (str): 数据来源 (如XML文件路径)，仅用于日志。
+        output_name (str): 输出文件名 (不含扩展名)。
+    """
+    json_backend = get_json_backend(json_backend_name)
+    os.makedirs(output_directory, exist_ok=True)
+    output_file_name = rmp_json_output_path(os.path.join(output_directory, output_name), compression)
+    # 不同压缩方式的输出文件各自对应一个增量状态文件
+    line_state_file_name = os.path.join(output_directory, f"{output_name}{JSON_COMPRESSION_SUFFIXES[compression]}{LINE_STATE_SUFFIX}")
+    lod_index_file_name = lod_index_path(os.path.join(output_directory, f"{output_name}{JSON_COMPRESSION_SUFFIXES[compression]}"))
+
+    previous_build = None
+    if incremental and os.path.isfile(output_file_name) and os.path.isfile(line_state_file_name):
+        try:
+            previous_json_string = read_rmp_json_text(output_file_name)
+            with open(line_state_file_name, 'r', encoding='utf-8') as f:
+                previous_build = {'json': previous_json_string, 'state': json.load(f)}
+        except (OSError, ValueError, EOFError, RuntimeError) as e:
+            log_message("WARNING", "增量构建", f"Ignoring unreadable previous build for '{source_label}': {e}", f"上次的构建结果无法读取，将完整构建 '{source_label}': {e}")
+
+    log_message("NORMAL", "处理开始", f"Starting data processing from XML to JSON: {source_label}", f"开始将XML数据处理为JSON: {source_label}")
+    json_data, build_state = _build_graph_data_from_rows(station_rows, json_template_content, snap_tolerance=snap_tolerance,
+                                                         previous_build=previous_build, json_backend=json_backend, profiler=profiler)
+    log_message("NORMAL", "处理完成", f"Data processing completed successfully: {source_label}", f"数据处理成功完成: {source_label}")
+
+    # 逐个节点、逐条边写出，不再先生成整个文件的字符串
+    with profiler.stage("serialize") as serialize_stage:
+        write_rmp_json(json_data, output_file_name, json_format, compression, json_backend)
+        serialize_stage.set_count("bytes", os.path.getsize(output_file_name))
+    log_message("NORMAL", "操作成功", f"JSON file successfully generated and saved to: {output_file_name}", f"JSON文件已成功生成并保存到: {output_file_name}")
+
+    if lod_tolerances:
+        with profiler.stage("lod") as lod_stage:
+            lod_levels = write_lod_files(json_data, output_file_name, lod_index_file_name, lod_tolerances, json_format, compression, json_backend)
+            lod_stage.set_count("levels", len(lod_levels))
+        for lod_level in lod_levels:
+            log_message("NORMAL", "LOD输出",
+                        f"LOD level {lod_level['level']} (tolerance {lod_level['tolerance']}): {lod_level['nodes']} nodes, {lod_level['edges']} edges -> {lod_level['file']}",
+                        f"LOD 第 {lod_level['level']} 级 (容差 {lod_level['tolerance']}): {lod_level['nodes']} 个节点，{lod_level['edges']} 条边 -> {lod_level['file']}")
+    else:
+        # 未要求LOD输出时，删除上次留下的各级文件，避免前端加载到与新输出不一致的简化图
+        remove_lod_files(lod_index_file_name)
+
+    if incremental:
+        with open(line_state_file_name, "w", encoding="utf-8") as f:
+            json.dump(build_state, f, ensure_ascii=False)
+    elif os.path.isfile(line_state_file_name):
+        # 非增量转换后，旧的增量状态已与新的输出JSON不一致，必须删除
+        os.remove(line_state_file_name)
+    return output_file_name
+
+
+# --- 增量构建清单 ---
+# 转换器版本号。修改任何会影响输出JSON内容的逻辑时必须递增，使已有的构建清单全部失效。
+CONVERTER_VERSION = "4c.1"
+# 构建清单文件名，保存在输出目录中
+BUILD_MANIFEST_FILENAME = ".json_producer_manifest.json"
+
+
+def compute_file_sha256(file_path, chunk_size=1 << 20):
+    """
+    分块计算文件内容的 SHA256 值 (十六进制字符串)。
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def load_build_manifest(output_directory):
+    """
+    读取输出目录中的构建清单。清单不存在或已损坏时返回空清单 (即全部重新构建)。
+
+    返回:
+        dict: {XML绝对路径: {'xml_sha256', 'template_sha256', 'converter_version', 'options', 'output'}}
+    """
+    manifest_path = os.path.join(output_directory, BUILD_MANIFEST_FILENAME)
     try:
-        os.makedirs(log_directory, exist_ok=True) 
-    except OSError as e:
-        print(f"ERROR: Failed to create log directory '{log_directory}': {e}")
-        print(f"Original Log Message (failed to write to file): [{level}] {log_type} - EN: {message_en} | CN: {message_cn}")
-        return 
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        log_message("WARNING", "构建清单", f"Ignoring unreadable build manifest '{manifest_path}': {e}", f"构建清单 '{manifest_path}' 无法读取，将全部重新构建: {e}")
+        return {}
+    return manifest.get("entries", {}) if isinstance(manifest, dict) else {}
+
+
+def save_build_manifest(output_directory, entries):
+    """
+    将构建清单写入输出目录。先写临时文件再替换，避免中断时留下损坏的清单。
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    manifest_path = os.path.join(output_directory, BUILD_MANIFEST_FILENAME)
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({"converter_version": CONVERTER_VERSION, "entries": entries}, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+
+def make_build_manifest_entry(xml_sha256, template_sha256, options, output_file_name):
+    """
+    生成一条构建清单记录。options 为所有会影响输出内容的转换参数。
+    """
+    return {
+        "xml_sha256": xml_sha256,
+        "template_sha256": template_sha256,
+        "converter_version": CONVERTER_VERSION,
+        "options": options,
+        "output": os.path.abspath(output_file_name)
+    }
 
-    today_date = datetime.datetime.now().strftime("%Y-%m-%d") 
-    log_file_name = f"JSON_producer_log_{today_date}.txt"
-    log_file_path = os.path.join(log_directory, log_file_name)
 
-    current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S") 
+def is_build_up_to_date(manifest_entry, expected_entry):
+    """
+    判断清单中的记录是否与本次构建的输入完全一致，且上次生成的JSON文件仍然存在。
+    """
+    if not manifest_entry:
+        return False
+    return manifest_entry == expected_entry and os.path.isfile(manifest_entry["output"])
 
-    log_entry = f"[{current_time}] Level: {level}, Type: {log_type}\n" \
-                f"    English Message: {message_en}\n" \
-                f"    中文解释: {message_cn}\n\n"
 
+def _convert_xml_file_task(task):
+    """
+    批处理模式下在工作进程中执行的单个转换任务。异常不向外抛出，而是作为错误信息返回。
+
+    返回:
+        tuple: (xml_file_path, output_file_path 或 None, 错误信息 或 None)
+    """
+    (xml_file_path, json_template_content, output_directory, snap_tolerance, incremental, json_format, compression, json_backend_name,
+     profile, lod_tolerances) = task
     try:
-        with open(log_file_path, "a", encoding="utf-8") as f: 
-            f.write(log_entry)
+        output_file_name = convert_xml_file(xml_file_path, json_template_content, output_directory, snap_tolerance, incremental,
+                                            json_format, compression, json_backend_name, profile, lod_tolerances)
+        return xml_file_path, output_file_name, None
     except Exception as e:
-        print(f"Failed to write log to file '{log_file_path}': {e}")
-        print(f"Original Log Message (failed to write to file): {log_entry}")
+        error_msg_en = f"Failed to convert '{xml_file_path}': {type(e).__name__} - {e}"
+        error_msg_cn = f"转换 '{xml_file_path}' 失败: {type(e).__name__} - {e}"
+        log_message("ERROR", "批处理错误", error_msg_en, error_msg_cn)
+        return xml_file_path, None, error_msg_cn
+    finally:
+        flush_logs()
 
 
-# --- 文件选择和执行逻辑 ---
-if __name__ == "__main__":
+def collect_xml_inputs(input_specs):
+    """
+    将命令行给出的输入 (XML文件、目录或通配符) 展开为XML文件列表，保持给出顺序并去重。
+    目录只收集其中直接包含的 *.xml 文件和二进制中间文件 (*.npz)。
+
+    返回:
+        tuple: (xml_file_paths, unmatched_specs)
+    """
+    xml_file_paths = []
+    unmatched_specs = []
+    seen_paths = set()
+    for input_spec in input_specs:
+        if os.path.isdir(input_spec):
+            matched_paths = sorted(glob.glob(os.path.join(input_spec, "*.xml")) + glob.glob(os.path.join(input_spec, f"*{STATION_NPZ_EXTENSION}")))
+        elif glob.has_magic(input_spec):
+            matched_paths = sorted(path for path in glob.glob(input_spec, recursive=True) if os.path.isfile(path))
+        else:
+            matched_paths = [input_spec] if os.path.isfile(input_spec) else []
+
+        if not matched_paths:
+            unmatched_specs.append(input_spec)
+        for path in matched_paths:
+            normalized_path = os.path.abspath(path)
+            if normalized_path not in seen_paths:
+                seen_paths.add(normalized_path)
+                xml_file_paths.append(path)
+    return xml_file_paths, unmatched_specs
+
+
+def build_argument_parser():
+    """
+    构建命令行参数解析器。不带任何参数运行时进入图形界面模式。
+    """
+    parser = argparse.ArgumentParser(
+        description="将 SpreadsheetML (Excel XML) 数据表或二进制中间文件 (.npz) 批量转换为 RMP JSON 地图文件。"
+                    "不带任何参数运行时打开图形界面的文件选择对话框。"
+    )
+    parser.add_argument("inputs", nargs="*", help="XML文件 (或二进制中间文件 .npz)、包含这些文件的目录或通配符 (如 'exports/*.xml')")
+    parser.add_argument("-t", "--template", help="JSON模板文件路径 (批处理模式必填)")
+    parser.add_argument("-o", "--output-dir", help="JSON输出目录 (批处理模式必填)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="并行转换的进程数 (默认: CPU核心数)")
+    parser.add_argument("--snap-tolerance", type=float, default=DEFAULT_SNAP_TOLERANCE,
+                        help="节点吸附容差 (SVG坐标单位)，默认仅合并坐标完全相同的站点")
+    parser.add_argument("--log-dir", help=f"日志目录 (默认: 输出目录下的 {CLI_LOG_SUBDIRECTORY})")
+    parser.add_argument("--log-level", default=DEFAULT_LOG_LEVEL, choices=list(LOG_LEVELS), help="最低日志级别")
+    parser.add_argument("-f", "--force", action="store_true", help="忽略构建清单，强制重新转换所有输入")
+    parser.add_argument("-i", "--incremental", action="store_true",
+                        help="按线路增量重建：只重新计算内容有变化的线路，并在输出JSON旁保存增量状态文件")
+    parser.add_argument("--json-format", default=DEFAULT_JSON_OUTPUT_FORMAT, choices=JSON_OUTPUT_FORMATS,
+                        help="输出JSON格式：indent 为缩进4格 (默认)，compact 为紧凑格式 (无换行和缩进，文件更小、加载更快)")
+    parser.add_argument("--compress", default=DEFAULT_JSON_COMPRESSION, choices=list(JSON_COMPRESSION_SUFFIXES),
+                        help="输出压缩方式 (默认不压缩)；gzip / brotli 分别输出 .json.gz / .json.br，brotli 需要安装 brotli 模块")
+    parser.add_argument("--json-backend", default=DEFAULT_JSON_BACKEND, choices=('auto',) + JSON_BACKEND_NAMES,
+                        help="JSON解析/编码后端 (默认 auto：已安装时优先使用 orjson，其次 ujson，否则使用标准库 json)")
+    parser.add_argument("--profile", action="store_true",
+                        help="按阶段记录耗时、内存峰值和数据量，并在每个输出JSON旁保存分析报告 (.profile.json)；"
+                             "与 --force 相同，忽略构建清单重新转换所有输入；记录内存会使转换变慢")
+    parser.add_argument("--lod-tolerances",
+                        help="多级细节 (LOD) 输出：逗号分隔的简化容差 (SVG坐标单位，如 '8,2,0.5')，每个容差另外输出一个删减了虚拟节点的"
+                             "简化JSON，并保存从粗到细列出各级文件的索引 (.lod.json)，供前端先加载粗略的图再逐级细化")
+    parser.add_argument("--gui", action="store_true", help="强制使用图形界面模式")
+    return parser
+
+
+def run_cli(args):
+    """
+    无界面批处理模式：在进程池中并行转换所有输入XML文件。
+
+    返回:
+        int: 退出码 (EXIT_OK / EXIT_CONVERSION_FAILED / EXIT_USAGE_ERROR)。
+    """
+    if not args.template or not args.output_dir:
+        print("错误: 批处理模式需要同时指定 --template 和 --output-dir。", file=sys.stderr)
+        return EXIT_USAGE_ERROR
+    if args.jobs < 1:
+        print("错误: --jobs 必须大于等于 1。", file=sys.stderr)
+        return EXIT_USAGE_ERROR
+
+    # 默认日志目录跟随输出目录，不使用图形界面模式的 Windows 路径
+    log_directory = args.log_dir or os.path.join(args.output_dir, CLI_LOG_SUBDIRECTORY)
+    configure_logging(log_directory, args.log_level)
+
+    try:
+        with open(args.template, 'r', encoding='utf-8') as f: 
+            json_template_content = f.read()
+        json.loads(json_template_content)
+    except (OSError, json.JSONDecodeError) as e:
+        log_message("ERROR", "文件错误", f"JSON template is not usable: {args.template}: {e}", f"JSON模板文件不可用: {args.template}: {e}")
+        print(f"错误: JSON模板文件不可用: {args.template}: {e}", file=sys.stderr)
+        return EXIT_USAGE_ERROR
+
+    xml_file_paths, unmatched_specs = collect_xml_inputs(args.inputs)
+    for input_spec in unmatched_specs:
+        log_message("ERROR", "文件错误", f"No XML file matches input: {input_spec}", f"没有与输入匹配的XML文件: {input_spec}")
+        print(f"错误: 没有与输入匹配的XML文件: {input_spec}", file=sys.stderr)
+    if not xml_file_paths:
+        return EXIT_USAGE_ERROR
+
+    # 输出文件按XML文件名命名，不同目录下的同名XML会互相覆盖
+    output_names = {}
+    for xml_file_path in xml_file_paths:
+        base_xml_filename = os.path.splitext(os.path.basename(xml_file_path))[0]
+        if base_xml_filename in output_names:
+            print(f"错误: '{xml_file_path}' 与 '{output_names[base_xml_filename]}' 会输出到同一个JSON文件。", file=sys.stderr)
+            return EXIT_USAGE_ERROR
+        output_names[base_xml_filename] = xml_file_path
+
+    try:
+        json_backend_name = get_json_backend(args.json_backend).name
+    except RuntimeError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return EXIT_USAGE_ERROR
+
+    try:
+        lod_tolerances = parse_lod_tolerances(args.lod_tolerances) if args.lod_tolerances else ()
+    except ValueError as e:
+        print(f"错误: --lod-tolerances 无效: {e}", file=sys.stderr)
+        return EXIT_USAGE_ERROR
+
+    # 增量构建：XML内容、模板内容、转换器版本和转换参数都未变化，且上次的输出仍存在时跳过该输入
+    manifest_entries = load_build_manifest(args.output_dir)
+    template_sha256 = compute_file_sha256(args.template)
+    # 不同JSON后端的输出只可能在空白和浮点数书写形式上不同，但仍记录实际使用的后端
+    build_options = {"snap_tolerance": args.snap_tolerance, "json_format": args.json_format, "compression": args.compress,
+                     "json_backend": json_backend_name}
+    if lod_tolerances:
+        # 只在启用时记录，不使用LOD输出时已有的构建清单仍然有效
+        build_options["lod_tolerances"] = list(lod_tolerances)
+    expected_entries = {}
+    tasks = []
+    skipped_count = 0
+    for xml_file_path in xml_file_paths:
+        base_xml_filename = os.path.splitext(os.path.basename(xml_file_path))[0]
+        expected_entry = make_build_manifest_entry(
+            compute_file_sha256(xml_file_path), template_sha256, build_options,
+            rmp_json_output_path(os.path.join(args.output_dir, base_xml_filename), args.compress)
+        )
+        manifest_key = os.path.abspath(xml_file_path)
+        expected_entries[manifest_key] = expected_entry
+        # 性能分析需要实际执行转换，与 --force 相同不跳过未变化的输入
+        if not (args.force or args.profile) and is_build_up_to_date(manifest_entries.get(manifest_key), expected_entry):
+            skipped_count += 1
+            log_message("INFO", "增量构建", f"Skipping unchanged input: {xml_file_path}", f"输入未变化，跳过: {xml_file_path}")
+            print(f"跳过 (未变化): {xml_file_path}")
+            continue
+        tasks.append((xml_file_path, json_template_content, args.output_dir, args.snap_tolerance, args.incremental,
+                      args.json_format, args.compress, json_backend_name, args.profile, lod_tolerances))
+
+    worker_count = max(1, min(args.jobs, len(tasks)))
+    if worker_count == 1:
+        results = [_convert_xml_file_task(task) for task in tasks]
+    else:
+        flush_logs()
+        with ProcessPoolExecutor(max_workers=worker_count, initializer=configure_logging,
+                                 initargs=(log_directory, args.log_level)) as executor:
+            results = list(executor.map(_convert_xml_file_task, tasks))
+
+    converted_count = 0
+    for xml_file_path, output_file_name, error_msg in results:
+        manifest_key = os.path.abspath(xml_file_path)
+        if error_msg is None:
+            converted_count += 1
+            manifest_entries[manifest_key] = expected_entries[manifest_key]
+            print(f"完成: {xml_file_path} -> {output_file_name}")
+        else:
+            # 转换失败的输入从清单中移除，下次一定重新构建
+            manifest_entries.pop(manifest_key, None)
+            print(f"失败: {error_msg}", file=sys.stderr)
+    if results:
+        save_build_manifest(args.output_dir, manifest_entries)
+
+    failed_count = len(results) - converted_count
+    print(f"共 {len(xml_file_paths)} 个文件，成功 {converted_count} 个，跳过 {skipped_count} 个，失败 {failed_count} 个，"
+          f"未匹配的输入 {len(unmatched_specs)} 个。")
+    return EXIT_OK if failed_count == 0 and not unmatched_specs else EXIT_CONVERSION_FAILED
+
+
+def run_gui():
+    """
+    图形界面模式：通过文件选择对话框选择XML与JSON模板，结果以消息框提示。
+    """
+    import tkinter as tk # 仅在图形界面模式下导入Tkinter
+    from tkinter import filedialog, messagebox
+
     root = tk.Tk()
     root.withdraw()
 
@@ -776,13 +1799,13 @@ if __name__ == "__main__":
     try:
         xml_file_path = filedialog.askopenfilename(
             title="请选择 XML数据表 (Excel XML)", 
-            filetypes=[("XML files", "*.xml")],
+            filetypes=[("XML files", "*.xml"), ("FIRM binary files", f"*{STATION_NPZ_EXTENSION}")],
             initialdir=current_dir
         )
         if not xml_file_path: 
             messagebox.showinfo("取消", "XML文件选择已取消。")
             log_message("NORMAL", "用户行为", "XML file selection cancelled by user.", "用户取消了XML文件选择。")
-            exit()
+            return
 
         json_template_path = filedialog.askopenfilename(
             title="请选择 JSON模板文件", 
@@ -792,33 +1815,30 @@ if __name__ == "__main__":
         if not json_template_path: 
             messagebox.showinfo("取消", "JSON模板文件选择已取消。")
             log_message("NORMAL", "用户行为", "JSON template file selection cancelled by user.", "用户取消了JSON模板文件选择。")
-            exit()
+            return
 
         if not os.path.exists(xml_file_path):
             error_msg_en = f"XML file not found: {xml_file_path}"
             error_msg_cn = f"XML文件不存在: {xml_file_path}"
             log_message("ERROR", "文件错误", error_msg_en, error_msg_cn)
             messagebox.showerror("文件错误", error_msg_cn)
-            exit()
+            return
         if not os.path.exists(json_template_path):
             error_msg_en = f"JSON template file not found: {json_template_path}"
             error_msg_cn = f"JSON模板文件不存在: {json_template_path}"
             log_message("ERROR", "文件错误", error_msg_en, error_msg_cn)
             messagebox.showerror("文件错误", error_msg_cn)
-            exit()
+            return
 
-        with open(xml_file_path, 'r', encoding='utf-8') as f: 
-            xml_content = f.read()
-            log_message("NORMAL", "文件读取", f"Successfully read XML file: {xml_file_path}", f"成功读取XML文件: {xml_file_path}")
         with open(json_template_path, 'r', encoding='utf-8') as f: 
             json_template_content = f.read()
             log_message("NORMAL", "文件读取", f"Successfully read JSON template file: {json_template_path}", f"成功读取JSON模板文件: {json_template_path}") # Fixed this line in logging
 
         log_message("NORMAL", "处理开始", "Starting data processing from XML to JSON.", "开始将XML数据处理为JSON。")
-        output_json_string = process_highway_data(xml_content, json_template_content)
+        json_data, _ = build_highway_graph_data(xml_file_path, json_template_content)
         log_message("NORMAL", "处理完成", "Data processing completed successfully.", "数据处理成功完成。")
         
-        output_directory = r"D:\map_maker\json_output"
+        output_directory = DEFAULT_OUTPUT_DIRECTORY
         
         if not os.path.exists(output_directory):
             try:
@@ -829,16 +1849,15 @@ if __name__ == "__main__":
                 error_msg_cn = f"创建输出文件夹 '{output_directory}' 失败: {e}"
                 log_message("ERROR", "输出文件夹创建错误", error_msg_en, error_msg_cn)
                 messagebox.showerror("输出文件夹错误", error_msg_cn)
-                exit()
+                return
         else:
             log_message("NORMAL", "目录检查", f"Output directory already exists: {output_directory}", f"输出目录已存在: {output_directory}")
 
         base_xml_filename = os.path.splitext(os.path.basename(xml_file_path))[0]
-        output_file_name = os.path.join(output_directory, f"{base_xml_filename}.json")
-        
-        with open(output_file_name, "w", encoding="utf-8") as f: 
-            f.write(output_json_string)
-            log_message("NORMAL", "操作成功", f"JSON file successfully generated and saved to: {output_file_name}", f"JSON文件已成功生成并保存到: {output_file_name}")
+        output_file_name = rmp_json_output_path(os.path.join(output_directory, base_xml_filename))
+
+        write_rmp_json(json_data, output_file_name)
+        log_message("NORMAL", "操作成功", f"JSON file successfully generated and saved to: {output_file_name}", f"JSON文件已成功生成并保存到: {output_file_name}")
         
         messagebox.showinfo("完成", f"JSON文件已成功生成并保存到:\n{output_file_name}")
 
@@ -868,3 +1887,18 @@ if __name__ == "__main__":
         log_message("ERROR", "未处理错误", error_msg_en, error_msg_cn) # Fixed: error_cn to error_msg_cn
         messagebox.showerror("错误", error_msg_cn)
 
+
+def main(argv=None):
+    """
+    程序入口：不带参数 (或带 --gui) 时进入图形界面模式，否则进入无界面批处理模式。
+    """
+    args = build_argument_parser().parse_args(argv)
+    if args.gui or not (args.inputs or args.template or args.output_dir):
+        run_gui()
+        return EXIT_OK
+    return run_cli(args)
+
+
+# --- 文件选择和执行逻辑 ---
+if __name__ == "__main__":
+    sys.exit(main())
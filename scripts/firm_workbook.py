@@ -0,0 +1,361 @@
+"""
+FIRM SpreadsheetML 数据表的写出 (qgis_xml_producer_V2a.py 使用)。
+
+数据表的列定义、样式和行结构与 FIRM_XML_3.xml (WPS Excel 导出) 一致，Highway_map_JSON_producer_4c.py 读取的就是这种格式。
+iter_point_rows 给出点数据写出后再读回的数据表行，不经过XML的转换 (内存中直接转换、二进制中间格式 station_npz.py) 都以它为准。
+本模块不依赖 QGIS：除 QGIS 导出外，基准测试生成合成数据时也使用它写出数据表。
+"""
+from datetime import datetime
+import os
+import re
+
+from seq_keys import qgis_seq_sort_key
+from spreadsheet_xml_writer import SpreadsheetXmlWriter, escape_xml_text, format_start_tag
+from station_record import StationRecord
+
+# 定义所有预期列的名称和它们在最终 XML 中的固定 1-based 索引。
+# 这是严格按照 FIRM_XML_3.xml 模板的结构来定义的，确保列顺序和数量正确。
+XML_HEADER_DEFINITIONS = [
+    ("name", 1), ("color", 2), ("direction", 3), ("seq", 4), ("type", 5),
+    ("name_zh", 6), ("name_en", 7), ("x", 8), ("y", 9), ("id", 10)
+]
+# 动态生成 transfer_line_X 列的定义 (11-16)。
+# 这里固定生成到 transfer_line_6，以匹配 WPS 导出的 XML 结构。
+XML_HEADER_DEFINITIONS += [(f"transfer_line_{i}", 10 + i) for i in range(1, 7)]
+# 添加 Firm_Highway_Number 列的定义 (17)。
+XML_HEADER_DEFINITIONS.append(("Firm_Highway_Number", 17))
+# 导出到 XML 的全部列名
+XML_HEADER_NAMES = frozenset(header_name for header_name, _ in XML_HEADER_DEFINITIONS)
+# 核心列 (name 到 id)：即使为空也生成 Cell 标签；其他列为空时跳过
+XML_CORE_HEADER_NAMES = frozenset(header_name for header_name, column_index in XML_HEADER_DEFINITIONS if 1 <= column_index <= 10)
+
+# 线路标题行的文本格式：线路名称: <线路名称> (颜色: <#颜色>, 方向: <方向>)
+LINE_TITLE_PATTERN = re.compile(r'线路名称:\s*([^ ]+)\s*\(颜色:\s*(#[0-9a-fA-F]+)')
+
+
+def export_sort_key(point_data):
+    """
+    定义最终导出顺序的排序键：首先按线路名称，然后按序列号。
+    这确保了 XML 中数据的组织结构是逻辑和可预测的。
+    """
+    name = point_data.get('name', '')
+    seq = point_data.get('seq', '')
+    # 使用 qgis_seq_sort_key 确保正确的数字和文本混合排序，并且始终返回元组
+    return (name, qgis_seq_sort_key(seq))
+
+
+def format_line_title(point_data):
+    """线路标题行的文本，由该线路的第一个点 (按导出顺序) 的线路名称、颜色和方向组成。"""
+    return (
+        f"线路名称: {point_data.get('name')} "
+        f"(颜色: {point_data.get('color', '') or ''}, "
+        f"方向: {point_data.get('direction', '') or ''})"
+    )
+
+
+def parse_line_title(line_title_text):
+    """
+    从线路标题行的文本 (如 "线路名称: G15 (颜色: #E3002B, 方向: SN)") 中提取线路名称和颜色。
+
+    返回:
+        tuple | None: (线路名称, 线路颜色)，文本不是线路标题时为 None。
+    """
+    match = LINE_TITLE_PATTERN.search(line_title_text)
+    if match:
+        return match.group(1).strip(), match.group(2).strip()
+    return None
+
+
+def _xml_text_round_trip(text):
+    """文本写入XML元素再读回后的结果：XML解析器会把未转义的回车 (\\r\\n 与单独的 \\r) 规范化为换行。"""
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def iter_point_rows(points):
+    """
+    不经过XML，直接产出点数据对应的数据表行。产出的内容与用 Highway_map_JSON_producer_4c.iter_spreadsheet_rows 读取
+    write_firm_workbook(points) 写出的数据表完全相同 (包括线路标题行、空列的省略和文本的去空白)，
+    因此转换结果与先导出XML再转换的结果一致。
+
+    参数:
+        points (list): 点数据 (StationRecord 或 dict，如 QGIS 导出的点数据)，应已按 export_sort_key 排序。
+
+    产出:
+        tuple: 与 iter_spreadsheet_rows 相同的 ('header', header_names)、('line', line_name, line_color)、('station', station_info)。
+    """
+    yield ('header', {column_index: header_name for header_name, column_index in XML_HEADER_DEFINITIONS})
+
+    last_line_name = None
+    for point_data in points:
+        # 线路名称变化时，数据表中先有一行线路标题行
+        current_line_name = point_data.get('name')
+        if current_line_name != last_line_name:
+            line_title = parse_line_title(_xml_text_round_trip(format_line_title(point_data)).strip())
+            if line_title:
+                yield ('line',) + line_title
+            last_line_name = current_line_name
+
+        station_info = StationRecord()
+        for header_name, _ in XML_HEADER_DEFINITIONS:
+            value = str(point_data.get(header_name, ""))
+            if value.strip() == "" and header_name not in XML_CORE_HEADER_NAMES:
+                continue # 为空的非核心列不写出单元格
+            # 只包含空白的单元格写出为空的 Data 元素
+            value = "" if value.isspace() else _xml_text_round_trip(value)
+            if header_name in ('x', 'y'):
+                # 坐标列为数字类型的单元格，读取时转换为浮点数，转换失败则保留原文本
+                try:
+                    station_info[header_name] = float(value)
+                except ValueError:
+                    station_info[header_name] = value
+            else:
+                station_info[header_name] = value.strip()
+        yield ('station', station_info)
+
+
+def write_firm_workbook(all_points_for_final_export, output_filepath):
+    """
+    将点数据写出为 FIRM SpreadsheetML 数据表：表头行之后，每条线路先写一行线路标题行，再写该线路的站点数据行。
+
+    参数:
+        all_points_for_final_export (list): 点数据 (StationRecord 或 dict)，应已按 export_sort_key 排序。
+        output_filepath (str): 导出 XML 文件的完整路径和文件名。先写入临时文件，完成后再替换目标文件。
+    """
+    # 获取当前时间，用于 XML 中的创建/保存时间戳。
+    current_time = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    xml_header_definitions = XML_HEADER_DEFINITIONS
+
+    # 获取最大的列号，用于 Table 的 ExpandedColumnCount 属性。
+    max_column_index = xml_header_definitions[-1][1] # Firm_Highway_Number 的索引，即 17
+
+    # 预设列宽度，匹配 FIRM_XML_3.xml 的 Column 定义。
+    # 这些宽度是 WPS Excel 导出的标准宽度。
+    column_widths = {
+        "name": 71.25, "color": 46.5, "direction": 78.75, "seq": 66.75, "type": 32.25,
+        "name_zh": 120.75, "name_en": 120.75, "x": 85.5, "y": 86.25, "id": 93.75,
+        "transfer_line_1": 105,
+        "transfer_line_2": 105,
+        "transfer_line_3": 105,
+        "transfer_line_4": 105,
+        "transfer_line_5": 105,
+        "transfer_line_6": 105,
+        "Firm_Highway_Number": 136.5
+    }
+
+    # 为每一列预先生成单元格的开始标签：坐标使用数字样式 (s52)，其他使用文本样式 (s51)。
+    # 紧跟在上一个单元格之后的列不需要 ss:Index；跳过空的非核心列后，下一列需要明确指定 ss:Index。
+    # 核心列 (name 到 id) 即使为空也需要生成 Cell 标签，非核心列为空则跳过，与 WPS Excel 导出的行为保持一致。
+    data_column_specs = []
+    for header_name, fixed_col_index in xml_header_definitions:
+        data_type = "Number" if header_name in ["x", "y"] else "String"
+        style_id = "s52" if data_type == "Number" else "s51"
+        data_column_specs.append((
+            header_name,
+            fixed_col_index,
+            header_name in XML_CORE_HEADER_NAMES, # 是否为核心列
+            format_start_tag("Cell", {"ss:StyleID": style_id}) + ">",
+            format_start_tag("Cell", {"ss:StyleID": style_id, "ss:Index": str(fixed_col_index)}) + ">",
+            f'<Data ss:Type="{data_type}"'
+        ))
+
+    # 表格总行数 (表头 + 线路标题行 + 数据行) 写在 Table 的开始标签中，需要在写出数据行之前算好。
+    line_title_row_count = sum(
+        1 for previous_point, point_data in zip([None] + all_points_for_final_export, all_points_for_final_export)
+        if previous_point is None or point_data.get('name') != previous_point.get('name')
+    )
+    expanded_row_count = 1 + line_title_row_count + len(all_points_for_final_export)
+
+    # 先写入临时文件，完成后再替换目标文件，避免导出中断时留下不完整的 XML。
+    temp_output_filepath = output_filepath + ".tmp"
+    with open(temp_output_filepath, "w", encoding="utf-8") as f:
+        writer = SpreadsheetXmlWriter(f)
+
+        # XML 声明和处理指令，这是 XML 文件开头的标准部分。
+        writer.write_prolog()
+
+        # 写出 XML Workbook 根元素及其属性。
+        # 这些属性定义了 XML 命名空间，是 Excel SpreadsheetML 格式的要求。
+        writer.start("Workbook", {
+            "xmlns": "urn:schemas-microsoft-com:office:spreadsheet",
+            "xmlns:o": "urn:schemas-microsoft-com:office:office",
+            "xmlns:x": "urn:schemas-microsoft-com:office:excel",
+            "xmlns:ss": "urn:schemas-microsoft-com:office:spreadsheet",
+            "xmlns:html": "http://www.w3.org/TR/REC-html40",
+            "xmlns:dt": "uuid:C2F41010-65B3-11d1-A29F-00AA00C14882"
+        })
+
+        # 添加文档属性，如作者、创建/保存时间。
+        writer.start("DocumentProperties", {"xmlns": "urn:schemas-microsoft-com:office:office"})
+        writer.element("Author", text="QGIS Exporter")
+        writer.element("LastAuthor", text="QGIS Exporter")
+        writer.element("Created", text=current_time)
+        writer.element("LastSaved", text=current_time)
+        writer.end()
+
+        # 添加自定义文档属性，这些是 WPS Excel 特有的元数据。
+        writer.start("CustomDocumentProperties", {"xmlns": "urn:schemas-microsoft-com:office:office"})
+        # ICV 值根据 FIRM_XML.xml 调整为 _11
+        writer.element("ICV", {"dt:dt": "string"}, "A07F866F274640CBBCB2099FFB2A5A59_11")
+        writer.element("KSOProductBuildVer", {"dt:dt": "string"}, "2052-12.1.0.21171")
+        writer.end()
+
+        # 添加 ExcelWorkbook 设置，控制 Excel 窗口的一些行为。
+        writer.start("ExcelWorkbook", {"xmlns": "urn:schemas-microsoft-com:office:excel"})
+        writer.element("WindowWidth", text="25600")
+        writer.element("WindowHeight", text="10480")
+        writer.element("ProtectStructure", text="False")
+        writer.element("ProtectWindows", text="False")
+        writer.end()
+
+        # 定义 Excel 中的样式。
+        writer.start("Styles")
+        # 默认样式 和 自定义样式 s49
+        for style_attrs in ({"ss:ID": "Default", "ss:Name": "Normal"}, {"ss:ID": "s49"}):
+            writer.start("Style", style_attrs)
+            writer.element("Alignment", {"ss:Vertical": "Center"})
+            writer.element("Borders")
+            writer.element("Font", {"ss:FontName": "宋体", "x:CharSet": "134", "ss:Size": "11", "ss:Color": "#000000"})
+            writer.element("Interior")
+            writer.element("NumberFormat")
+            writer.element("Protection")
+            writer.end()
+
+        # 自定义样式 s50 (用于线路标题行)
+        writer.start("Style", {"ss:ID": "s50"})
+        writer.element("Alignment", {"ss:Horizontal": "Center", "ss:Vertical": "Center"})
+        writer.element("Font", {"ss:FontName": "宋体", "x:CharSet": "134", "ss:Size": "12", "ss:Color": "#0000FF", "ss:Bold": "1" })
+        writer.end()
+
+        # 自定义样式 s51 (用于文本格式单元格)
+        writer.start("Style", {"ss:ID": "s51"})
+        writer.element("NumberFormat", {"ss:Format": "@"}) # @ 表示文本格式
+        writer.end()
+
+        # 自定义样式 s52 (用于数字格式单元格)
+        writer.start("Style", {"ss:ID": "s52"})
+        writer.element("NumberFormat") # 通用数字格式
+        writer.end()
+        writer.end() # Styles
+
+        # 创建 Worksheet (工作表)
+        writer.start("Worksheet", {"ss:Name": "Sheet1"})
+
+        # 创建 Table 元素，它包含了所有数据行和列定义。
+        writer.start("Table", {
+            "ss:ExpandedColumnCount": str(max_column_index), # 定义总列数
+            "x:FullColumns": "1", # Excel 内部属性
+            "x:FullRows": "1", # Excel 内部属性
+            "ss:DefaultColumnWidth": "48", # 默认列宽
+            "ss:DefaultRowHeight": "14", # 默认行高
+            "ss:ExpandedRowCount": str(expanded_row_count) # 表格的总行数（包括表头和线路标题行）
+        })
+
+        # 生成 Column 定义。
+        # 这一步是为了在 XML 中预定义每一列的宽度和样式。
+        for i in range(1, max_column_index + 1):
+            col_attrs = {"ss:StyleID": "s49", "ss:AutoFitWidth": "0"} # 默认样式和不自动调整宽度
+
+            current_header_key_for_width = None
+            # 查找当前列索引对应的表头名称，以便获取其预设宽度。
+            for header_name, index in xml_header_definitions:
+                if index == i:
+                    current_header_key_for_width = header_name
+                    break
+
+            # 根据表头名称获取列宽，如果未找到则使用默认值 48。
+            col_width = column_widths.get(current_header_key_for_width, 48) if current_header_key_for_width else 48
+            col_attrs["ss:Width"] = str(col_width) # 设置列宽属性
+
+            # 为特定的列设置 ss:Index 属性。
+            # 这是为了在 XML 中明确指示某些列的起始索引，通常用于优化或兼容性。
+            if i == 1:
+                col_attrs["ss:Index"] = "1"
+            elif i == 11:
+                col_attrs["ss:Index"] = "11"
+
+            writer.element("Column", col_attrs) # 写出 Column 元素
+
+        # 创建第1行，数据标识行 (表头)。
+        # 按照预定义的顺序遍历所有表头名称，生成 Cell 和 Data 元素。
+        writer.start("Row", {"ss:Index": "1"})
+        for header_name, _ in xml_header_definitions:
+            writer.start("Cell")
+            writer.element("Data", {"ss:Type": "String"}, header_name) # 表头名称作为 Cell 的数据
+            writer.end()
+        writer.end()
+
+        last_line_name = None # 用于检测线路名称变化，以便插入线路标题行。
+        line_title_style_id = "s50" # 线路标题行使用的样式 ID。
+
+        # 遍历所有要导出的点数据，逐行写出实际数据行。
+        # all_points_for_final_export 列表中的点数据已经按照线路和序列号排好序。
+        for point_data in all_points_for_final_export:
+            current_line_name = point_data.get('name')
+
+            # 如果当前线路名称与上一行不同，表示进入了新的线路，需要插入一个线路标题行。
+            if current_line_name != last_line_name:
+                # 设置行高，不自动调整行高
+                writer.start("Row", {"ss:Height": "24", "ss:AutoFitHeight": "0"})
+                # 创建合并单元格的 Cell，MergeAcross 属性表示合并的列数。
+                # 合并的列数是总列数减去 1 (因为当前 Cell 自身也占一列)。
+                writer.start("Cell", {"ss:MergeAcross": str(max_column_index - 1), "ss:StyleID": line_title_style_id})
+                # 格式化线路标题的文本内容。
+                writer.element("Data", {"ss:Type": "String"}, format_line_title(point_data))
+                writer.end()
+                writer.end()
+
+            row_parts = ["<Row>"] # 数据行的各个片段，拼接后一次写出
+            last_generated_col_index = 0 # 跟踪上一个生成的 Cell 的列索引，用于处理 ss:Index 属性
+
+            # 按照预定义的表头顺序遍历，生成每个 Cell。
+            for header_name, fixed_col_index, is_core_column, cell_start_tag, indexed_cell_start_tag, data_start_tag in data_column_specs:
+                value = str(point_data.get(header_name, "")) # 获取当前点数据中对应列的值
+
+                if value.strip() == "" and not is_core_column:
+                    # 如果值为空字符串且不是核心列，则完全跳过，不生成 Cell 标签。
+                    continue
+
+                # 如果当前列的索引与上一个生成的列的索引不连续，则需要明确指定 ss:Index。
+                row_parts.append(cell_start_tag if fixed_col_index == last_generated_col_index + 1 else indexed_cell_start_tag)
+                if not value:
+                    row_parts.append(data_start_tag + " /></Cell>")
+                elif value.isspace():
+                    row_parts.append(data_start_tag + "></Data></Cell>")
+                else:
+                    row_parts.append(f"{data_start_tag}>{escape_xml_text(value)}</Data></Cell>")
+
+                last_generated_col_index = fixed_col_index # 更新上一个生成的列索引
+
+            row_parts.append("</Row>")
+            writer.write_raw("".join(row_parts))
+            last_line_name = current_line_name # 更新上一行的线路名称
+
+        writer.end() # Table
+
+        # 添加 WorksheetOptions，控制 Excel 工作表的一些显示和保护设置。
+        writer.start("WorksheetOptions", {"xmlns": "urn:schemas-microsoft-com:office:excel"})
+        writer.start("PageSetup")
+        writer.element("Header")
+        writer.element("Footer")
+        writer.end()
+        writer.element("Selected")
+        writer.element("TopRowVisible", text="0")
+        writer.element("LeftColumnVisible", text="0")
+        writer.element("PageBreakZoom", text="100")
+        writer.start("Panes")
+        writer.start("Pane")
+        writer.element("Number", text="3")
+        writer.element("ActiveRow", text="0")
+        writer.element("ActiveCol", text="0")
+        writer.end()
+        writer.end()
+        writer.element("ProtectObjects", text="False")
+        writer.element("ProtectScenarios", text="False")
+
+        # 关闭 WorksheetOptions、Worksheet 和 Workbook。
+        writer.close()
+
+    os.replace(temp_output_filepath, output_filepath)
@@ -0,0 +1,124 @@
+"""
+可替换的 JSON 序列化后端 (Highway_map_JSON_producer_4c.py 与 rmp_json_writer.py 使用)。
+
+标准库 json 的缩进编码完全由 Python 实现，大地图的编码和解析耗时明显。
+本模块在安装了 orjson 或 ujson 时使用它们，否则回退到标准库 json：
+- 'auto' 依次尝试 orjson、ujson、json；
+- 所有后端输出的 JSON 语义相同 (非 ASCII 字符不转义、'/' 不转义)，缩进格式的缩进宽度均为 4 个空格；
+  不同后端之间只可能存在空白和浮点数书写形式 (例如 1e-05 与 1e-5) 上的差异。
+orjson 和 ujson 都是可选依赖，只在选择对应后端时导入。
+"""
+from functools import lru_cache
+import json
+
+# 可选择的后端名称，'auto' 时按此顺序选择第一个已安装的后端
+JSON_BACKEND_NAMES = ('orjson', 'ujson', 'json')
+DEFAULT_JSON_BACKEND = 'auto'
+
+
+def _double_indent(data):
+    """
+    将 2 空格缩进的 JSON 字节串改为 4 空格缩进。
+    JSON 字符串中的换行都已转义，因此换行后的空格都是缩进。第 k 轮为原缩进不少于 k 层的每一行增加 2 个空格：
+    此时这些行的缩进至少为 2k + 2(k - 1) = 4k - 2 个空格，而原缩进为 k - 1 层的行已变为 4k - 4 个空格，不会被匹配。
+    逐层使用 bytes.replace 比对每一行做正则替换快得多。
+    """
+    level = 1
+    while True:
+        indent = b"\n" + b" " * (4 * level - 2)
+        if indent not in data:
+            return data
+        data = data.replace(indent, indent + b"  ")
+        level += 1
+
+
+class JsonBackend:
+    """
+    一个 JSON 后端的解析和编码函数。
+
+    属性:
+        name (str): 后端名称 ('orjson'、'ujson' 或 'json')。
+        loads (callable): 将 JSON 文本解析为 Python 对象。
+        dumps_compact (callable): 将对象编码为不含空白的 JSON 字符串 (分隔符为 ',' 和 ':')。
+        dumps_indented (callable): 将对象编码为缩进 4 个空格的 JSON 字符串。
+    """
+
+    def __init__(self, name, loads, dumps_compact, dumps_indented):
+        self.name = name
+        self.loads = loads
+        self.dumps_compact = dumps_compact
+        self.dumps_indented = dumps_indented
+
+    def __repr__(self):
+        return f"JsonBackend({self.name!r})"
+
+
+def _make_stdlib_backend():
+    return JsonBackend(
+        'json',
+        json.loads,
+        lambda value: json.dumps(value, ensure_ascii=False, separators=(',', ':')),
+        lambda value: json.dumps(value, indent=4, ensure_ascii=False)
+    )
+
+
+def _make_orjson_backend():
+    import orjson # 可选依赖
+    indent_option = orjson.OPT_INDENT_2
+
+    def dumps_indented(value):
+        # orjson 只支持 2 空格缩进
+        return _double_indent(orjson.dumps(value, option=indent_option)).decode('utf-8')
+
+    return JsonBackend(
+        'orjson',
+        orjson.loads,
+        lambda value: orjson.dumps(value).decode('utf-8'),
+        dumps_indented
+    )
+
+
+def _make_ujson_backend():
+    import ujson # 可选依赖
+    return JsonBackend(
+        'ujson',
+        ujson.loads,
+        lambda value: ujson.dumps(value, ensure_ascii=False, escape_forward_slashes=False),
+        lambda value: ujson.dumps(value, ensure_ascii=False, escape_forward_slashes=False, indent=4)
+    )
+
+
+_BACKEND_FACTORIES = {
+    'orjson': _make_orjson_backend,
+    'ujson': _make_ujson_backend,
+    'json': _make_stdlib_backend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_json_backend(name=DEFAULT_JSON_BACKEND):
+    """
+    获取 JSON 后端。
+
+    参数:
+        name (str): 'auto' 或 JSON_BACKEND_NAMES 中的后端名称。
+
+    返回:
+        JsonBackend: 对应的后端；'auto' 时为第一个已安装的后端。
+
+    异常:
+        ValueError: 后端名称未知。
+        RuntimeError: 指定的后端未安装。
+    """
+    if name == 'auto':
+        for backend_name in JSON_BACKEND_NAMES:
+            try:
+                return _BACKEND_FACTORIES[backend_name]()
+            except ImportError:
+                continue
+    if name not in _BACKEND_FACTORIES:
+        raise ValueError(f"未知的JSON后端: {name}")
+    try:
+        return _BACKEND_FACTORIES[name]()
+    except ImportError as e:
+        raise RuntimeError(f"JSON后端 '{name}' 需要安装 {name} 模块 (pip install {name})。") from e
@@ -0,0 +1,337 @@
+"""
+点图层数据的公共处理 (qgis_xml_producer_V2a.py 与 vector_file_xml_producer.py 共用)：
+按字段名解析图层字段，填入图层公共的 'name'、'FHM_No'、'direction'、'color'，生成缺失的 'seq' 和 'id'，
+并将所有图层的点排序后写出为 FIRM SpreadsheetML 数据表 (输出文件扩展名为 .npz 时写出为二进制中间文件，见 station_npz.py)。
+
+读取要素的方式 (QGIS 图层或直接读取矢量文件) 由调用方负责，本模块不依赖 QGIS。
+"""
+import os
+
+from firm_workbook import XML_HEADER_NAMES, export_sort_key, write_firm_workbook # 流式写出 FIRM SpreadsheetML 数据表
+from seq_keys import line_seq_prefix # 与 Highway_map_JSON_producer_4c.py 共用的序列号排序键
+from stable_id import generate_stable_id_from_coords # 与 Highway_map_JSON_producer_4c.py 共用的稳定ID生成
+from stage_profiler import profile_report_path
+from station_npz import is_station_npz_path, write_station_npz # 不需要手工修改数据表时使用的二进制列式中间格式
+from station_record import StationRecord # 与 Highway_map_JSON_producer_4c.py 共用的紧凑站点记录
+
+# 直接写入点数据的字段 (不作为附加字段重复添加)
+DIRECTLY_ADDED_NAMES = frozenset({'x', 'y', 'name', 'Firm_Highway_Number', 'color', 'direction', 'name_zh', 'name_en', 'type'})
+
+
+class NoExportDataError(RuntimeError):
+    """所有图层都没有可导出的点数据，未写出任何文件。"""
+
+    def __init__(self, message="没有可导出数据。请检查图层是否包含有效点要素，并且字段已正确填充。"):
+        super().__init__(message)
+
+
+def build_field_to_xml_header_map(num_transfer_lines=6):
+    """
+    图层字段名到 XML 表头名的映射：'FHM_No' -> 'Firm_Highway_Number'，以及 't_line1' -> 'transfer_line_1' 等换乘线字段。
+
+    参数:
+        num_transfer_lines (int): 要处理的换乘线字段 (t_lineX) 的数量。
+    """
+    field_to_xml_header_map = {
+        'FHM_No': 'Firm_Highway_Number', # 'FHM_No' 在图层中，对应 XML 的 'Firm_Highway_Number'
+    }
+    # 例如，如果 num_transfer_lines=6，会添加 't_line1' -> 'transfer_line_1'，直到 't_line6' -> 'transfer_line_6'。
+    for i in range(1, num_transfer_lines + 1):
+        field_to_xml_header_map.setdefault(f"t_line{i}", f"transfer_line_{i}")
+    return field_to_xml_header_map
+
+
+class LayerFieldLayout:
+    """
+    一个图层中导出所需字段的位置 (不存在的字段索引为 -1)。每个图层只解析一次。
+
+    参数:
+        layer_field_names (list): 图层的字段名，按字段顺序排列。
+        field_to_xml_header_map (dict): 图层字段名到 XML 表头名的映射 (见 build_field_to_xml_header_map)。
+        keep_extra_fields (bool): 是否保留与 XML 列无关的其他字段。
+    """
+    __slots__ = ('field_names', 'name_index', 'fhm_no_index', 'color_index', 'direction_index', 'name_zh_index',
+                 'name_en_index', 'type_index', 'id_index', 'seq_index', 'mapped_field_indexes', 'extra_field_indexes')
+
+    def __init__(self, layer_field_names, field_to_xml_header_map, keep_extra_fields):
+        self.field_names = list(layer_field_names)
+        index_of = {}
+        for field_index, field_name in enumerate(self.field_names):
+            index_of.setdefault(field_name, field_index)
+        self.name_index = index_of.get('name', -1)
+        self.fhm_no_index = index_of.get('FHM_No', -1)
+        self.color_index = index_of.get('color', -1)
+        self.direction_index = index_of.get('direction', -1)
+        self.name_zh_index = index_of.get('name_zh', -1)
+        self.name_en_index = index_of.get('name_en', -1)
+        self.type_index = index_of.get('type', -1)
+        self.id_index = index_of.get('id', -1)
+        self.seq_index = index_of.get('seq', -1)
+        # 映射的特殊字段（如 transfer_line_X），只包含图层中实际存在的字段。
+        # 注意：'FHM_No' 已经单独处理了，所以这里要跳过，避免重复处理。
+        self.mapped_field_indexes = [
+            (xml_header_name, index_of[field_name])
+            for field_name, xml_header_name in field_to_xml_header_map.items()
+            if field_name != 'FHM_No' and field_name in index_of
+        ]
+        # 其他未被特殊处理的字段：不添加已在映射中处理过的字段、已经直接添加的字段 (如 'x', 'y', 'name' 等) 和 'FHM_No'。
+        # 只有与 XML 表头同名的字段会出现在导出的 XML 中，其余字段仅在 keep_extra_fields 为 True 时保留。
+        directly_added_names = set(DIRECTLY_ADDED_NAMES)
+        directly_added_names.update(xml_header_name for xml_header_name, _ in self.mapped_field_indexes)
+        self.extra_field_indexes = [
+            (field_name, field_index) for field_index, field_name in enumerate(self.field_names)
+            if field_name not in field_to_xml_header_map and field_name not in directly_added_names and field_name != 'FHM_No'
+            and (keep_extra_fields or field_name in XML_HEADER_NAMES)
+        ]
+
+    def requested_indexes(self):
+        """导出需要读取的字段索引 (升序)，其余字段不必从数据源读取。"""
+        requested_indexes = [self.name_index, self.fhm_no_index, self.color_index, self.direction_index, self.name_zh_index,
+                             self.name_en_index, self.type_index, self.id_index, self.seq_index]
+        requested_indexes += [field_index for _, field_index in self.mapped_field_indexes]
+        requested_indexes += [field_index for _, field_index in self.extra_field_indexes]
+        return sorted({field_index for field_index in requested_indexes if field_index >= 0})
+
+
+def build_layer_points(layer_name, features, field_layout, transform_warnings=()):
+    """
+    将一个点图层的要素转换为点数据：填入图层公共值并生成缺失的 'seq'。
+
+    参数:
+        layer_name (str): 图层名称，仅用于提示信息。
+        features (iterable): 按要素顺序产出 (attrs, points, geometry_warning)：
+                             attrs 为按图层字段顺序排列的属性值 (未读取的字段可为 None)；
+                             points 为已转换到 WGS84 的 (经度, 纬度) 列表；
+                             geometry_warning 不为 None 时表示几何无法导出，只使用该要素的属性寻找图层公共值。
+        field_layout (LayerFieldLayout): 图层字段位置。
+        transform_warnings (list): 坐标转换失败的提示信息。可以是在遍历 features 的过程中才填入的列表，遍历结束后读取。
+
+    返回:
+        tuple: (点数据列表 (StationRecord), 需要按顺序打印的提示信息列表)
+    """
+    messages = []
+
+    name_index = field_layout.name_index
+    fhm_no_index = field_layout.fhm_no_index
+    color_index = field_layout.color_index
+    direction_index = field_layout.direction_index
+    name_zh_index = field_layout.name_zh_index
+    name_en_index = field_layout.name_en_index
+    type_index = field_layout.type_index
+    id_index = field_layout.id_index
+    seq_index = field_layout.seq_index
+    mapped_field_indexes = field_layout.mapped_field_indexes
+    extra_field_indexes = field_layout.extra_field_indexes
+
+    # 用于存储当前图层检测到的第一个非空有效线路名称。
+    first_valid_line_name_in_layer = None
+    # 用于存储当前图层检测到的第一个非空有效 FHM_No 值。
+    first_valid_fhm_no_in_layer = None
+    # 【新增变量】用于存储当前图层检测到的第一个非空有效 direction 值。
+    first_valid_direction_in_layer = None
+    # 【新增变量】用于存储当前图层检测到的第一个非空有效 color 值。
+    first_valid_color_in_layer = None
+
+    current_layer_features_processed = [] # 存储当前图层处理后的点数据
+    # 几何相关的警告在输出图层公共值信息之后再打印，与逐要素处理时的输出顺序保持一致
+    geometry_warnings = []
+
+    # --- 单次遍历：提取每个点的数据，同时寻找图层的公共线路名称、FHM_No、direction 和 color ---
+    # 每个要素只读取一次属性；'name' 等为空的点先留空，遍历结束后再填入图层公共值。
+    for attrs, points_in_feature, geometry_warning in features:
+        # 寻找第一个非空且非空白的 'name'、'FHM_No'、'direction' 和 'color' 值，作为该图层的默认值。
+        current_name_value = str((attrs[name_index] if name_index >= 0 else '') or '').strip()
+        if current_name_value and first_valid_line_name_in_layer is None:
+            first_valid_line_name_in_layer = current_name_value
+        current_fhm_no_value = str((attrs[fhm_no_index] if fhm_no_index >= 0 else '') or '').strip()
+        if current_fhm_no_value and first_valid_fhm_no_in_layer is None:
+            first_valid_fhm_no_in_layer = current_fhm_no_value
+        current_direction_value = str((attrs[direction_index] if direction_index >= 0 else '') or '').strip()
+        if current_direction_value and first_valid_direction_in_layer is None:
+            first_valid_direction_in_layer = current_direction_value
+        current_color_value = str((attrs[color_index] if color_index >= 0 else '') or '').strip()
+        if current_color_value and first_valid_color_in_layer is None:
+            first_valid_color_in_layer = current_color_value
+
+        if geometry_warning is not None:
+            geometry_warnings.append(geometry_warning)
+            continue # 跳过无法提取坐标的要素
+
+        # 同一要素的所有点共用的属性只转换一次
+        name_zh_value = str((attrs[name_zh_index] if name_zh_index >= 0 else '') or '')
+        name_en_value = str((attrs[name_en_index] if name_en_index >= 0 else '') or '')
+        type_value = str((attrs[type_index] if type_index >= 0 else '') or '')
+        mapped_values = [(xml_header_name, str(attrs[field_index] or '')) for xml_header_name, field_index in mapped_field_indexes]
+        extra_values = [(field_name, str(attrs[field_index] or '')) for field_name, field_index in extra_field_indexes]
+        # 获取图层中已有的 'id' 值
+        existing_id = str((attrs[id_index] if id_index >= 0 else '') or '').strip()
+        seq_value = str((attrs[seq_index] if seq_index >= 0 else '') or '')
+
+        # 遍历要素中的每一个点（对于单点要素只有一个点，对于多点要素有多个点）。
+        for x, y in points_in_feature:
+            # 提取经度 (x) 和纬度 (y)，并四舍五入到小数点后6位，确保精度一致性。
+            x_coord = round(x, 6)
+            y_coord = round(y, 6)
+
+            processed_data = StationRecord() # 存储当前点的处理结果
+            processed_data.x = x_coord
+            processed_data.y = y_coord
+            # 'name'、'FHM_No'、'color'、'direction' 为空时，遍历结束后使用图层公共值。
+            processed_data.name = current_name_value
+            processed_data.Firm_Highway_Number = current_fhm_no_value
+            processed_data.color = current_color_value
+            processed_data.direction = current_direction_value
+
+            # 直接映射 'name_zh', 'name_en', 'type' 字段。
+            processed_data.name_zh = name_zh_value
+            processed_data.name_en = name_en_value
+            processed_data.type = type_value
+
+            # 映射并添加预定义的特殊字段（如 transfer_line_X），以及其他未被特殊处理的字段。
+            # 与 XML 列无关的字段保存在记录的附加字段 (extra_fields) 中。
+            processed_data.update(mapped_values)
+            processed_data.update(extra_values)
+
+            # --- 核心修改：处理 'id' 字段 ---
+            if existing_id:
+                # 如果图层中 'id' 字段不为空，则优先使用它。
+                processed_data.id = existing_id
+            else:
+                # 如果图层中 'id' 字段为空，则根据 (x, y) 坐标生成一个稳定的短 ID (9位)。
+                processed_data.id = generate_stable_id_from_coords(x_coord, y_coord, target_length=9)
+
+            # 处理 'seq' 字段：如果图层中为空，则在后续步骤中生成。
+            # 'seq' 字段在这里只是从原始数据中获取，具体的自动生成逻辑在后面排序后进行。
+            processed_data.seq = seq_value
+
+            # 将当前处理好的点数据添加到当前图层的列表中。
+            current_layer_features_processed.append(processed_data)
+
+
+    # 检查是否找到了有效的线路名称。如果没有，则警告并跳过此图层。
+    if first_valid_line_name_in_layer is None:
+        messages.append(f"警告: 图层 '{layer_name}' 中所有要素的 'name' 字段都为空或只包含空白字符。此图层将不会导出任何要素。")
+        return [], messages # 跳过整个图层的处理和导出
+
+    else:
+        messages.append(f"信息: 图层 '{layer_name}' 找到线路名称: '{first_valid_line_name_in_layer}'。所有未填写 'name' 字段的要素将使用此值。")
+
+    # 检查是否找到了有效的 FHM_No。如果没有，则警告。
+    if first_valid_fhm_no_in_layer is None:
+        messages.append(f"警告: 图层 '{layer_name}' 中所有要素的 'FHM_No' 字段都为空或只包含空白字符。此图层所有要素的 'Firm_Highway_Number' 将为空。")
+    else:
+        messages.append(f"信息: 图层 '{layer_name}' 找到 'FHM_No': '{first_valid_fhm_no_in_layer}'。所有未填写 'FHM_No' 字段的要素将使用此值。")
+
+    # 【新增逻辑】检查是否找到了有效的 direction。
+    if first_valid_direction_in_layer is None:
+        messages.append(f"警告: 图层 '{layer_name}' 中所有要素的 'direction' 字段都为空或只包含空白字符。此图层所有要素的 'direction' 将为空。")
+    else:
+        messages.append(f"信息: 图层 '{layer_name}' 找到 'direction': '{first_valid_direction_in_layer}'。所有未填写 'direction' 字段的要素将使用此值。")
+
+    # 【新增逻辑】检查是否找到了有效的 color。
+    if first_valid_color_in_layer is None:
+        messages.append(f"警告: 图层 '{layer_name}' 中所有要素的 'color' 字段都为空或只包含空白字符。此图层所有要素的 'color' 将为空。")
+    else:
+        messages.append(f"信息: 图层 '{layer_name}' 找到 'color': '{first_valid_color_in_layer}'。所有未填写 'color' 字段的要素将使用此值。")
+
+    messages.extend(transform_warnings)
+    messages.extend(geometry_warnings)
+
+    # 为未填写 'name'、'FHM_No'、'color'、'direction' 的点填入图层公共值，并驻留这些在各点之间重复的文本。
+    for processed_data in current_layer_features_processed:
+        if not processed_data.name:
+            processed_data.name = first_valid_line_name_in_layer
+        if not processed_data.Firm_Highway_Number:
+            processed_data.Firm_Highway_Number = first_valid_fhm_no_in_layer
+        if not processed_data.color:
+            processed_data.color = first_valid_color_in_layer
+        if not processed_data.direction:
+            processed_data.direction = first_valid_direction_in_layer
+        processed_data.intern_shared_text()
+
+    # 不再对当前图层单独排序，最终导出前的全局排序已经覆盖了图层内的排序。
+    # 原先图层内按 ('name', 'seq') 排序后，同一线路中没有 'seq' 的点 (排序键最小) 总是排在最前面，
+    # 因此它们依次获得的序号就是其在要素顺序中的序号 1, 2, 3...。
+    # 同样地，在全局排序中序列号相同的点之间，自动生成 'seq' 的点排在已有 'seq' 的点之前。
+    seq_counter_by_line = {} # 字典，用于为每个线路生成独立的 'seq' 值。
+                             # 键是线路名称，值是当前线路已生成的序列号数量。
+    generated_seq_points = [] # 自动生成 'seq' 的点
+    existing_seq_points = [] # 图层中已填写 'seq' 的点
+
+    # 第三遍遍历：为没有 'seq' 值的点生成 'seq'。
+    for point_data in current_layer_features_processed:
+        if point_data.seq:
+            existing_seq_points.append(point_data)
+            continue
+
+        # 如果 'seq' 字段在图层中为空，则自动生成 'seq' 值。
+        line_name = point_data.name
+        seq_counter_by_line[line_name] = seq_counter_by_line.get(line_name, 0) + 1 # 当前线路的序列号递增。
+        # 构建线路前缀，例如 "L1"，如果线路名称没有数字，就直接用线路名称。
+        # 生成新的 'seq' 值，格式为 "L<线路号>_<两位站号>" (例如 "L1_01")。
+        point_data.seq = f"{line_seq_prefix(line_name)}_{seq_counter_by_line[line_name]:02d}"
+        generated_seq_points.append(point_data)
+
+    # 当前图层处理好的点数据将全部添加到最终要导出的总列表中。
+    # 这里不再进行坐标去重，因为需求是只要是要素里的点，都导出。
+    return generated_seq_points + existing_seq_points, messages
+
+
+def export_points_to_xml(all_points_for_final_export, output_filepath, profiler):
+    """
+    将所有图层的点数据排序后写出为 FIRM SpreadsheetML 数据表；启用分析时将分析报告保存在 XML 文件旁边。
+
+    参数:
+        all_points_for_final_export (list): 所有图层处理好的点数据 (StationRecord)，会被原地排序。
+        output_filepath (str): 导出 XML 文件的完整路径和文件名。扩展名为 .npz 时写出为二进制中间文件。
+        profiler (StageProfiler | NULL_PROFILER): 阶段分析器，记录 sort 和 write_xml (或 write_npz) 两个阶段。
+
+    返回:
+        dict | None: 启用分析时返回分析报告 (见 StageProfiler.report)，否则返回 None。
+
+    异常:
+        NoExportDataError: 没有任何可导出的点数据 (此时不写出文件)。
+    """
+    # 如果处理完所有图层后，没有收集到任何可导出的数据，则不写出文件，由调用方决定如何提示。
+    if not all_points_for_final_export:
+        raise NoExportDataError()
+
+    sort_points_for_export(all_points_for_final_export, profiler)
+    write_points_to_file(all_points_for_final_export, output_filepath, profiler)
+    print(f"数据已成功导出到: {output_filepath}")
+
+    if not profiler.enabled:
+        return None
+    report_filepath = profile_report_path(output_filepath)
+    profiler.write_report(report_filepath)
+    print(f"阶段性能分析报告已保存到: {report_filepath}")
+    return profiler.report()
+
+
+def sort_points_for_export(all_points_for_final_export, profiler):
+    """对所有点进行最终排序 (原地)：首先按线路名称，然后按序列号 (见 firm_workbook.export_sort_key)。"""
+    with profiler.stage("sort") as sort_stage:
+        all_points_for_final_export.sort(key=export_sort_key)
+        sort_stage.set_count("points", len(all_points_for_final_export))
+
+
+def write_points_to_xml(all_points_for_final_export, output_filepath, profiler):
+    """将已排序的点数据写出为 FIRM SpreadsheetML 数据表 (write_xml 阶段)。"""
+    with profiler.stage("write_xml") as write_stage:
+        write_firm_workbook(all_points_for_final_export, output_filepath)
+        write_stage.set_count("bytes", os.path.getsize(output_filepath))
+
+
+def write_points_to_npz(all_points_for_final_export, output_filepath, profiler):
+    """将已排序的点数据写出为二进制中间文件 (write_npz 阶段)。"""
+    with profiler.stage("write_npz") as write_stage:
+        write_station_npz(all_points_for_final_export, output_filepath)
+        write_stage.set_count("bytes", os.path.getsize(output_filepath))
+
+
+def write_points_to_file(all_points_for_final_export, output_filepath, profiler):
+    """按输出文件的扩展名写出已排序的点数据：.npz 为二进制中间文件，其他为 FIRM SpreadsheetML 数据表。"""
+    if is_station_npz_path(output_filepath):
+        write_points_to_npz(all_points_for_final_export, output_filepath, profiler)
+    else:
+        write_points_to_xml(all_points_for_final_export, output_filepath, profiler)
@@ -0,0 +1,230 @@
+"""
+RMP JSON 地图的多级细节 (LOD) 输出 (Highway_map_JSON_producer_4c.py 使用)。
+
+完整的 RMP JSON 中每条线路都带有全部虚拟节点 (V)，大范围路网在浏览器中平移和缩放时很卡。
+本模块按给定的容差 (SVG 坐标单位，每个容差对应一个缩放级别) 对每条线路的节点链做 Douglas-Peucker 简化，
+只删除虚拟节点，并把被删除节点两侧的边合并为一条边：
+- 只有恰好一条入边、一条出边，且两条边除 reconcileId 外属性完全相同 (即同一条线路) 的虚拟节点可以删除；
+  站点 (S / T)、线路端点、多条线路共用的节点以及连接不同线路的节点总是保留，因此简化后的路网拓扑不变；
+- 两个保留节点之间的节点链整体做简化，合并后的边沿用这段节点链中第一条边的 key 和属性，只替换终点；
+- 完全由可删除的虚拟节点组成的环 (没有任何保留节点) 不做简化。
+每个容差输出一个简化后的 JSON 文件，另外输出一个索引文件，按从粗到细的顺序列出各级文件，
+前端可以先加载最粗的一级，再逐级加载更精细的图。
+"""
+import json
+import os
+
+import numpy as np
+
+from rmp_json_writer import DEFAULT_JSON_COMPRESSION, DEFAULT_JSON_OUTPUT_FORMAT, rmp_json_output_path, write_rmp_json
+
+# LOD 索引文件的后缀 (例如 map.lod.json)
+LOD_INDEX_SUFFIX = ".lod.json"
+# LOD 索引文件的格式版本号
+LOD_INDEX_FORMAT_VERSION = 1
+
+
+def parse_lod_tolerances(text):
+    """
+    解析逗号分隔的容差列表 (如 "8,2,0.5")。
+
+    返回:
+        tuple: 去重后按从大到小 (从粗到细) 排列的容差。
+
+    异常:
+        ValueError: 容差不是数字或不大于 0。
+    """
+    tolerances = set()
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        tolerance = float(part)
+        if not tolerance > 0:
+            raise ValueError(f"LOD 容差必须大于 0: {part.strip()}")
+        tolerances.add(tolerance)
+    return tuple(sorted(tolerances, reverse=True))
+
+
+def douglas_peucker_keep_mask(xs, ys, tolerance):
+    """
+    对一条折线做 Douglas-Peucker 简化。
+
+    参数:
+        xs, ys (np.ndarray): 折线各点的坐标。
+        tolerance (float): 点到简化后线段的最大允许距离。
+
+    返回:
+        np.ndarray: 布尔数组，为 True 的点在简化后保留。首尾两点总是保留。
+    """
+    point_count = len(xs)
+    keep = np.zeros(point_count, dtype=bool)
+    keep[0] = keep[-1] = True
+    tolerance_sq = tolerance * tolerance
+    pending_ranges = [(0, point_count - 1)]
+    while pending_ranges:
+        start, end = pending_ranges.pop()
+        if end - start < 2:
+            continue
+        segment_x = xs[end] - xs[start]
+        segment_y = ys[end] - ys[start]
+        offsets_x = xs[start + 1:end] - xs[start]
+        offsets_y = ys[start + 1:end] - ys[start]
+        segment_length_sq = segment_x * segment_x + segment_y * segment_y
+        if segment_length_sq > 0:
+            # 到线段 (而不是所在直线) 的距离
+            projections = np.clip((offsets_x * segment_x + offsets_y * segment_y) / segment_length_sq, 0.0, 1.0)
+            offsets_x = offsets_x - projections * segment_x
+            offsets_y = offsets_y - projections * segment_y
+        distances_sq = offsets_x * offsets_x + offsets_y * offsets_y
+        farthest = int(np.argmax(distances_sq))
+        if distances_sq[farthest] > tolerance_sq:
+            split = start + 1 + farthest
+            keep[split] = True
+            pending_ranges.append((start, split))
+            pending_ranges.append((split, end))
+    return keep
+
+
+def _edge_style(edge):
+    """边除 reconcileId 外的属性：相同的两条边属于同一条线路，可以合并。"""
+    return {key: value for key, value in edge['attributes'].items() if key != 'reconcileId'}
+
+
+def simplify_graph(nodes, edges, tolerance):
+    """
+    按容差简化路网，删除可以省略的虚拟节点并合并其两侧的边。不修改传入的节点和边。
+
+    参数:
+        nodes (list): RMP JSON 的节点列表。
+        edges (list): RMP JSON 的边列表。
+        tolerance (float): Douglas-Peucker 容差 (SVG 坐标单位)。
+
+    返回:
+        tuple: (节点列表, 边列表)，保持原有顺序；合并后的边为原边的浅拷贝。
+    """
+    nodes_by_key = {node['key']: node for node in nodes}
+    in_edge_indexes = {}
+    out_edge_indexes = {}
+    for edge_index, edge in enumerate(edges):
+        out_edge_indexes.setdefault(edge['source'], []).append(edge_index)
+        in_edge_indexes.setdefault(edge['target'], []).append(edge_index)
+
+    # 可以删除的虚拟节点：恰好一条入边和一条出边 (不是自环)，且两条边属于同一条线路
+    removable_keys = set()
+    for node_key, node in nodes_by_key.items():
+        if node['attributes'].get('type') != 'virtual':
+            continue
+        node_in_edges = in_edge_indexes.get(node_key, ())
+        node_out_edges = out_edge_indexes.get(node_key, ())
+        if len(node_in_edges) != 1 or len(node_out_edges) != 1 or node_in_edges[0] == node_out_edges[0]:
+            continue
+        if _edge_style(edges[node_in_edges[0]]) == _edge_style(edges[node_out_edges[0]]):
+            removable_keys.add(node_key)
+
+    removed_keys = set()
+    replaced_edges = {} # {边序号: 合并后的边 或 None (被合并掉的边)}
+    for edge_index, edge in enumerate(edges):
+        if edge['source'] in removable_keys or edge['target'] not in removable_keys:
+            continue
+        # 从保留节点出发，沿出边经过可删除的虚拟节点，直到下一个保留节点
+        chain_keys = [edge['source'], edge['target']]
+        chain_edge_indexes = [edge_index]
+        while chain_keys[-1] in removable_keys:
+            next_edge_index = out_edge_indexes[chain_keys[-1]][0]
+            chain_edge_indexes.append(next_edge_index)
+            chain_keys.append(edges[next_edge_index]['target'])
+
+        chain_nodes = [nodes_by_key.get(node_key) for node_key in chain_keys]
+        if chain_nodes[0] is None or chain_nodes[-1] is None:
+            continue # 边指向不存在的节点时不做简化
+        xs = np.array([node['attributes']['x'] for node in chain_nodes], dtype=np.float64)
+        ys = np.array([node['attributes']['y'] for node in chain_nodes], dtype=np.float64)
+        keep = douglas_peucker_keep_mask(xs, ys, tolerance)
+        if chain_keys[0] == chain_keys[-1] and not keep[1:-1].any():
+            # 首尾为同一节点时至少保留离它最远的一个点，避免生成自环
+            keep[1 + int(np.argmax((xs[1:-1] - xs[0]) ** 2 + (ys[1:-1] - ys[0]) ** 2))] = True
+
+        kept_positions = np.flatnonzero(keep).tolist()
+        for start, end in zip(kept_positions, kept_positions[1:]):
+            first_edge_index = chain_edge_indexes[start]
+            if end - start > 1:
+                merged_edge = dict(edges[first_edge_index])
+                merged_edge['target'] = chain_keys[end]
+                replaced_edges[first_edge_index] = merged_edge
+                for merged_edge_index in chain_edge_indexes[start + 1:end]:
+                    replaced_edges[merged_edge_index] = None
+                removed_keys.update(chain_keys[start + 1:end])
+
+    simplified_nodes = [node for node in nodes if node['key'] not in removed_keys]
+    simplified_edges = []
+    for edge_index, edge in enumerate(edges):
+        edge = replaced_edges.get(edge_index, edge)
+        if edge is not None:
+            simplified_edges.append(edge)
+    return simplified_nodes, simplified_edges
+
+
+def lod_index_path(output_base_path):
+    """LOD 索引文件路径：output_base_path 为不含扩展名的输出路径 (压缩输出时含压缩后缀，与增量状态文件的命名相同)。"""
+    return output_base_path + LOD_INDEX_SUFFIX
+
+
+def remove_lod_files(index_file_path):
+    """删除 LOD 索引文件及其列出的各级简化文件 (完整分辨率的主输出文件除外)。索引不存在或无法读取时只删除索引。"""
+    if not os.path.isfile(index_file_path):
+        return
+    output_directory = os.path.dirname(index_file_path)
+    try:
+        with open(index_file_path, 'r', encoding='utf-8') as f:
+            levels = json.load(f).get("levels", [])
+        for level in levels:
+            if level.get("tolerance"):
+                level_file_path = os.path.join(output_directory, os.path.basename(level["file"]))
+                if os.path.isfile(level_file_path):
+                    os.remove(level_file_path)
+    except (OSError, ValueError, AttributeError, TypeError, KeyError):
+        pass
+    os.remove(index_file_path)
+
+
+def write_lod_files(json_data, full_output_file_path, index_file_path, tolerances, output_format=DEFAULT_JSON_OUTPUT_FORMAT,
+                    compression=DEFAULT_JSON_COMPRESSION, json_backend=None):
+    """
+    为每个容差写出一个简化后的 RMP JSON 文件，并写出按从粗到细排列的索引文件。先删除上次的各级文件。
+
+    参数:
+        json_data (dict): 完整分辨率的 RMP JSON 数据 (不会被修改)。
+        full_output_file_path (str): 已写出的完整分辨率JSON文件路径，作为索引中最精细的一级；
+                                     各级文件与它放在同一目录，文件名为 <名称>.lod<级别>.json (压缩时追加 .gz / .br)。
+        index_file_path (str): 索引文件路径 (见 lod_index_path)。
+        tolerances (iterable): 各级的容差 (SVG 坐标单位)，大于 0。
+        output_format, compression, json_backend: 见 rmp_json_writer.write_rmp_json。
+
+    返回:
+        list: 索引中的各级记录 {'level', 'tolerance', 'file', 'nodes', 'edges'}，按从粗到细排列，最后一级为完整分辨率。
+    """
+    remove_lod_files(index_file_path)
+
+    full_file_name = os.path.basename(full_output_file_path)
+    output_directory = os.path.dirname(full_output_file_path)
+    # 完整输出文件名去掉 .json 及压缩后缀，作为各级文件名的前缀
+    output_name = full_file_name[:full_file_name.rindex(".json")]
+    graph = json_data['graph']
+
+    levels = []
+    for level, tolerance in enumerate(sorted(set(tolerances), reverse=True)):
+        simplified_nodes, simplified_edges = simplify_graph(graph['nodes'], graph['edges'], tolerance)
+        level_file_path = rmp_json_output_path(os.path.join(output_directory, f"{output_name}.lod{level}"), compression)
+        # 只替换节点和边，其余内容 (视图框、缩放等) 与完整输出相同
+        level_json_data = dict(json_data, graph=dict(graph, nodes=simplified_nodes, edges=simplified_edges))
+        write_rmp_json(level_json_data, level_file_path, output_format, compression, json_backend)
+        levels.append({"level": level, "tolerance": tolerance, "file": os.path.basename(level_file_path),
+                       "nodes": len(simplified_nodes), "edges": len(simplified_edges)})
+    levels.append({"level": len(levels), "tolerance": 0, "file": full_file_name,
+                   "nodes": len(graph['nodes']), "edges": len(graph['edges'])})
+
+    temp_index_file_path = index_file_path + ".tmp"
+    with open(temp_index_file_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": LOD_INDEX_FORMAT_VERSION, "levels": levels}, f, indent=4, ensure_ascii=False)
+    os.replace(temp_index_file_path, index_file_path)
+    return levels
@@ -0,0 +1,53 @@
+"""
+SVG 坐标的空间哈希网格索引，用于在吸附容差范围内合并相邻节点 (Highway_map_JSON_producer_4c.py 使用)。
+
+网格单元边长等于吸附容差，查询时只需检查所在单元及其周围 8 个单元，
+因此每次插入和查询的期望耗时为常数，n 个节点的总耗时接近 O(n)。
+"""
+import math
+
+
+class SvgNodeGridIndex:
+    """
+    以节点 SVG 坐标建立的网格索引。每个已登记的节点以其基础ID (不带前缀的坐标ID) 标识。
+    """
+
+    def __init__(self, snap_tolerance):
+        """
+        参数:
+            snap_tolerance (float): 吸附容差 (SVG 坐标单位)，距离不超过该值的节点视为同一节点，必须大于 0。
+        """
+        if snap_tolerance <= 0:
+            raise ValueError(f"吸附容差必须大于 0，当前值: {snap_tolerance}")
+        self.snap_tolerance = snap_tolerance
+        self._squared_tolerance = snap_tolerance * snap_tolerance
+        self._cells = {} # {(网格列, 网格行): [(x, y, base_node_id), ...]}
+
+    def _cell_of(self, x, y):
+        return (math.floor(x / self.snap_tolerance), math.floor(y / self.snap_tolerance))
+
+    def add(self, x, y, base_node_id):
+        """
+        登记一个节点的位置。
+        """
+        self._cells.setdefault(self._cell_of(x, y), []).append((x, y, base_node_id))
+
+    def find_nearest(self, x, y):
+        """
+        查找容差范围内距离 (x, y) 最近的已登记节点。
+
+        返回:
+            str | None: 最近节点的基础ID；容差范围内没有节点时返回 None。
+        """
+        cell_x, cell_y = self._cell_of(x, y)
+        nearest_id = None
+        nearest_squared_distance = self._squared_tolerance
+        for neighbour_x in (cell_x - 1, cell_x, cell_x + 1):
+            for neighbour_y in (cell_y - 1, cell_y, cell_y + 1):
+                for node_x, node_y, base_node_id in self._cells.get((neighbour_x, neighbour_y), ()):
+                    squared_distance = (node_x - x) ** 2 + (node_y - y) ** 2
+                    if squared_distance <= nearest_squared_distance:
+                        if nearest_id is None or squared_distance < nearest_squared_distance:
+                            nearest_id = base_node_id
+                            nearest_squared_distance = squared_distance
+        return nearest_id
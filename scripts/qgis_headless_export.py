@@ -0,0 +1,238 @@
+"""
+无界面 QGIS 导出：不打开 QGIS 桌面程序，直接加载 .qgz / .qgs 项目并导出点图层为 FIRM SpreadsheetML 数据表。
+
+run_my_qgis_export_V2b.py 只能粘贴到 QGIS Python 控制台中运行 (依赖当前打开的项目 QgsProject.instance())。
+本脚本在独立的 Python 进程中启动不带图形界面的 QgsApplication，并使用 Qt 的 offscreen 平台插件，
+因此可以在没有显示器 (也不需要 xvfb) 的 Linux 服务器或 CI 中运行；多个项目可在多个工作进程中并行导出。
+
+用法 (需要使用 QGIS 自带的 Python，或设置好 PYTHONPATH 使其能导入 qgis 模块):
+    python scripts/qgis_headless_export.py projects/*.qgz -o xml_output -j 4
+
+每个项目导出为输出目录中与项目同名的 XML 文件 (例如 line_map.qgz -> line_map.xml)，默认导出项目中的全部点/多点图层。
+使用 --format npz 时改为导出二进制列式中间文件 (line_map.npz，见 station_npz.py)，文件更小、转换为 JSON 时读取更快。
+若 QGIS 未安装在默认位置，可通过环境变量 QGIS_PREFIX_PATH 指定 QGIS 的安装前缀。
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import multiprocessing
+import os
+import sys
+
+# 必须在导入任何 Qt / QGIS 模块之前设置，使 Qt 使用不需要显示服务器的 offscreen 平台插件
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# QGIS 项目文件扩展名
+QGIS_PROJECT_EXTENSIONS = (".qgz", ".qgs")
+# 导出文件格式：SpreadsheetML 数据表或二进制列式中间文件，值为文件扩展名
+OUTPUT_FORMATS = ("xml", "npz")
+
+# 退出码 (与 Highway_map_JSON_producer_4c.py 的批处理模式相同)
+EXIT_OK = 0 # 全部导出成功
+EXIT_EXPORT_FAILED = 1 # 至少有一个项目导出失败或不存在
+EXIT_USAGE_ERROR = 2 # 参数错误或没有任何输入
+
+# 当前进程中已启动的 QgsApplication (每个进程只启动一次)
+_qgis_application = None
+
+
+def start_qgis_application():
+    """
+    在当前进程中启动不带图形界面的 QgsApplication (重复调用时直接返回已启动的实例)，进程退出时自动关闭。
+
+    返回:
+        QgsApplication: 已初始化的 QGIS 应用实例。
+    """
+    global _qgis_application
+    if _qgis_application is not None:
+        return _qgis_application
+
+    import atexit
+    from qgis.core import QgsApplication
+
+    qgis_prefix_path = os.environ.get("QGIS_PREFIX_PATH")
+    if qgis_prefix_path:
+        QgsApplication.setPrefixPath(qgis_prefix_path, True)
+    # 第二个参数为 False 表示不启用图形界面
+    _qgis_application = QgsApplication([], False)
+    _qgis_application.initQgis()
+    atexit.register(_qgis_application.exitQgis)
+    return _qgis_application
+
+
+def export_qgis_project(project_file_path, output_directory, layer_names=None, num_transfer_lines=6, max_workers=None, profile=False,
+                        output_format="xml"):
+    """
+    加载一个 QGIS 项目文件并导出其中的点图层。调用前须已在当前进程中调用 start_qgis_application()。
+
+    参数:
+        project_file_path (str): .qgz / .qgs 项目文件路径。
+        output_directory (str): 输出目录，输出文件与项目同名。
+        layer_names (list | None): 要导出的图层名称，默认为项目中的全部点/多点图层。
+        num_transfer_lines (int): 要处理的换乘线字段 (t_lineX) 的数量。
+        max_workers (int | None): 项目内并行提取图层要素的线程数。
+        profile (bool): 是否在输出文件旁边保存阶段性能分析报告。
+        output_format (str): 'xml' (SpreadsheetML 数据表) 或 'npz' (二进制列式中间文件)。
+
+    返回:
+        str: 生成的输出文件路径。
+
+    异常:
+        RuntimeError: 项目无法加载、没有可导出的点图层或没有生成输出文件。
+    """
+    from qgis.core import QgsProject
+    from layer_points import NoExportDataError
+    from qgis_xml_producer_V2a import find_point_layer_names, process_and_export_qgis_layers_to_xml
+
+    # 每个项目使用独立的 QgsProject 对象，不影响 QgsProject.instance()
+    project = QgsProject()
+    if not project.read(project_file_path):
+        raise RuntimeError(f"无法加载 QGIS 项目 '{project_file_path}': {project.error()}")
+    try:
+        if layer_names is None:
+            layer_names = find_point_layer_names(project)
+        if not layer_names:
+            raise RuntimeError(f"QGIS 项目 '{project_file_path}' 中没有可导出的点或多点矢量图层。")
+
+        os.makedirs(output_directory, exist_ok=True)
+        project_name = os.path.splitext(os.path.basename(project_file_path))[0]
+        output_file_path = os.path.join(output_directory, f"{project_name}.{output_format}")
+        try:
+            process_and_export_qgis_layers_to_xml(
+                layer_names,
+                output_file_path,
+                num_transfer_lines=num_transfer_lines,
+                max_workers=max_workers,
+                profile=profile,
+                project=project
+            )
+        except NoExportDataError as e:
+            raise NoExportDataError(f"QGIS 项目 '{project_file_path}' 没有可导出的数据，未生成输出文件。") from e
+        return output_file_path
+    finally:
+        project.clear()
+
+
+def _export_qgis_project_task(task):
+    """
+    在工作进程中执行的单个导出任务。异常不向外抛出，而是作为错误信息返回。
+
+    返回:
+        tuple: (project_file_path, output_file_path 或 None, 错误信息 或 None)
+    """
+    project_file_path, output_directory, layer_names, num_transfer_lines, max_workers, profile, output_format = task
+    try:
+        start_qgis_application()
+        output_file_path = export_qgis_project(project_file_path, output_directory, layer_names, num_transfer_lines, max_workers, profile,
+                                               output_format)
+        return project_file_path, output_file_path, None
+    except Exception as e:
+        return project_file_path, None, f"导出 '{project_file_path}' 失败: {type(e).__name__} - {e}"
+    finally:
+        sys.stdout.flush()
+
+
+def collect_project_inputs(input_specs):
+    """
+    将命令行给出的输入 (项目文件、目录或通配符) 展开为 QGIS 项目文件列表，保持给出顺序并去重。
+    目录只收集其中直接包含的 .qgz / .qgs 文件。
+
+    返回:
+        tuple: (项目文件路径列表, 没有匹配到任何项目文件的输入列表)
+    """
+    project_file_paths = []
+    seen_paths = set()
+    unmatched_specs = []
+    for input_spec in input_specs:
+        if os.path.isdir(input_spec):
+            matches = sorted(
+                os.path.join(input_spec, file_name) for file_name in os.listdir(input_spec)
+                if file_name.lower().endswith(QGIS_PROJECT_EXTENSIONS)
+            )
+        elif os.path.isfile(input_spec):
+            matches = [input_spec]
+        else:
+            matches = sorted(path for path in glob.glob(input_spec) if path.lower().endswith(QGIS_PROJECT_EXTENSIONS))
+        if not matches:
+            unmatched_specs.append(input_spec)
+        for path in matches:
+            normalized_path = os.path.abspath(path)
+            if normalized_path not in seen_paths:
+                seen_paths.add(normalized_path)
+                project_file_paths.append(path)
+    return project_file_paths, unmatched_specs
+
+
+def build_argument_parser():
+    parser = argparse.ArgumentParser(
+        description="无界面加载 QGIS 项目 (.qgz/.qgs)，将其中的点图层导出为 FIRM SpreadsheetML (Excel XML) 数据表。"
+    )
+    parser.add_argument("inputs", nargs="+", help="QGIS 项目文件、包含项目文件的目录或通配符 (如 'projects/*.qgz')")
+    parser.add_argument("-o", "--output-dir", required=True, help="输出目录")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="并行导出项目的进程数 (默认: CPU核心数)")
+    parser.add_argument("--threads", type=int, default=None, help="每个项目内并行提取图层要素的线程数 (默认由线程池决定)")
+    parser.add_argument("--layers", help="只导出这些图层 (逗号分隔的图层名称)，默认导出项目中的全部点/多点图层")
+    parser.add_argument("--num-transfer-lines", type=int, default=6, help="要处理的换乘线字段 (t_lineX) 的数量 (默认: 6)")
+    parser.add_argument("--format", dest="output_format", default="xml", choices=OUTPUT_FORMATS,
+                        help="导出格式：xml 为可在 WPS/Excel 中编辑的数据表 (默认)，npz 为更小、转换更快的二进制列式中间文件")
+    parser.add_argument("--profile", action="store_true", help="在每个输出文件旁保存阶段性能分析报告 (.profile.json)")
+    return parser
+
+
+def run_cli(args):
+    """
+    在工作进程中并行导出所有输入项目。每个工作进程各自启动一个 QgsApplication。
+
+    返回:
+        int: 退出码 (EXIT_OK / EXIT_EXPORT_FAILED / EXIT_USAGE_ERROR)。
+    """
+    if args.jobs < 1:
+        print("错误: --jobs 必须大于等于 1。", file=sys.stderr)
+        return EXIT_USAGE_ERROR
+
+    project_file_paths, unmatched_specs = collect_project_inputs(args.inputs)
+    for input_spec in unmatched_specs:
+        print(f"错误: 没有与输入匹配的 QGIS 项目文件: {input_spec}", file=sys.stderr)
+    if not project_file_paths:
+        return EXIT_USAGE_ERROR
+
+    # 输出文件按项目文件名命名，不同目录下的同名项目会互相覆盖
+    output_names = {}
+    for project_file_path in project_file_paths:
+        project_name = os.path.splitext(os.path.basename(project_file_path))[0]
+        if project_name in output_names:
+            print(f"错误: '{project_file_path}' 与 '{output_names[project_name]}' 会输出到同一个文件。", file=sys.stderr)
+            return EXIT_USAGE_ERROR
+        output_names[project_name] = project_file_path
+
+    layer_names = [layer_name.strip() for layer_name in args.layers.split(",") if layer_name.strip()] if args.layers else None
+    tasks = [(project_file_path, args.output_dir, layer_names, args.num_transfer_lines, args.threads, args.profile, args.output_format)
+             for project_file_path in project_file_paths]
+
+    worker_count = max(1, min(args.jobs, len(tasks)))
+    if worker_count == 1:
+        results = [_export_qgis_project_task(task) for task in tasks]
+    else:
+        # Qt 不支持在 fork 出的子进程中继续使用，工作进程一律以 spawn 方式启动
+        with ProcessPoolExecutor(max_workers=worker_count, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results = list(executor.map(_export_qgis_project_task, tasks))
+
+    exported_count = 0
+    for project_file_path, output_file_path, error_msg in results:
+        if error_msg is None:
+            exported_count += 1
+            print(f"完成: {project_file_path} -> {output_file_path}")
+        else:
+            print(f"失败: {error_msg}", file=sys.stderr)
+
+    failed_count = len(results) - exported_count
+    print(f"共 {len(project_file_paths)} 个项目，成功 {exported_count} 个，失败 {failed_count} 个，未匹配的输入 {len(unmatched_specs)} 个。")
+    return EXIT_OK if failed_count == 0 and not unmatched_specs else EXIT_EXPORT_FAILED
+
+
+def main(argv=None):
+    return run_cli(build_argument_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,13 @@
 import os
 import uuid
-import re
 import random
-import hashlib # 用于生成SHA256哈希值
-# import base64  # 已移除，因为自定义Base62不再需要
-from datetime import datetime
-from qgis.core import QgsVectorLayer, QgsFeature, QgsField, QgsProject, QgsPointXY, QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsWkbTypes
+from concurrent.futures import ThreadPoolExecutor
+from qgis.core import QgsVectorLayer, QgsFeature, QgsField, QgsProject, QgsPointXY, QgsCoordinateReferenceSystem, QgsWkbTypes, QgsFeatureRequest, QgsVectorLayerFeatureSource
 from qgis.PyQt.QtCore import QVariant
-from xml.etree.ElementTree import Element, SubElement, tostring
+
+from layer_points import (LayerFieldLayout, NoExportDataError, build_field_to_xml_header_map, build_layer_points, export_points_to_xml,
+                          sort_points_for_export, write_points_to_file) # 与 vector_file_xml_producer.py 共用的点图层处理
+from stage_profiler import NULL_PROFILER, StageProfiler, profile_report_path # 按阶段记录耗时、内存峰值和数据量
 
 # --- 辅助函数：生成随机ID（保留，但现在仅用于非坐标生成场景） ---
 def generate_random_id(length=9):
@@ -18,665 +18,257 @@ def generate_random_id(length=9):
     characters = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
     return ''.join(random.choice(characters) for i in range(length))
 
-# --- 自定义 Base62 编码的辅助函数 ---
-# Base62编码的字符集：0-9, A-Z, a-z
-BASE62_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
 
-def base_encode(number, base_chars):
+def _extract_layer_points(layer_name, feature_source, layer_fields, source_crs, target_crs, transform_context,
+                          qgis_field_to_xml_header_map, keep_extra_fields):
     """
-    将一个整数编码为指定字符集的字符串。
-    用于将大整数（如哈希值）转换为更短的字符串形式。
+    提取一个点图层中的所有点数据：填入图层公共值并生成缺失的 'seq' (见 layer_points.build_layer_points)。
+    只使用传入的数据源快照，不访问图层对象本身，因此可以在工作线程中执行。
 
     参数:
-        number (int): 要编码的整数。
-        base_chars (str): 用于编码的字符集字符串（例如 BASE62_CHARS）。
+        layer_name (str): 图层名称，仅用于提示信息。
+        feature_source (QgsVectorLayerFeatureSource): 在主线程中创建的图层数据源快照。
+        layer_fields (QgsFields): 图层字段。
+        source_crs, target_crs (QgsCoordinateReferenceSystem): 图层坐标系和目标坐标系 (WGS84)。
+        transform_context (QgsCoordinateTransformContext): 项目的坐标转换上下文。
+        qgis_field_to_xml_header_map (dict): QGIS 字段名到 XML 表头名的映射。
+        keep_extra_fields (bool): 是否保留与 XML 列无关的其他 QGIS 字段。
 
     返回:
-        str: 编码后的字符串。
-    """
-    if number == 0:
-        return base_chars[0]
-    base = len(base_chars)
-    encoded_string = []
-    while number > 0:
-        encoded_string.append(base_chars[number % base])
-        number //= base
-    return "".join(reversed(encoded_string))
-
-
-# --- 修改后的函数：生成基于坐标的短且稳定的ID (9位) ---
-def generate_stable_id_from_coords(x, y, target_length=9):
+        tuple: (点数据列表 (StationRecord), 需要按顺序打印的提示信息列表)
     """
-    根据给定的 (x, y) 坐标生成一个稳定、确定性且长度为 9 位的短 ID。
-    此函数通过以下步骤实现：
-    1. 将坐标组合成一个字符串。
-    2. 计算该字符串的 SHA256 哈希值。
-    3. 将哈希值转换为一个大整数。
-    4. 将该整数编码为 Base62 字符串。
-    5. 截取 Base62 字符串的前 target_length (默认为9) 位作为最终ID。
+    # --- 每个图层只解析一次字段索引 ---
+    field_layout = LayerFieldLayout(layer_fields.names(), qgis_field_to_xml_header_map, keep_extra_fields)
 
-    参数:
-        x (float): 坐标的 X 值 (经度)。
-        y (float): 坐标的 Y 值 (纬度)。
-        target_length (int): 目标 ID 的长度 (默认为 9)。
+    # 只请求需要的属性，其余属性不会从数据源读取
+    feature_request = QgsFeatureRequest()
+    if not keep_extra_fields:
+        feature_request.setSubsetOfAttributes(field_layout.requested_indexes())
 
-    返回:
-        str: 基于坐标生成的稳定且指定长度的短 ID 字符串。
-    """
-    # 1. 将 x, y 坐标组合成一个字符串。
-    # 确保坐标精度一致，防止浮点数精度问题导致哈希不一致。
-    # 例如，保留 6 位小数，这对于地理坐标通常足够精确，并确保相同物理位置的哈希值相同。
-    coord_string = f"{x:.6f},{y:.6f}"
+    # 坐标转换由要素请求在读取时整体完成 (在 C++ 中转换整个几何)，不再逐点调用 transform.transform()。
+    # 图层已经是 WGS84 (EPSG:4326) 时跳过坐标转换。
+    transform_warnings = []
+    if source_crs.authid() != target_crs.authid():
+        feature_request.setDestinationCrs(target_crs, transform_context)
+        feature_request.setTransformErrorCallback(lambda failed_feature: transform_warnings.append(
+            f"警告: 要素 {failed_feature.id()} 无法从 '{source_crs.authid()}' 转换到 '{target_crs.authid()}'。"))
 
-    # 2. 计算该字符串的 SHA256 哈希值。
-    # SHA256 是一种安全的哈希算法，提供良好的唯一性保证。
-    # `digest()` 返回字节串，`hexdigest()` 返回十六进制字符串。
-    sha256_hash = hashlib.sha256(coord_string.encode('utf-8')).hexdigest()
+    return build_layer_points(layer_name, _iter_qgis_features(feature_source, feature_request), field_layout, transform_warnings)
 
-    # 3. 将十六进制哈希值转换为一个大整数。
-    # 这样可以将其视为一个数字，用于 Base62 编码。
-    hash_as_int = int(sha256_hash, 16)
 
-    # 4. 将该整数编码为 Base62 字符串。
-    # Base62 编码比十六进制更紧凑，能用更短的字符串表示相同的信息量。
-    base62_encoded = base_encode(hash_as_int, BASE62_CHARS)
+def _iter_qgis_features(feature_source, feature_request):
+    """
+    按 build_layer_points 需要的格式逐个产出要素：(属性列表, WGS84 坐标列表, 几何警告 或 None)。
+    不保留 QgsFeature 对象。
+    """
+    for feature in feature_source.getFeatures(feature_request): # 遍历图层中的每一个要素
+        attrs = feature.attributes() # 获取要素的所有属性值
+        geom = feature.geometry() # 获取要素的几何信息 (已转换到 WGS84)
+        # 检查几何是否为空或无效。
+        if not geom or geom.isEmpty():
+            yield attrs, None, f"警告: 要素 {feature.id()} 几何为空或无效。跳过其点位导出。"
+            continue
 
-    # 5. 截取 Base62 字符串的前 target_length 位作为最终ID。
-    # 由于 Base62 编码的结果通常很长，我们只取其前 N 位。
-    # 注意：截取会增加理论上的碰撞风险，但对于有限数量的站点，实践中极低。
-    final_id = base62_encoded[:target_length]
+        if geom.wkbType() == QgsWkbTypes.Point:
+            # 如果是点几何，直接添加其坐标。
+            points_in_feature = [geom.asPoint()]
+        elif geom.wkbType() == QgsWkbTypes.MultiPoint:
+            # 如果是多点几何，添加所有子点坐标。
+            points_in_feature = geom.asMultiPoint()
+            if not points_in_feature:
+                yield attrs, None, f"警告: MultiPoint 要素 {feature.id()} 不包含任何子点。跳过。"
+                continue
+        else:
+            # 不支持的几何类型，跳过。
+            yield attrs, None, f"警告: 要素 {feature.id()} 的几何类型 '{QgsWkbTypes.displayString(int(geom.wkbType()))}' 不受支持。跳过。"
+            continue
 
-    # 如果截取后的长度不足 target_length，理论上这种情况很少发生，
-    # 但为确保长度，可以进行填充（如果需要）。但对于SHA256哈希，Base62编码结果很长，
-    # 不太可能出现不足9位的情况。这里不做额外填充，如果真不足9位，就保持原样。
-    return final_id
+        yield attrs, [(pt.x(), pt.y()) for pt in points_in_feature], None
 
 
-def _try_int(s):
+def find_point_layer_names(project):
     """
-    尝试将字符串转换为整数，如果失败，则尝试匹配特定格式的字符串（例如“L1_01”），
-    否则返回原始字符串。用于排序。
-    关键修改：确保始终返回一个元组，以避免排序时出现TypeError。
+    返回项目中所有点 (Point) 或多点 (MultiPoint) 矢量图层的名称，顺序与 project.mapLayers() 相同。
+
+    参数:
+        project (QgsProject): QGIS 项目。
     """
-    try:
-        # 如果能转换为整数，则返回包含该整数的元组
-        return (int(s),)
-    except ValueError:
-        # 尝试匹配 "前缀数字_数字" 的格式 (例如 L1_01)
-        match = re.match(r'([A-Za-z]+)(\d+)_(\d+)', s)
-        if match:
-            prefix, line_num, station_num = match.groups()
-            # 返回一个包含字符串前缀和两个整数的元组
-            return (prefix, int(line_num), int(station_num))
-        # 尝试匹配 "数字_数字" 的格式 (例如 1_01)
-        match = re.match(r'(\d+)_(\d+)', s)
-        if match:
-            line_num, station_num = match.groups()
-            # 返回一个包含两个整数的元组
-            return (int(line_num), int(station_num))
-        # 如果以上都不匹配，则返回包含原始字符串的元组
-        # 这样确保了在所有情况下，_try_int 都返回一个元组，避免 TypeError
-        return (s,)
-
-def process_and_export_qgis_layers_to_xml(layer_names, output_filepath, num_transfer_lines=6):
+    point_layer_names = []
+    for layer in project.mapLayers().values():
+        if isinstance(layer, QgsVectorLayer) and layer.wkbType() in [QgsWkbTypes.Point, QgsWkbTypes.MultiPoint]:
+            point_layer_names.append(layer.name())
+    return point_layer_names
+
+
+def process_and_export_qgis_layers_to_xml(layer_names, output_filepath, num_transfer_lines=6, keep_extra_fields=False, max_workers=None,
+                                          profile=False, project=None):
     """
     处理指定的 QGIS 矢量图层中的点要素，将其转换为特定的 XML 格式并导出。
 
     参数:
         layer_names (list): 包含要处理的 QGIS 图层名称的列表。
-        output_filepath (str): 导出 XML 文件的完整路径和文件名。
+        output_filepath (str): 导出 XML 文件的完整路径和文件名。扩展名为 .npz 时改为写出二进制列式中间文件 (见 station_npz.py)，
+                               文件更小、转换时读取更快，但不能在 WPS/Excel 中编辑。
         num_transfer_lines (int): 要处理的换乘线字段（t_lineX）的数量。
                                   这会影响 XML 中 transfer_line_X 列的生成。
+        keep_extra_fields (bool): 是否读取并在点数据中保留与 XML 列无关的其他 QGIS 字段。
+                                  这些字段不会写入 XML；为 False 时只从数据源读取导出所需的字段。
+        max_workers (int | None): 并行提取图层要素的线程数，默认由 ThreadPoolExecutor 决定。
+                                  为 1 时逐个图层依次处理。
+        profile (bool): 是否按阶段 (validate_layers、extract、sort、write_xml 或 write_npz) 记录耗时、内存峰值和数据量。
+                        为 True 时将分析报告保存在 XML 文件旁边 (追加 .profile.json)，并作为返回值返回。
+        project (QgsProject | None): 读取图层的 QGIS 项目，默认为当前项目 QgsProject.instance()。
+                                     无界面运行时传入用 QgsProject.read() 加载的项目。
+
+    返回:
+        dict | None: profile 为 True 时返回分析报告 (见 StageProfiler.report)，否则返回 None。
+
+    异常:
+        NoExportDataError: 没有任何可导出的点数据 (此时不写出文件)。
+    """
+    profiler = StageProfiler() if profile else NULL_PROFILER
+    all_processed_points_for_final_export = extract_qgis_layer_points(
+        layer_names, num_transfer_lines, keep_extra_fields, max_workers, profiler, project
+    )
+
+    # --- 最终导出前，对所有点进行统一排序并写出 ---
+    return export_points_to_xml(all_processed_points_for_final_export, output_filepath, profiler)
+
+
+def extract_qgis_layer_points(layer_names, num_transfer_lines=6, keep_extra_fields=False, max_workers=None, profiler=NULL_PROFILER,
+                              project=None):
     """
-    # 获取 QGIS 项目实例
-    project = QgsProject.instance()
+    校验并读取指定的 QGIS 点图层，返回所有图层处理好的点数据 (尚未排序)。提示信息按图层顺序打印。
+    参数见 process_and_export_qgis_layers_to_xml；profiler 中记录 validate_layers 和 extract 两个阶段。
+
+    返回:
+        list: 点数据 (StationRecord)。
+    """
+    # 获取 QGIS 项目实例 (未指定时使用 QGIS 当前打开的项目)
+    if project is None:
+        project = QgsProject.instance()
     # 定义目标坐标系为 WGS84 (EPSG:4326)，即经纬度。所有导出的坐标都将转换为此坐标系。
     target_crs = QgsCoordinateReferenceSystem("EPSG:4326")
 
-    # 定义 QGIS 字段名到 XML 表头名的映射。
-    # 这是一个字典，键是 QGIS 图层中的字段名，值是 XML 中对应的表头名。
-    qgis_field_to_xml_header_map = {
-        'FHM_No': 'Firm_Highway_Number', # 'FHM_No' 在 QGIS 中，对应 XML 的 'Firm_Highway_Number'
-    }
-    # 动态添加 num_transfer_lines 数量的换乘线字段到映射中。
-    # 例如，如果 num_transfer_lines=6，会添加 't_line1' -> 'transfer_line_1'，直到 't_line6' -> 'transfer_line_6'。
-    for i in range(1, num_transfer_lines + 1):
-        qgis_short_name = f"t_line{i}"
-        xml_long_name = f"transfer_line_{i}"
-        # 检查是否已存在，防止重复添加（虽然这里不会，但良好习惯）
-        if qgis_short_name not in qgis_field_to_xml_header_map:
-             qgis_field_to_xml_header_map[qgis_short_name] = xml_long_name
+    # 定义 QGIS 字段名到 XML 表头名的映射：'FHM_No' -> 'Firm_Highway_Number'，
+    # 以及 num_transfer_lines 数量的换乘线字段 't_line1' -> 'transfer_line_1' ... 't_lineN' -> 'transfer_line_N'。
+    qgis_field_to_xml_header_map = build_field_to_xml_header_map(num_transfer_lines)
 
     # 初始化一个空列表，用于存储所有图层中处理后的点数据。
-    # 每个点的数据是一个字典，包含了 XML 导出的所有必要信息。
+    # 每个点的数据是一个 StationRecord，包含了 XML 导出的所有必要信息。
     all_processed_points_for_final_export = []
 
-    # 遍历传入的每个图层名称。
-    for layer_name in layer_names:
-        # 通过名称从 QGIS 项目中获取图层列表。
-        layer_list = project.mapLayersByName(layer_name)
-        if not layer_list:
-            # 如果未找到图层，打印错误信息并跳过当前图层。
-            print(f"错误: 未找到 QGIS 图层: '{layer_name}'。跳过此图层。")
-            continue
-        # 获取找到的第一个图层对象。
-        layer = layer_list[0]
+    # 在主线程中校验图层，并为每个图层创建数据源快照 (QgsVectorLayerFeatureSource)。
+    # 快照可以安全地在工作线程中读取要素，工作线程不会访问图层对象本身。
+    with profiler.stage("validate_layers") as validate_stage:
+        transform_context = project.transformContext()
+        layer_jobs = [] # 与 layer_names 一一对应：(校验提示信息列表, 提取参数 或 None)
+        for layer_name in layer_names:
+            # 通过名称从 QGIS 项目中获取图层列表。
+            layer_list = project.mapLayersByName(layer_name)
+            if not layer_list:
+                # 如果未找到图层，记录错误信息并跳过当前图层。
+                layer_jobs.append(([f"错误: 未找到 QGIS 图层: '{layer_name}'。跳过此图层。"], None))
+                continue
+            # 获取找到的第一个图层对象。
+            layer = layer_list[0]
 
-        # 检查获取到的对象是否确实是矢量图层。
-        if not isinstance(layer, QgsVectorLayer):
-            print(f"错误: 图层 '{layer_name}' 不是矢量图层。跳过此图层。")
-            continue
+            # 检查获取到的对象是否确实是矢量图层。
+            if not isinstance(layer, QgsVectorLayer):
+                layer_jobs.append(([f"错误: 图层 '{layer_name}' 不是矢量图层。跳过此图层。"], None))
+                continue
 
-        # 获取图层的几何类型（例如，点、线、面）。
-        layer_wkb_type = layer.wkbType()
-        # 检查几何类型是否为点 (Point) 或多点 (MultiPoint)。
-        # 只有这两种类型支持导出为单个点数据。
-        if layer_wkb_type not in [QgsWkbTypes.Point, QgsWkbTypes.MultiPoint]:
-            print(f"错误: 图层 '{layer_name}' 的几何类型 '{QgsWkbTypes.displayString(int(layer_wkb_type))}' 不受支持。只支持Point和MultiPoint。跳过此图层。")
-            continue
+            # 获取图层的几何类型（例如，点、线、面）。
+            layer_wkb_type = layer.wkbType()
+            # 检查几何类型是否为点 (Point) 或多点 (MultiPoint)。
+            # 只有这两种类型支持导出为单个点数据。
+            if layer_wkb_type not in [QgsWkbTypes.Point, QgsWkbTypes.MultiPoint]:
+                layer_jobs.append(([f"错误: 图层 '{layer_name}' 的几何类型 '{QgsWkbTypes.displayString(int(layer_wkb_type))}' 不受支持。只支持Point和MultiPoint。跳过此图层。"], None))
+                continue
 
-        # 获取当前图层的原始坐标系。
-        source_crs = layer.crs()
-        # 创建一个坐标转换对象，用于将图层原始坐标系转换为目标坐标系 (WGS84)。
-        transform = QgsCoordinateTransform(source_crs, target_crs, project)
-
-        # 存储当前图层所有要素的原始属性和几何。
-        current_layer_features_raw_data = []
-        # 用于存储当前图层检测到的第一个非空有效线路名称。
-        first_valid_line_name_in_layer = None
-        # 用于存储当前图层检测到的第一个非空有效 FHM_No 值。
-        first_valid_fhm_no_in_layer = None
-        # 【新增变量】用于存储当前图层检测到的第一个非空有效 direction 值。
-        first_valid_direction_in_layer = None
-        # 【新增变量】用于存储当前图层检测到的第一个非空有效 color 值。
-        first_valid_color_in_layer = None
-
-        # --- 第一次遍历：收集所有要素的原始数据，并尝试找到有效的线路名称、FHM_No、direction 和 color ---
-        # 这一步是为了在处理具体点数据之前，先确定整个图层可能使用的默认值。
-        for feature in layer.getFeatures(): # 遍历图层中的每一个要素
-            attrs = feature.attributes() # 获取要素的所有属性值
-            # 将属性名和属性值组合成一个字典，方便按名称访问。
-            feature_data_raw = {layer.fields().at(i).name(): attrs[i] for i in range(len(attrs))}
-
-            # 寻找第一个非空且非空白的 'name' 值。
-            # 如果要素的 'name' 字段有值，就用它作为该图层的默认线路名称。
-            name_value_check = str(feature_data_raw.get('name', '') or '').strip()
-            if name_value_check and first_valid_line_name_in_layer is None:
-                first_valid_line_name_in_layer = name_value_check
-
-            # 寻找第一个非空且非空白的 'FHM_No' 值。
-            # 如果要素的 'FHM_No' 字段有值，就用它作为该图层的默认 FHM_No。
-            fhm_no_value_check = str(feature_data_raw.get('FHM_No', '') or '').strip()
-            if fhm_no_value_check and first_valid_fhm_no_in_layer is None:
-                first_valid_fhm_no_in_layer = fhm_no_value_check
-
-            # 【新增逻辑】寻找第一个非空且非空白的 'direction' 值。
-            direction_value_check = str(feature_data_raw.get('direction', '') or '').strip()
-            if direction_value_check and first_valid_direction_in_layer is None:
-                first_valid_direction_in_layer = direction_value_check
-
-            # 【新增逻辑】寻找第一个非空且非空白的 'color' 值。
-            color_value_check = str(feature_data_raw.get('color', '') or '').strip()
-            if color_value_check and first_valid_color_in_layer is None:
-                first_valid_color_in_layer = color_value_check
-
-            geom = feature.geometry() # 获取要素的几何信息
-            # 将要素本身、其原始属性字典和几何对象存储起来。
-            current_layer_features_raw_data.append((feature, feature_data_raw, geom))
-
-
-        # 检查是否找到了有效的线路名称。如果没有，则警告并跳过此图层。
-        if first_valid_line_name_in_layer is None:
-            print(f"警告: 图层 '{layer_name}' 中所有要素的 'name' 字段都为空或只包含空白字符。此图层将不会导出任何要素。")
-            continue # 跳过整个图层的处理和导出
+            layer_jobs.append(([], (layer_name, QgsVectorLayerFeatureSource(layer), layer.fields(), layer.crs())))
+        validate_stage.set_count("layers", sum(1 for _, layer_job in layer_jobs if layer_job))
+
+    # 各图层的要素提取在线程池中并行执行；结果和提示信息按图层的原始顺序合并和打印，保证输出顺序确定。
+    with profiler.stage("extract") as extract_stage:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            layer_futures = [
+                executor.submit(_extract_layer_points, *layer_job, target_crs, transform_context,
+                                qgis_field_to_xml_header_map, keep_extra_fields) if layer_job else None
+                for _, layer_job in layer_jobs
+            ]
+            for (validation_messages, _), layer_future in zip(layer_jobs, layer_futures):
+                for message in validation_messages:
+                    print(message)
+                if layer_future is None:
+                    continue
+                layer_points, layer_messages = layer_future.result()
+                for message in layer_messages:
+                    print(message)
+                all_processed_points_for_final_export.extend(layer_points)
+        extract_stage.set_count("points", len(all_processed_points_for_final_export))
 
-        else:
-            print(f"信息: 图层 '{layer_name}' 找到线路名称: '{first_valid_line_name_in_layer}'。所有未填写 'name' 字段的要素将使用此值。")
+    return all_processed_points_for_final_export
 
-        # 检查是否找到了有效的 FHM_No。如果没有，则警告。
-        if first_valid_fhm_no_in_layer is None:
-            print(f"警告: 图层 '{layer_name}' 中所有要素的 'FHM_No' 字段都为空或只包含空白字符。此图层所有要素的 'Firm_Highway_Number' 将为空。")
-        else:
-            print(f"信息: 图层 '{layer_name}' 找到 'FHM_No': '{first_valid_fhm_no_in_layer}'。所有未填写 'FHM_No' 字段的要素将使用此值。")
 
-        # 【新增逻辑】检查是否找到了有效的 direction。
-        if first_valid_direction_in_layer is None:
-            print(f"警告: 图层 '{layer_name}' 中所有要素的 'direction' 字段都为空或只包含空白字符。此图层所有要素的 'direction' 将为空。")
-        else:
-            print(f"信息: 图层 '{layer_name}' 找到 'direction': '{first_valid_direction_in_layer}'。所有未填写 'direction' 字段的要素将使用此值。")
+def process_and_export_qgis_layers_to_rmp_json(layer_names, json_template_path, json_output_directory, output_name, xml_output_filepath=None,
+                                               num_transfer_lines=6, keep_extra_fields=False, max_workers=None, profile=False, project=None,
+                                               **json_conversion_options):
+    """
+    处理指定的 QGIS 矢量图层中的点要素，在同一次运行中直接生成 RMP JSON 地图文件：
+    点数据在内存中直接交给 Highway_map_JSON_producer_4c.py 的节点/边构建，不再写出 XML 数据表后重新解析。
+    生成的 JSON 与先导出 XML 再转换的结果完全相同；需要保留 XML 核对数据时，可通过 xml_output_filepath 同时写出 XML。
 
-        # 【新增逻辑】检查是否找到了有效的 color。
-        if first_valid_color_in_layer is None:
-            print(f"警告: 图层 '{layer_name}' 中所有要素的 'color' 字段都为空或只包含空白字符。此图层所有要素的 'color' 将为空。")
-        else:
-            print(f"信息: 图层 '{layer_name}' 找到 'color': '{first_valid_color_in_layer}'。所有未填写 'color' 字段的要素将使用此值。")
-
-
-        # --- 第二遍遍历：处理数据，并应用找到的线路名称、FHM_No、direction、color，并生成ID ---
-        current_layer_features_processed = [] # 存储当前图层处理后的点数据
-
-        for feature, feature_data_raw, geom in current_layer_features_raw_data:
-            # 检查几何是否为空或无效。
-            if not geom or geom.isEmpty():
-                print(f"警告: 要素 {feature.id()} 几何为空或无效。跳过其点位导出。")
-                continue # 跳过几何为空的要素，因为无法提取坐标
-
-            points_in_feature = [] # 用于存储当前要素中的所有点（对于多点要素）
-            if geom.wkbType() == QgsWkbTypes.Point:
-                # 如果是点几何，直接添加其坐标。
-                points_in_feature.append(geom.asPoint())
-            elif geom.wkbType() == QgsWkbTypes.MultiPoint:
-                # 如果是多点几何，遍历并添加所有子点坐标。
-                multi_points = geom.asMultiPoint()
-                if multi_points:
-                    for pt in multi_points:
-                        points_in_feature.append(pt)
-                else:
-                    print(f"警告: MultiPoint 要素 {feature.id()} 不包含任何子点。跳过。")
-                    continue
-            else:
-                # 不支持的几何类型，跳过。
-                print(f"警告: 要素 {feature.id()} 的几何类型 '{QgsWkbTypes.displayString(int(geom.wkbType()))}' 不受支持。跳过。")
-                continue
+    参数:
+        layer_names (list): 包含要处理的 QGIS 图层名称的列表。
+        json_template_path (str): JSON 模板文件路径 (如 data/highway_firm_model.json)。
+        json_output_directory (str): JSON 输出目录。
+        output_name (str): 输出文件名 (不含扩展名)，输出文件为 <output_name>.json (压缩时追加 .gz / .br)。
+        xml_output_filepath (str | None): 同时写出的 XML 数据表路径 (扩展名为 .npz 时写出二进制中间文件)，默认不写出。
+        num_transfer_lines, keep_extra_fields, max_workers, project: 见 process_and_export_qgis_layers_to_xml。
+        profile (bool): 是否按阶段记录耗时、内存峰值和数据量。为 True 时将分析报告保存在 JSON 文件旁边 (追加 .profile.json)，
+                        并作为返回值返回；JSON 转换的各阶段 (parse 到 serialize) 记录在 rmp_json 阶段之内。
+        json_conversion_options: 传给 Highway_map_JSON_producer_4c.convert_points_to_json_file 的其他参数
+                                 (snap_tolerance、incremental、json_format、compression、json_backend_name、lod_tolerances)。
 
-            # 遍历要素中的每一个点（对于单点要素只有一个点，对于多点要素有多个点）。
-            for pt in points_in_feature:
-                # 将点坐标从原始 CRS 转换为目标 CRS (WGS84)。
-                transformed_point = transform.transform(pt)
-                # 提取经度 (x) 和纬度 (y)，并四舍五入到小数点后6位，确保精度一致性。
-                x_coord = round(transformed_point.x(), 6)
-                y_coord = round(transformed_point.y(), 6)
-
-                processed_data = {} # 存储当前点的处理结果
-                processed_data['x'] = x_coord
-                processed_data['y'] = y_coord
-
-                # 获取当前要素的 'name' 值，如果为空则使用图层公共值 (first_valid_line_name_in_layer)。
-                current_name_value = str(feature_data_raw.get('name', '') or '').strip()
-                processed_data['name'] = current_name_value if current_name_value else first_valid_line_name_in_layer
-
-                # 获取当前要素的 'FHM_No' 值，如果为空则使用图层公共值 (first_valid_fhm_no_in_layer)。
-                current_fhm_no_value = str(feature_data_raw.get('FHM_No', '') or '').strip()
-                processed_data['Firm_Highway_Number'] = current_fhm_no_value if current_fhm_no_value else first_valid_fhm_no_in_layer
-
-                # 【修改逻辑】获取当前要素的 'color' 值，如果为空则使用图层公共值 (first_valid_color_in_layer)。
-                current_color_value = str(feature_data_raw.get('color', '') or '').strip()
-                processed_data['color'] = current_color_value if current_color_value else first_valid_color_in_layer
-
-                # 【修改逻辑】获取当前要素的 'direction' 值，如果为空则使用图层公共值 (first_valid_direction_in_layer)。
-                current_direction_value = str(feature_data_raw.get('direction', '') or '').strip()
-                processed_data['direction'] = current_direction_value if current_direction_value else first_valid_direction_in_layer
-
-
-                # 直接映射 'name_zh', 'name_en', 'type' 字段。
-                processed_data['name_zh'] = str(feature_data_raw.get('name_zh', '') or '')
-                processed_data['name_en'] = str(feature_data_raw.get('name_en', '') or '')
-                processed_data['type'] = str(feature_data_raw.get('type', '') or '')
-
-                # 映射并添加预定义的特殊字段（如 transfer_line_X）。
-                # 遍历映射字典，将 QGIS 字段名转换为 XML 表头名。
-                # 注意：'FHM_No' 已经在上面单独处理了，所以这里要跳过，避免重复处理。
-                for qgis_field_name, xml_header_name in qgis_field_to_xml_header_map.items():
-                    if qgis_field_name == 'FHM_No': # 避免重复处理 FHM_No
-                        continue
-                    if qgis_field_name in feature_data_raw:
-                        processed_data[xml_header_name] = str(feature_data_raw.get(qgis_field_name, '') or '')
-
-                # 添加所有未被特殊处理的 QGIS 字段。
-                # 这一步是为了将 QGIS 图层中除了已明确映射和处理的字段之外，
-                # 其他的所有字段也一并添加到 processed_data 中。
-                for field_name in layer.fields().names():
-                    # 确保不添加已在映射中处理过的字段 ('qgis_field_to_xml_header_map' 的键)
-                    # 也不添加已经直接添加到 processed_data 的字段 (如 'x', 'y', 'name' 等)
-                    # 也不添加 'FHM_No' (因为它被特殊处理了)
-                    is_mapped = field_name in qgis_field_to_xml_header_map
-                    is_directly_added = field_name in processed_data
-                    is_fhm_no = field_name == 'FHM_No'
-
-                    if not is_mapped and not is_directly_added and not is_fhm_no:
-                        processed_data[field_name] = str(feature_data_raw.get(field_name, '') or '')
-
-                # --- 核心修改：处理 'id' 字段 ---
-                # 获取 QGIS 中已有的 'id' 值
-                existing_id = str(feature_data_raw.get('id', '') or '').strip()
-
-                if existing_id:
-                    # 如果 QGIS 中 'id' 字段不为空，则优先使用它。
-                    processed_data['id'] = existing_id
-                else:
-                    # 如果 QGIS 中 'id' 字段为空，则根据 (x, y) 坐标生成一个稳定的短 ID (9位)。
-                    processed_data['id'] = generate_stable_id_from_coords(x_coord, y_coord, target_length=9)
-                    # print(f"为坐标 ({x_coord}, {y_coord}) 生成了短稳定ID: {processed_data['id']}") # 调试信息
-
-                # 处理 'seq' 字段：如果 QGIS 中为空，则在后续步骤中生成。
-                # 'seq' 字段在这里只是从原始数据中获取，具体的自动生成逻辑在后面排序后进行。
-                processed_data['seq'] = str(feature_data_raw.get('seq', '') or '')
-
-                # 将当前处理好的点数据添加到当前图层的列表中。
-                current_layer_features_processed.append(processed_data)
-
-        # 对当前图层内的要素进行排序：首先按 'name' 字段，然后按 'seq' 字段。
-        # _try_int 辅助函数用于确保 'seq' 字段（可能包含混合字符串和数字）的正确排序。
-        # 确保 _try_int 始终返回元组，以避免 TypeError
-        current_layer_features_processed.sort(key=lambda p: (p.get('name', ''), _try_int(p.get('seq', ''))))
-
-        seq_counter_by_line = {} # 字典，用于为每个线路生成独立的 'seq' 值。
-                                 # 键是线路名称，值是当前线路的下一个序列号。
-
-        # 第三遍遍历：为没有 'seq' 值的点生成 'seq'，并将其添加到最终导出列表。
-        for point_data in current_layer_features_processed:
-            line_name = point_data.get('name')
-            # 如果当前线路名称是第一次出现，则初始化其序列号为 1。
-            if line_name not in seq_counter_by_line:
-                seq_counter_by_line[line_name] = 1
-
-            # 如果 'seq' 字段在 QGIS 中为空，则自动生成 'seq' 值。
-            if not point_data['seq']:
-                # 尝试从线路名称中提取数字部分，例如 "L1" 中的 "1"。
-                line_num_match = re.search(r'\d+', line_name)
-                # 构建线路前缀，例如 "L1"，如果线路名称没有数字，就直接用线路名称。
-                line_prefix = f"L{line_num_match.group(0)}" if line_num_match else line_name
-                # 生成新的 'seq' 值，格式为 "L<线路号>_<两位站号>" (例如 "L1_01")。
-                point_data['seq'] = f"{line_prefix}_{seq_counter_by_line[line_name]:02d}"
-
-            seq_counter_by_line[line_name] += 1 # 当前线路的序列号递增。
-
-            # 将当前处理好的点数据直接添加到最终要导出的总列表中。
-            # 这里不再进行坐标去重，因为需求是只要是要素里的点，都导出。
-            all_processed_points_for_final_export.append(point_data)
-
-    # --- 最终导出前，对所有点进行统一排序 ---
-    # 如果处理完所有图层后，没有收集到任何可导出的数据，则打印警告并返回。
-    if not all_processed_points_for_final_export:
-        print("没有可导出数据。请检查图层是否包含有效点要素，并且字段已正确填充。")
-        return
-
-    # 最终的导出列表就是已经包含了所有图层并已处理好的点数据。
-    all_points_for_final_export = all_processed_points_for_final_export
-
-    def final_sort_key(p):
-        """
-        定义最终导出顺序的排序键：首先按线路名称，然后按序列号。
-        这确保了 XML 中数据的组织结构是逻辑和可预测的。
-        """
-        name = p.get('name', '')
-        seq = p.get('seq', '')
-        # 使用 _try_int 确保正确的数字和文本混合排序，并且始终返回元组
-        return (name, _try_int(seq))
-
-    # 对所有点进行最终排序。
-    all_points_for_final_export.sort(key=final_sort_key)
-
-    # 获取当前时间，用于 XML 中的创建/保存时间戳。
-    current_time = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
-
-    # XML 声明和处理指令，这是 XML 文件开头的标准部分。
-    xml_declaration = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
-    mso_application_pi = '<?mso-application progid="Excel.Sheet"?>\n'
-
-    # 构建 XML Workbook 根元素及其属性。
-    # 这些属性定义了 XML 命名空间，是 Excel SpreadsheetML 格式的要求。
-    workbook = Element("Workbook", {
-        "xmlns": "urn:schemas-microsoft-com:office:spreadsheet",
-        "xmlns:o": "urn:schemas-microsoft-com:office:office",
-        "xmlns:x": "urn:schemas-microsoft-com:office:excel",
-        "xmlns:ss": "urn:schemas-microsoft-com:office:spreadsheet",
-        "xmlns:html": "http://www.w3.org/TR/REC-html40",
-        "xmlns:dt": "uuid:C2F41010-65B3-11d1-A29F-00AA00C14882"
-    })
-
-    # 添加文档属性，如作者、创建/保存时间。
-    document_properties = SubElement(workbook, "DocumentProperties", {
-        "xmlns": "urn:schemas-microsoft-com:office:office"
-    })
-    SubElement(document_properties, "Author").text = "QGIS Exporter"
-    SubElement(document_properties, "LastAuthor").text = "QGIS Exporter"
-    SubElement(document_properties, "Created").text = current_time
-    SubElement(document_properties, "LastSaved").text = current_time
-
-    # 添加自定义文档属性，这些是 WPS Excel 特有的元数据。
-    custom_doc_props = SubElement(workbook, "CustomDocumentProperties", {
-        "xmlns": "urn:schemas-microsoft-com:office:office"
-    })
-    # ICV 值根据 FIRM_XML.xml 调整为 _11
-    SubElement(custom_doc_props, "ICV", {"dt:dt": "string"}).text = "A07F866F274640CBBCB2099FFB2A5A59_11"
-    SubElement(custom_doc_props, "KSOProductBuildVer", {"dt:dt": "string"}).text = "2052-12.1.0.21171"
-
-    # 添加 ExcelWorkbook 设置，控制 Excel 窗口的一些行为。
-    excel_workbook = SubElement(workbook, "ExcelWorkbook", {
-        "xmlns": "urn:schemas-microsoft-com:office:excel"
-    })
-    SubElement(excel_workbook, "WindowWidth").text = "25600"
-    SubElement(excel_workbook, "WindowHeight").text = "10480"
-    SubElement(excel_workbook, "ProtectStructure").text = "False"
-    SubElement(excel_workbook, "ProtectWindows").text = "False"
-
-    # 定义 Excel 中的样式。
-    styles = SubElement(workbook, "Styles")
-    # 默认样式
-    default_style = SubElement(styles, "Style", {"ss:ID": "Default", "ss:Name": "Normal"})
-    SubElement(default_style, "Alignment", {"ss:Vertical": "Center"})
-    SubElement(default_style, "Borders")
-    SubElement(default_style, "Font", {"ss:FontName": "宋体", "x:CharSet": "134", "ss:Size": "11", "ss:Color": "#000000"})
-    SubElement(default_style, "Interior")
-    SubElement(default_style, "NumberFormat")
-    SubElement(default_style, "Protection")
-
-    # 自定义样式 s49
-    s49_style = SubElement(styles, "Style", {"ss:ID": "s49"})
-    SubElement(s49_style, "Alignment", {"ss:Vertical": "Center"})
-    SubElement(s49_style, "Borders")
-    SubElement(s49_style, "Font", {"ss:FontName": "宋体", "x:CharSet": "134", "ss:Size": "11", "ss:Color": "#000000"})
-    SubElement(s49_style, "Interior")
-    SubElement(s49_style, "NumberFormat")
-    SubElement(s49_style, "Protection")
-
-    # 自定义样式 s50 (用于线路标题行)
-    s50_style = SubElement(styles, "Style", {"ss:ID": "s50"})
-    SubElement(s50_style, "Alignment", {"ss:Horizontal": "Center", "ss:Vertical": "Center"})
-    SubElement(s50_style, "Font", {"ss:FontName": "宋体", "x:CharSet": "134", "ss:Size": "12", "ss:Color": "#0000FF", "ss:Bold": "1" })
-
-    # 自定义样式 s51 (用于文本格式单元格)
-    s51_style = SubElement(styles, "Style", {"ss:ID": "s51"})
-    SubElement(s51_style, "NumberFormat", {"ss:Format": "@"}) # @ 表示文本格式
-
-    # 自定义样式 s52 (用于数字格式单元格)
-    s52_style = SubElement(styles, "Style", {"ss:ID": "s52"})
-    SubElement(s52_style, "NumberFormat") # 通用数字格式
-
-    # 创建 Worksheet (工作表)
-    worksheet = SubElement(workbook, "Worksheet", {"ss:Name": "Sheet1"})
-
-    # 定义所有预期列的名称和它们在最终 XML 中的固定 1-based 索引。
-    # 这是严格按照 FIRM_XML_3.xml 模板的结构来定义的，确保列顺序和数量正确。
-    xml_header_definitions = [
-        ("name", 1), ("color", 2), ("direction", 3), ("seq", 4), ("type", 5),
-        ("name_zh", 6), ("name_en", 7), ("x", 8), ("y", 9), ("id", 10)
-    ]
-
-    # 动态生成 transfer_line_X 列的定义 (11-16)。
-    # 这里固定生成到 transfer_line_6，以匹配 WPS 导出的 XML 结构。
-    for i in range(1, 7):
-        xml_header_definitions.append((f"transfer_line_{i}", 10 + i))
-
-    # 添加 Firm_Highway_Number 列的定义 (17)。
-    xml_header_definitions.append(("Firm_Highway_Number", 17))
-
-    # 从定义中创建 header_name 到固定列索引的映射。
-    # 方便通过列名快速查找其在 XML 中的位置。
-    header_to_fixed_col_index = {header[0]: header[1] for header in xml_header_definitions}
-    # 创建有序的 header names 列表，用于遍历时按照正确的顺序生成 XML 列。
-    all_ordered_header_names = [header[0] for header in xml_header_definitions]
-
-    # 获取最大的列号，用于 Table 的 ExpandedColumnCount 属性。
-    max_column_index = xml_header_definitions[-1][1] # Firm_Highway_Number 的索引，即 17
-
-    # 预设列宽度，匹配 FIRM_XML_3.xml 的 Column 定义。
-    # 这些宽度是 WPS Excel 导出的标准宽度。
-    column_widths = {
-        "name": 71.25, "color": 46.5, "direction": 78.75, "seq": 66.75, "type": 32.25,
-        "name_zh": 120.75, "name_en": 120.75, "x": 85.5, "y": 86.25, "id": 93.75,
-        "transfer_line_1": 105,
-        "transfer_line_2": 105,
-        "transfer_line_3": 105,
-        "transfer_line_4": 105,
-        "transfer_line_5": 105,
-        "transfer_line_6": 105,
-        "Firm_Highway_Number": 136.5
-    }
-
-    # 创建 Table 元素，它包含了所有数据行和列定义。
-    table = SubElement(worksheet, "Table", {
-        "ss:ExpandedColumnCount": str(max_column_index), # 定义总列数
-        "x:FullColumns": "1", # Excel 内部属性
-        "x:FullRows": "1", # Excel 内部属性
-        "ss:DefaultColumnWidth": "48", # 默认列宽
-        "ss:DefaultRowHeight": "14" # 默认行高
-    })
-
-    # 生成 Column 定义。
-    # 这一步是为了在 XML 中预定义每一列的宽度和样式。
-    for i in range(1, max_column_index + 1):
-        col_attrs = {"ss:StyleID": "s49", "ss:AutoFitWidth": "0"} # 默认样式和不自动调整宽度
-
-        current_header_key_for_width = None
-        # 查找当前列索引对应的表头名称，以便获取其预设宽度。
-        for header_name, index in xml_header_definitions:
-            if index == i:
-                current_header_key_for_width = header_name
-                break
-
-        # 根据表头名称获取列宽，如果未找到则使用默认值 48。
-        col_width = column_widths.get(current_header_key_for_width, 48) if current_header_key_for_width else 48
-        col_attrs["ss:Width"] = str(col_width) # 设置列宽属性
-
-        # 为特定的列设置 ss:Index 属性。
-        # 这是为了在 XML 中明确指示某些列的起始索引，通常用于优化或兼容性。
-        if i == 1:
-            col_attrs["ss:Index"] = "1"
-        elif i == 11:
-            col_attrs["ss:Index"] = "11"
-
-        SubElement(table, "Column", col_attrs) # 将 Column 元素添加到 Table 中
-
-    # 创建第1行，数据标识行 (表头)。
-    header_data_row = SubElement(table, "Row", {"ss:Index": "1"})
-    # 按照预定义的顺序遍历所有表头名称，生成 Cell 和 Data 元素。
-    for header_name in all_ordered_header_names:
-        cell = SubElement(header_data_row, "Cell")
-        data = SubElement(cell, "Data", {"ss:Type": "String"})
-        data.text = header_name # 表头名称作为 Cell 的数据
-
-    current_physical_row_count = 2 # 跟踪当前在 XML Table 中的物理行数，从第2行开始（第1行是表头）。
-    last_line_name = None # 用于检测线路名称变化，以便插入线路标题行。
-    line_title_style_id = "s50" # 线路标题行使用的样式 ID。
-
-    # 遍历所有要导出的点数据，生成实际数据行。
-    # all_points_for_final_export 列表中的点数据已经按照线路和序列号排好序。
-    for point_data in all_points_for_final_export:
-        current_line_name = point_data.get('name')
-
-        # 如果当前线路名称与上一行不同，表示进入了新的线路，需要插入一个线路标题行。
-        if current_line_name != last_line_name:
-            line_title_row = SubElement(table, "Row") # 创建新的行元素
-            line_title_row.set("ss:Height", "24") # 设置行高
-            line_title_row.set("ss:AutoFitHeight", "0") # 不自动调整行高
-
-            # 创建合并单元格的 Cell，MergeAcross 属性表示合并的列数。
-            # 合并的列数是总列数减去 1 (因为当前 Cell 自身也占一列)。
-            line_title_cell = SubElement(line_title_row, "Cell", {"ss:MergeAcross": str(max_column_index - 1)})
-            line_title_cell.set("ss:StyleID", line_title_style_id) # 应用线路标题样式
-
-            line_title_data = SubElement(line_title_cell, "Data", {"ss:Type": "String"})
-            # 格式化线路标题的文本内容。
-            line_title_data.text = (
-                f"线路名称: {current_line_name} "
-                f"(颜色: {point_data.get('color', '') or ''}, "
-                f"方向: {point_data.get('direction', '') or ''})"
-            )
-            current_physical_row_count += 1 # 线路标题行也算作一物理行
-
-        row = SubElement(table, "Row") # 创建数据行
-
-        last_generated_col_index = 0 # 跟踪上一个生成的 Cell 的列索引，用于处理 ss:Index 属性
-
-        # 按照预定义的表头顺序遍历，生成每个 Cell。
-        for header_name in all_ordered_header_names:
-            value = point_data.get(header_name, "") # 获取当前点数据中对应列的值
-
-            fixed_col_index = header_to_fixed_col_index[header_name] # 获取该列的固定索引
-
-            # 判断是否为核心列 (name 到 id)。
-            # 核心列即使为空也需要生成 Cell 标签，非核心列为空则可以跳过。
-            is_core_column = (fixed_col_index >= 1 and fixed_col_index <= 10)
-
-            if str(value).strip() == "" and not is_core_column:
-                # 如果值为空字符串且不是核心列，则完全跳过，不生成 Cell 标签。
-                # 这样可以减小 XML 文件大小，并与 WPS Excel 导出的行为保持一致。
-                continue
+    返回:
+        dict | None: profile 为 True 时返回分析报告 (见 StageProfiler.report)，否则返回 None。
 
-            cell_attrs = {} # 单元格属性字典
-            if header_name in ["x", "y"]:
-                cell_attrs["ss:StyleID"] = "s52" # 坐标使用数字样式
-                data_type = "Number" # 数据类型为数字
-            else:
-                cell_attrs["ss:StyleID"] = "s51" # 其他使用文本样式
-                data_type = "String" # 数据类型为字符串
-
-            # 如果当前列的索引与上一个生成的列的索引不连续，则需要明确指定 ss:Index。
-            # 这是为了处理跳过空非核心列后，后续列的索引能够正确对齐。
-            if fixed_col_index != (last_generated_col_index + 1):
-                cell_attrs["ss:Index"] = str(fixed_col_index)
-
-            cell = SubElement(row, "Cell", cell_attrs) # 创建 Cell 元素并设置属性
-            data = SubElement(cell, "Data", {"ss:Type": data_type}) # 创建 Data 元素并设置数据类型
-            data.text = str(value) # 将值作为 Data 的文本内容
-
-            last_generated_col_index = fixed_col_index # 更新上一个生成的列索引
-
-        current_physical_row_count += 1 # 数据行也算作一物理行
-        last_line_name = current_line_name # 更新上一行的线路名称
-
-    # 更新 Table 的 ExpandedRowCount 属性，指示表格的总行数（包括表头和线路标题行）。
-    table.set("ss:ExpandedRowCount", str(current_physical_row_count - 1))
-
-    # 添加 WorksheetOptions，控制 Excel 工作表的一些显示和保护设置。
-    worksheet_options = SubElement(worksheet, "WorksheetOptions", {
-        "xmlns": "urn:schemas-microsoft-com:office:excel"
-    })
-    page_setup = SubElement(worksheet_options, "PageSetup")
-    SubElement(page_setup, "Header")
-    SubElement(page_setup, "Footer")
-    SubElement(worksheet_options, "Selected")
-    SubElement(worksheet_options, "TopRowVisible").text = "0"
-    SubElement(worksheet_options, "LeftColumnVisible").text = "0"
-    SubElement(worksheet_options, "PageBreakZoom").text = "100"
-    panes = SubElement(worksheet_options, "Panes")
-    pane = SubElement(panes, "Pane")
-    SubElement(pane, "Number").text = "3"
-    SubElement(pane, "ActiveRow").text = "0"
-    SubElement(pane, "ActiveCol").text = "0"
-
-    SubElement(worksheet_options, "ProtectObjects").text = "False"
-    SubElement(worksheet_options, "ProtectScenarios").text = "False"
-
-    # 将 XML 树转换为字符串。
-    raw_xml_string = tostring(workbook, encoding='utf-8').decode("utf-8")
-
-    # 对生成的 XML 字符串进行一些格式清理，移除多余的换行符和空格，
-    # 以使其更紧凑，并更接近 WPS Excel 导出的风格。
-    raw_xml_string = re.sub(r'>\s*<', '><', raw_xml_string)
-    raw_xml_string = raw_xml_string.replace('>\n<', '><')
-    raw_xml_string = raw_xml_string.replace('/>\n<', '><')
-
-    # 添加 XML 声明和处理指令到 XML 内容的开头。
-    final_xml_content = xml_declaration + mso_application_pi + raw_xml_string
-
-    # 将最终的 XML 内容写入到指定的文件中。
-    with open(output_filepath, "w", encoding="utf-8") as f:
-        f.write(final_xml_content)
-
-    print(f"数据已成功导出到: {output_filepath}")
+    异常:
+        NoExportDataError: 没有任何可导出的点数据 (此时不写出文件)。
+    """
+    # JSON 转换依赖 NumPy，只在使用此功能时导入
+    import Highway_map_JSON_producer_4c as json_producer
+
+    profiler = StageProfiler() if profile else NULL_PROFILER
+    with open(json_template_path, 'r', encoding='utf-8') as f:
+        json_template_content = f.read()
+
+    all_points_for_final_export = extract_qgis_layer_points(
+        layer_names, num_transfer_lines, keep_extra_fields, max_workers, profiler, project
+    )
+    if not all_points_for_final_export:
+        raise NoExportDataError()
+
+    # 与导出 XML 时的顺序相同，JSON 转换读取点数据的顺序与读取 XML 数据行的顺序一致
+    sort_points_for_export(all_points_for_final_export, profiler)
+    if xml_output_filepath:
+        write_points_to_file(all_points_for_final_export, xml_output_filepath, profiler)
+        print(f"数据已成功导出到: {xml_output_filepath}")
+
+    with profiler.stage("rmp_json"):
+        json_output_filepath = json_producer.convert_points_to_json_file(
+            all_points_for_final_export, output_name, json_template_content, json_output_directory,
+            profiler=profiler, **json_conversion_options
+        )
+    print(f"RMP JSON 已成功生成: {json_output_filepath}")
+
+    if not profiler.enabled:
+        return None
+    report_filepath = profile_report_path(json_output_filepath)
+    profiler.write_report(report_filepath)
+    print(f"阶段性能分析报告已保存到: {report_filepath}")
+    return profiler.report()
 
 # --- 如何在QGIS中使用此代码 ---
 # (此部分与之前的说明相同，无需修改)
@@ -0,0 +1,188 @@
+"""
+RMP JSON 地图文件的流式写出 (Highway_map_JSON_producer_4c.py 使用)。
+
+原先先用 json.dumps(json_data, indent=4) 生成整个文件的字符串再写入，大地图会在内存中同时存在整个文档的字符串。
+本模块逐个节点、逐条边编码并写入文件，并支持：
+- 'indent' 格式：使用标准库后端时与 json.dumps(json_data, indent=4, ensure_ascii=False) 的输出逐字节相同；
+- 'compact' 格式：使用紧凑分隔符 (',', ':')，不写换行和缩进，文件约为 'indent' 格式的一半，浏览器加载更快；
+- 可选 gzip 或 brotli 压缩输出 (文件名分别追加 .gz / .br)，可直接用于 Web 服务的预压缩静态文件。
+brotli 为可选依赖，只在选择 brotli 压缩时导入。
+节点和边的编码由 json_backend 选择的后端 (orjson / ujson / 标准库 json) 完成。
+"""
+import gzip
+import json
+import os
+
+from json_backend import get_json_backend
+
+# 输出格式
+JSON_OUTPUT_FORMATS = ('indent', 'compact')
+DEFAULT_JSON_OUTPUT_FORMAT = 'indent'
+# 输出压缩方式及其文件扩展名
+JSON_COMPRESSION_SUFFIXES = {'none': '', 'gzip': '.gz', 'brotli': '.br'}
+DEFAULT_JSON_COMPRESSION = 'none'
+
+# 'indent' 格式每一层的缩进
+JSON_INDENT = "    "
+# 逐个元素编码的容器：顶层对象、'graph' 对象，以及其中的节点和边列表
+_STREAMED_CONTAINER_PATHS = {(), ('graph',), ('graph', 'nodes'), ('graph', 'edges')}
+# 写入文件前累积的字符数，减少小块写入的次数
+_WRITE_BUFFER_CHARS = 1 << 16
+
+
+def rmp_json_output_path(output_base_path, compression=DEFAULT_JSON_COMPRESSION):
+    """
+    根据压缩方式生成输出文件路径。
+
+    参数:
+        output_base_path (str): 不含扩展名的输出路径。
+        compression (str): JSON_COMPRESSION_SUFFIXES 中的压缩方式。
+
+    返回:
+        str: 例如 'out/map.json' 或 'out/map.json.gz'。
+    """
+    return f"{output_base_path}.json{JSON_COMPRESSION_SUFFIXES[compression]}"
+
+
+def _encode_value(value, output_format, level, json_backend):
+    """编码一个不需要逐个元素写出的值；'indent' 格式下按所在层级缩进后续行。"""
+    if output_format == 'compact':
+        return json_backend.dumps_compact(value)
+    # JSON 字符串中的换行都已转义，因此编码结果中的换行只出现在缩进位置
+    return json_backend.dumps_indented(value).replace("\n", "\n" + JSON_INDENT * level)
+
+
+def _iter_json_chunks(value, output_format, level, path, json_backend):
+    if path not in _STREAMED_CONTAINER_PATHS or not isinstance(value, (dict, list)) or not value:
+        yield _encode_value(value, output_format, level, json_backend)
+        return
+
+    is_dict = isinstance(value, dict)
+    yield "{" if is_dict else "["
+    if output_format == 'compact':
+        item_prefix, key_separator, closing_prefix = "", ":", ""
+    else:
+        item_prefix = "\n" + JSON_INDENT * (level + 1)
+        key_separator = ": "
+        closing_prefix = "\n" + JSON_INDENT * level
+
+    items = value.items() if is_dict else enumerate(value)
+    for item_index, (key, item) in enumerate(items):
+        prefix = item_prefix if item_index == 0 else "," + item_prefix
+        if is_dict:
+            yield f"{prefix}{json.dumps(key, ensure_ascii=False)}{key_separator}"
+            yield from _iter_json_chunks(item, output_format, level + 1, path + (key,), json_backend)
+        else:
+            # 节点和边列表中的元素逐个编码，不再递归
+            yield prefix + _encode_value(item, output_format, level + 1, json_backend)
+    yield closing_prefix + ("}" if is_dict else "]")
+
+
+def iter_rmp_json_chunks(json_data, output_format=DEFAULT_JSON_OUTPUT_FORMAT, json_backend=None):
+    """
+    依次产出 JSON 文本片段，拼接后即为完整的 RMP JSON 文档。
+
+    参数:
+        json_data (dict): RMP JSON 数据。
+        output_format (str): 'indent' 或 'compact'。
+        json_backend (JsonBackend | None): 编码使用的后端，默认为 get_json_backend() 自动选择的后端。
+
+    产出:
+        str: JSON 文本片段。
+    """
+    if output_format not in JSON_OUTPUT_FORMATS:
+        raise ValueError(f"未知的JSON输出格式: {output_format}")
+    return _iter_json_chunks(json_data, output_format, 0, (), json_backend or get_json_backend())
+
+
+def _open_compressed_text_writer(file_path, compression):
+    """按压缩方式打开用于写入 UTF-8 文本的文件对象。"""
+    if compression == 'none':
+        return open(file_path, "w", encoding="utf-8")
+    if compression == 'gzip':
+        return gzip.open(file_path, "wt", encoding="utf-8")
+    if compression == 'brotli':
+        return _BrotliTextWriter(file_path)
+    raise ValueError(f"未知的压缩方式: {compression}")
+
+
+class _BrotliTextWriter:
+    """以流式方式将 UTF-8 文本压缩写入 brotli 文件。"""
+
+    def __init__(self, file_path):
+        try:
+            import brotli # 可选依赖，仅在选择 brotli 压缩时需要
+        except ImportError as e:
+            raise RuntimeError("brotli 压缩需要安装 brotli 模块 (pip install brotli)。") from e
+        self._compressor = brotli.Compressor()
+        self._file = open(file_path, "wb")
+
+    def write(self, text):
+        self._file.write(self._compressor.process(text.encode("utf-8")))
+
+    def close(self):
+        try:
+            self._file.write(self._compressor.finish())
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_rmp_json(json_data, output_file_path, output_format=DEFAULT_JSON_OUTPUT_FORMAT, compression=DEFAULT_JSON_COMPRESSION,
+                   json_backend=None):
+    """
+    将 RMP JSON 数据流式写入文件。先写入临时文件，完成后再替换目标文件，避免中断时留下不完整的JSON。
+
+    参数:
+        json_data (dict): RMP JSON 数据。
+        output_file_path (str): 输出文件路径 (应已包含与压缩方式对应的扩展名，见 rmp_json_output_path)。
+        output_format (str): 'indent' 或 'compact'。
+        compression (str): 'none'、'gzip' 或 'brotli'。
+        json_backend (JsonBackend | None): 编码使用的后端，默认自动选择。
+    """
+    chunks = iter_rmp_json_chunks(json_data, output_format, json_backend)
+    temp_file_path = output_file_path + ".tmp"
+    try:
+        with _open_compressed_text_writer(temp_file_path, compression) as f:
+            buffered_chunks = []
+            buffered_chars = 0
+            for chunk in chunks:
+                buffered_chunks.append(chunk)
+                buffered_chars += len(chunk)
+                if buffered_chars >= _WRITE_BUFFER_CHARS:
+                    f.write("".join(buffered_chunks))
+                    buffered_chunks = []
+                    buffered_chars = 0
+            f.write("".join(buffered_chunks))
+    except BaseException:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+        raise
+    os.replace(temp_file_path, output_file_path)
+
+
+def read_rmp_json_text(file_path):
+    """
+    读取 write_rmp_json 写出的文件 (按扩展名 .gz / .br 自动解压)，返回 JSON 文本。
+    """
+    if file_path.endswith(JSON_COMPRESSION_SUFFIXES['gzip']):
+        with gzip.open(file_path, "rt", encoding="utf-8") as f:
+            return f.read()
+    if file_path.endswith(JSON_COMPRESSION_SUFFIXES['brotli']):
+        try:
+            import brotli # 可选依赖，仅在读取 brotli 压缩文件时需要
+        except ImportError as e:
+            raise RuntimeError("读取 brotli 压缩文件需要安装 brotli 模块 (pip install brotli)。") from e
+        with open(file_path, "rb") as f:
+            compressed_data = f.read()
+        try:
+            return brotli.decompress(compressed_data).decode("utf-8")
+        except brotli.error as e:
+            raise ValueError(f"无法解压 brotli 文件 '{file_path}': {e}") from e
+    with open(file_path, "r", encoding="utf-8") as f:
+        return f.read()
@@ -38,6 +38,7 @@ logger.info("--- 脚本开始运行 ---")
 # 指定 qgis_xml_producer_V2a.py 文件所在的目录。
 # 这是一个非常重要的路径，如果错误，Python 将找不到要导入的模块。
 # 请务必将此路径替换为您的 qgis_xml_producer_V2a.py 文件的实际存放位置。
+# 注意：qgis_xml_producer_V2a.py 依赖同目录下的 stable_id.py、spreadsheet_xml_writer.py、firm_workbook.py、layer_points.py、station_npz.py、seq_keys.py、station_record.py 和 stage_profiler.py，请将这些文件放在同一目录中。
 script_dir = 'C:/Users/yourname/AppData/Roaming/QGIS/QGIS3/profiles/default/python/plugins/'
 # 该文件夹是QGIS的python代码脚本实际存储文件夹，你可以根据你的实际配置进行修改。
 # 请将'yourname'改为你的实际用户名。
@@ -87,6 +88,10 @@ qgis_xml_producer_module = sys.modules[MODULE_NAME]
 output_dir = 'D:/map_maker/xml_output/'
 # 如果您的项目脚本是放在'map_generator'这个文件夹，请将路径改为'D:/map_generator/xml_output/'文件夹，或你实际所定的输出路径
 
+# 导出文件的格式：'xml' 为可以在 WPS/Excel 中编辑的 SpreadsheetML 数据表；
+# 'npz' 为二进制列式中间文件，体积小得多、Highway_map_JSON_producer_4c.py 读取也快得多，但不能手工编辑 (需要 NumPy)。
+output_format = 'xml'
+
 # 【新增功能】动态获取 QGIS 项目名称并用于命名输出文件
 project_name = "exported_stations_data_all_layers" # 默认输出文件名，以防获取项目名失败
 
@@ -109,21 +114,34 @@ try:
         logger.info(f"✅ 获取到 QGIS 项目名称: '{project_name}'，将用于命名输出文件。")
 
     # 构建最终的输出 XML 文件路径。
-    output_file = os.path.join(output_dir, f"{project_name}.xml")
+    output_file = os.path.join(output_dir, f"{project_name}.{output_format}")
 
 except Exception as e:
     logger.error(f"❌ 错误: 获取 QGIS 项目名称失败。将使用默认输出文件名。错误信息: {e}")
     # 发生错误时，回退到使用硬编码的默认文件名
-    output_file = os.path.join(output_dir, "exported_stations_data_all_layers.xml")
+    output_file = os.path.join(output_dir, f"exported_stations_data_all_layers.{output_format}")
 
 
 # 设置要包含的 'transfer_line_X' 列的数量。
 # 根据 XML 模板 (FIRM_XML_3.xml) 的要求，建议设置为 6，以匹配固定的列结构。
 num_transfer_lines = 6
 
+# 并行读取图层要素的线程数。None 表示使用默认值 (与 CPU 核心数相关)，设置为 1 则逐个图层依次处理。
+max_workers = None
+
+# 【新增功能】直接生成 RMP JSON 地图文件：设置 JSON 输出目录后，点数据在内存中直接转换为 JSON，
+# 不再需要之后单独运行 Highway_map_JSON_producer_4c.py 解析 XML (该脚本及其依赖的模块需放在同一目录中，并需要 NumPy)。
+# 为 None 时只导出 XML 数据表。
+json_output_dir = None # 例如 'D:/map_maker/json_output/'
+# JSON 模板文件 (highway_firm_model.json) 的路径
+json_template_file = 'D:/map_maker/data/highway_firm_model.json'
+# 直接生成 JSON 时是否同时写出 XML 数据表，便于核对数据
+write_xml_audit = True
+
 logger.info(f"\n--- 尝试运行导出函数 ---")
 logger.info(f"    输出文件路径: {output_file}")
 logger.info(f"    换乘线数量: {num_transfer_lines}")
+logger.info(f"    并行线程数: {max_workers or '默认'}")
 
 try:
     # 导入 QgsVectorLayer, QgsWkbTypes (如果之前没有导入的话)
@@ -158,13 +176,30 @@ try:
         logger.info(f"⭐ 将要导出以下图层: {point_layers_to_export}")
         # 调用 qgis_xml_producer_V2a 模块中的主导出函数。
         # 将检测到的所有点图层列表作为第一个参数传递。
-        qgis_xml_producer_module.process_and_export_qgis_layers_to_xml(
-            point_layers_to_export,
-            output_file,
-            num_transfer_lines=num_transfer_lines
-        )
+        if json_output_dir:
+            # 在同一次运行中直接生成 RMP JSON，XML 数据表仅作为核对用的附带输出
+            qgis_xml_producer_module.process_and_export_qgis_layers_to_rmp_json(
+                point_layers_to_export,
+                json_template_file,
+                json_output_dir,
+                Path(output_file).stem,
+                xml_output_filepath=output_file if write_xml_audit else None,
+                num_transfer_lines=num_transfer_lines,
+                max_workers=max_workers
+            )
+        else:
+            qgis_xml_producer_module.process_and_export_qgis_layers_to_xml(
+                point_layers_to_export,
+                output_file,
+                num_transfer_lines=num_transfer_lines,
+                max_workers=max_workers
+            )
         logger.info("\n--- 导出脚本运行成功！请检查输出文件 ---")
 
+except qgis_xml_producer_module.NoExportDataError as e:
+    # 图层中没有有效点要素时不写出文件，只提示而不输出错误堆栈
+    logger.warning(f"⚠️ 警告: {e}")
+
 except Exception as e:
     # 捕获在导出过程中可能发生的任何错误。
     logger.error("\n--- 导出脚本运行失败！ ---")
@@ -0,0 +1,71 @@
+"""
+站点序列号 (seq) 的排序键 (qgis_xml_producer_V2a.py 与 Highway_map_JSON_producer_4c.py 共用)。
+
+两个脚本的排序规则与之前各自的实现完全相同：
+- qgis_seq_sort_key: 原 qgis_xml_producer_V2a.py 中的 _try_int，依次尝试整数、"L1_01"、"1_01" 三种格式；
+- line_station_seq_key: 原 Highway_map_JSON_producer_4c.py 中 parse_seq_key 的解析部分，只识别 "L1_01" 格式。
+
+优化点：
+- 正则表达式在模块加载时预编译；
+- 以字母开头的序列号 (最常见的 "L1_01") 一定不是整数，跳过会抛出异常的 int() 尝试；
+- 每个序列号字符串的解析结果带 LRU 缓存，同一序列号在一次运行中只解析一次。
+"""
+from functools import lru_cache
+import re
+
+# 序列号排序键缓存的条目上限
+SEQ_KEY_CACHE_SIZE = 65536
+
+# "前缀数字_数字" 格式 (例如 L1_01)
+_PREFIXED_SEQ_PATTERN = re.compile(r'([A-Za-z]+)(\d+)_(\d+)')
+# "数字_数字" 格式 (例如 1_01)
+_NUMERIC_SEQ_PATTERN = re.compile(r'(\d+)_(\d+)')
+# 线路名称中的第一段数字 (例如 "Line12" 中的 "12")
+_LINE_NUMBER_PATTERN = re.compile(r'\d+')
+
+
+@lru_cache(maxsize=SEQ_KEY_CACHE_SIZE)
+def qgis_seq_sort_key(seq_str):
+    """
+    将序列号字符串转换为排序用的元组：整数返回 (int,)，"L1_01" 返回 (前缀, 线路号, 站号)，
+    "1_01" 返回 (线路号, 站号)，都不匹配时返回 (原字符串,)。始终返回元组，避免排序时出现 TypeError。
+    """
+    # int() 会先去掉首尾空白；首字符是字母时一定无法转换为整数
+    if not seq_str[:1].isalpha():
+        try:
+            return (int(seq_str),)
+        except ValueError:
+            pass
+    match = _PREFIXED_SEQ_PATTERN.match(seq_str)
+    if match:
+        prefix, line_num, station_num = match.groups()
+        return (prefix, int(line_num), int(station_num))
+    match = _NUMERIC_SEQ_PATTERN.match(seq_str)
+    if match:
+        line_num, station_num = match.groups()
+        return (int(line_num), int(station_num))
+    return (seq_str,)
+
+
+@lru_cache(maxsize=SEQ_KEY_CACHE_SIZE)
+def line_station_seq_key(seq_str):
+    """
+    解析 'LX_Y' 格式的站点序列字符串。
+
+    返回:
+        tuple | None: (前缀, 线路号, 站号)；不符合该格式时返回 None，由调用方决定如何记录和排序。
+    """
+    match = _PREFIXED_SEQ_PATTERN.match(seq_str)
+    if match:
+        line_prefix, line_num, station_num = match.groups()
+        return (line_prefix, int(line_num), int(station_num))
+    return None
+
+
+@lru_cache(maxsize=SEQ_KEY_CACHE_SIZE)
+def line_seq_prefix(line_name):
+    """
+    自动生成序列号时使用的线路前缀：线路名称中有数字时为 "L<数字>" (例如 "L1")，否则为线路名称本身。
+    """
+    line_num_match = _LINE_NUMBER_PATTERN.search(line_name)
+    return f"L{line_num_match.group(0)}" if line_num_match else line_name
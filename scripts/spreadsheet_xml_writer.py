@@ -0,0 +1,112 @@
+"""
+SpreadsheetML (Excel XML) 流式写出器。
+
+qgis_xml_producer_V2a.py 原先先构建完整的 ElementTree，再用 tostring 序列化，并对整个字符串执行
+re.sub(r'>\\s*<', '><') 和两次 replace 清理，内存中会同时存在整个文档的多份副本。
+本模块在元素产生时直接写入输出文件，输出与原流程逐字节相同：
+- 属性值和文本的转义规则与 xml.etree.ElementTree 相同；
+- 没有文本和子元素的元素写成 "<Tag ... />"；
+- 仅包含空白字符的文本 (原流程会被正则清理掉) 直接省略，元素写成 "<Tag ...></Tag>"；
+- 元素之间不写换行和缩进。
+
+本模块不依赖 QGIS，可单独使用。
+"""
+
+# XML 声明和 Excel 处理指令，位于文件开头
+SPREADSHEET_XML_PROLOG = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<?mso-application progid="Excel.Sheet"?>\n'
+)
+
+
+def escape_xml_text(text):
+    """
+    转义元素文本 (与 ElementTree 相同：只转义 & < >)。
+    """
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def escape_xml_attrib(value):
+    """
+    转义属性值 (与 ElementTree 相同：& < > " 以及回车、换行、制表符)。
+    """
+    if "&" in value:
+        value = value.replace("&", "&amp;")
+    if "<" in value:
+        value = value.replace("<", "&lt;")
+    if ">" in value:
+        value = value.replace(">", "&gt;")
+    if "\"" in value:
+        value = value.replace("\"", "&quot;")
+    if "\r" in value:
+        value = value.replace("\r", "&#13;")
+    if "\n" in value:
+        value = value.replace("\n", "&#10;")
+    if "\t" in value:
+        value = value.replace("\t", "&#09;")
+    return value
+
+
+def format_start_tag(tag, attrs=None):
+    """
+    生成开始标签 (不含结尾的 ">" 或 " />")，属性按字典插入顺序输出。
+    """
+    if not attrs:
+        return "<" + tag
+    return "<" + tag + "".join(f' {name}="{escape_xml_attrib(value)}"' for name, value in attrs.items())
+
+
+def format_element(tag, attrs=None, text=None):
+    """
+    生成一个不含子元素的完整元素。text 为 None 或空字符串时写成空元素 "<Tag ... />"。
+    """
+    start_tag = format_start_tag(tag, attrs)
+    if not text:
+        return start_tag + " />"
+    if text.isspace():
+        # 原流程中仅含空白的文本会被 re.sub(r'>\s*<', '><') 清除
+        return f"{start_tag}></{tag}>"
+    return f"{start_tag}>{escape_xml_text(text)}</{tag}>"
+
+
+class SpreadsheetXmlWriter:
+    """
+    将 SpreadsheetML 元素按文档顺序直接写入已打开的文本文件。
+    使用 start()/end() 写出包含子元素的元素，使用 element() 写出叶子元素。
+    """
+
+    def __init__(self, output_file):
+        self._write = output_file.write
+        self._open_tags = []
+
+    def write_prolog(self):
+        """写出 XML 声明和 Excel 处理指令。"""
+        self._write(SPREADSHEET_XML_PROLOG)
+
+    def start(self, tag, attrs=None):
+        """写出开始标签，之后写出的元素都作为它的子元素，直到调用 end()。"""
+        self._write(format_start_tag(tag, attrs) + ">")
+        self._open_tags.append(tag)
+
+    def end(self):
+        """写出最近一个未关闭元素的结束标签。"""
+        self._write(f"</{self._open_tags.pop()}>")
+
+    def element(self, tag, attrs=None, text=None):
+        """写出一个不含子元素的元素。"""
+        self._write(format_element(tag, attrs, text))
+
+    def write_raw(self, xml_fragment):
+        """写出已经格式化好的 XML 片段 (调用方负责转义)。"""
+        self._write(xml_fragment)
+
+    def close(self):
+        """关闭所有仍未关闭的元素。"""
+        while self._open_tags:
+            self.end()
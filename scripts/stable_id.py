@@ -0,0 +1,124 @@
+"""
+基于坐标的稳定短ID生成 (qgis_xml_producer_V2a.py 与 Highway_map_JSON_producer_4c.py 共用)。
+
+ID 的生成规则与之前两个脚本中各自复制的实现完全相同，输出逐字节一致：
+1. 将坐标格式化为 "x,y" (各保留 6 位小数) 的字符串；
+2. 计算该字符串的 SHA256 哈希值，并视为一个 256 位大整数；
+3. 将该整数编码为 Base62 字符串，截取前 target_length (默认为9) 位作为最终ID。
+
+优化点：
+- 只计算前 target_length 位 Base62 字符所需的高位部分 (一次整除)，不再对整个 256 位整数反复取余；
+- 单个坐标的入口带 LRU 缓存，同一坐标在一次运行中重复出现时不再重复计算哈希；
+- 提供批量接口 generate_stable_ids_from_coords，一次处理大量坐标。
+"""
+import hashlib # 用于生成SHA256哈希值
+from bisect import bisect_right
+from functools import lru_cache
+
+# Base62编码的字符集：0-9, A-Z, a-z
+BASE62_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+# 单坐标ID缓存的条目上限
+STABLE_ID_CACHE_SIZE = 65536
+
+# 62 的各次幂 (62**0 到 62**43)。SHA256 的 256 位整数在 Base62 下最多 43 位。
+_BASE62_POWERS = [62 ** i for i in range(44)]
+
+
+def base_encode(number, base_chars):
+    """
+    将一个整数编码为指定字符集的字符串。
+    用于将大整数（如哈希值）转换为更短的字符串形式。
+
+    参数:
+        number (int): 要编码的整数。
+        base_chars (str): 用于编码的字符集字符串（例如 BASE62_CHARS）。
+
+    返回:
+        str: 编码后的字符串。
+    """
+    if number == 0:
+        return base_chars[0]
+    base = len(base_chars)
+    encoded_string = []
+    while number > 0:
+        encoded_string.append(base_chars[number % base])
+        number //= base
+    return "".join(reversed(encoded_string))
+
+
+def base62_prefix(number, target_length):
+    """
+    返回 base_encode(number, BASE62_CHARS)[:target_length]，但只编码需要保留的前 target_length 位。
+
+    参数:
+        number (int): 要编码的非负整数 (不超过 256 位)。
+        target_length (int): 需要保留的前缀长度。
+
+    返回:
+        str: Base62 编码结果的前 target_length 位。
+    """
+    # Base62 表示的总位数：62**(digits-1) <= number < 62**digits
+    digits = bisect_right(_BASE62_POWERS, number)
+    if digits <= target_length:
+        return base_encode(number, BASE62_CHARS)
+
+    # 去掉低位的 (digits - target_length) 位，剩下的恰好是 target_length 位的高位部分
+    prefix_number = number // _BASE62_POWERS[digits - target_length]
+    encoded_chars = [""] * target_length
+    for i in range(target_length - 1, -1, -1):
+        prefix_number, remainder = divmod(prefix_number, 62)
+        encoded_chars[i] = BASE62_CHARS[remainder]
+    return "".join(encoded_chars)
+
+
+def _stable_id_for_coord_string(coord_string, target_length):
+    """
+    根据已格式化的坐标字符串计算稳定ID (不带缓存)。
+    """
+    digest = hashlib.sha256(coord_string.encode('utf-8')).digest()
+    return base62_prefix(int.from_bytes(digest, 'big'), target_length)
+
+
+# 缓存以格式化后的坐标字符串为键：0.0 与 -0.0 相等但格式化结果不同，不能直接以浮点数为键。
+_cached_stable_id_for_coord_string = lru_cache(maxsize=STABLE_ID_CACHE_SIZE)(_stable_id_for_coord_string)
+
+
+def generate_stable_id_from_coords(x, y, target_length=9):
+    """
+    根据给定的 (x, y) 坐标生成一个稳定、确定性且长度为 target_length 的短 ID。
+
+    参数:
+        x (float): 坐标的 X 值。
+        y (float): 坐标的 Y 值。
+        target_length (int): 目标 ID 的长度 (默认为 9)。
+
+    返回:
+        str: 基于坐标生成的稳定且指定长度的短 ID 字符串。
+    """
+    # 确保坐标精度一致，防止浮点数精度问题导致哈希不一致。
+    return _cached_stable_id_for_coord_string(f"{x:.6f},{y:.6f}", target_length)
+
+
+def generate_stable_ids_from_coords(xs, ys, target_length=9):
+    """
+    批量生成稳定ID。重复坐标只计算一次，且不占用单坐标入口的 LRU 缓存。
+
+    参数:
+        xs (iterable): 各坐标的 X 值。
+        ys (iterable): 各坐标的 Y 值，与 xs 一一对应。
+        target_length (int): 目标 ID 的长度 (默认为 9)。
+
+    返回:
+        list: 与输入坐标一一对应的 ID 列表。
+    """
+    ids_by_coord_string = {}
+    stable_ids = []
+    for x, y in zip(xs, ys):
+        coord_string = f"{x:.6f},{y:.6f}"
+        stable_id = ids_by_coord_string.get(coord_string)
+        if stable_id is None:
+            stable_id = _stable_id_for_coord_string(coord_string, target_length)
+            ids_by_coord_string[coord_string] = stable_id
+        stable_ids.append(stable_id)
+    return stable_ids
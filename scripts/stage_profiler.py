@@ -0,0 +1,161 @@
+"""
+按阶段记录耗时、内存峰值和数据量的性能分析器 (Highway_map_JSON_producer_4c.py 与 qgis_xml_producer_V2a.py 共用)。
+
+处理函数在每个阶段外包一层 `with profiler.stage("阶段名") as stage:`，并用 stage.set_count() 记录该阶段处理的数据量。
+未启用分析时使用 NULL_PROFILER：stage() 返回同一个什么也不做的对象，不计时、不启动 tracemalloc，
+每个阶段的额外开销只有一次方法调用，各阶段都是整批处理的，因此不影响转换速度。
+本模块不依赖 QGIS。
+"""
+from contextlib import contextmanager
+import json
+import time
+import tracemalloc
+
+# 分析报告文件的后缀，报告保存在输出文件旁边 (例如 map.json.profile.json)
+PROFILE_REPORT_SUFFIX = ".profile.json"
+
+
+def profile_report_path(output_file_path):
+    """输出文件对应的分析报告路径。"""
+    return output_file_path + PROFILE_REPORT_SUFFIX
+
+
+class ProfiledStage:
+    """
+    一个阶段的分析结果。
+
+    属性:
+        name (str): 阶段名称。
+        depth (int): 嵌套深度，顶层阶段为 0。
+        seconds (float): 耗时 (墙上时间)，包含内层阶段。
+        peak_memory_bytes (int | None): 阶段内新分配且尚未释放的内存的峰值 (tracemalloc 记录的内存峰值减去阶段开始时的值)，
+                                        未记录内存时为 None。
+        counts (dict): 数据量，如 {'stations': 1200, 'lines': 8}。
+    """
+    __slots__ = ('name', 'depth', 'seconds', 'peak_memory_bytes', 'counts', '_start_traced_bytes', '_peak_traced_bytes')
+
+    def __init__(self, name, depth, trace_memory):
+        self.name = name
+        self.depth = depth
+        self.seconds = 0.0
+        self.peak_memory_bytes = 0 if trace_memory else None
+        self.counts = {}
+        self._start_traced_bytes = 0
+        self._peak_traced_bytes = 0
+
+    def set_count(self, count_name, value):
+        """记录该阶段处理的数据量。"""
+        self.counts[count_name] = value
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "seconds": self.seconds,
+            "peak_memory_mb": None if self.peak_memory_bytes is None else round(self.peak_memory_bytes / 1e6, 3),
+            "counts": self.counts
+        }
+
+
+class StageProfiler:
+    """
+    记录各阶段的耗时、内存峰值和数据量。阶段可以嵌套，外层阶段的耗时和内存峰值包含内层阶段。
+
+    参数:
+        trace_memory (bool): 是否用 tracemalloc 记录内存峰值。tracemalloc 会明显拖慢 Python 代码，
+                             只关心耗时时应设为 False。若 tracemalloc 尚未启动，则在每个顶层阶段开始时启动、
+                             结束时停止，阶段之间的代码不受影响。
+    """
+    enabled = True
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = [] # 按开始顺序排列的 ProfiledStage
+        self._active_stages = []
+        self._started_tracemalloc = False
+
+    def _sample_memory_peak(self):
+        # 读取自上次采样以来的内存峰值并计入所有正在进行的阶段，然后重置峰值；返回当前的内存占用
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for active_stage in self._active_stages:
+            active_stage._peak_traced_bytes = max(active_stage._peak_traced_bytes, peak)
+        return current
+
+    @contextmanager
+    def stage(self, name):
+        """
+        记录一个阶段：with profiler.stage("parse") as stage: ...
+
+        产出:
+            ProfiledStage: 可在阶段内调用 set_count() 记录数据量。
+        """
+        if self.trace_memory and not self._active_stages and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+        profiled_stage = ProfiledStage(name, len(self._active_stages), self.trace_memory)
+        if self.trace_memory:
+            profiled_stage._start_traced_bytes = profiled_stage._peak_traced_bytes = self._sample_memory_peak()
+        self.stages.append(profiled_stage)
+        self._active_stages.append(profiled_stage)
+        start = time.perf_counter()
+        try:
+            yield profiled_stage
+        finally:
+            profiled_stage.seconds = time.perf_counter() - start
+            if self.trace_memory:
+                self._sample_memory_peak()
+                profiled_stage.peak_memory_bytes = profiled_stage._peak_traced_bytes - profiled_stage._start_traced_bytes
+            self._active_stages.pop()
+            if self._started_tracemalloc and not self._active_stages:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def report(self):
+        """
+        返回结构化的分析报告。
+
+        返回:
+            dict: {'total_seconds': 顶层阶段耗时之和, 'peak_memory_mb': 各阶段内存峰值的最大值 (未记录内存时为 None),
+                   'stages': [各阶段的 ProfiledStage.to_dict()，按开始顺序排列]}
+        """
+        top_level_stages = [profiled_stage for profiled_stage in self.stages if profiled_stage.depth == 0]
+        return {
+            "total_seconds": sum(profiled_stage.seconds for profiled_stage in top_level_stages),
+            "peak_memory_mb": round(max((profiled_stage.peak_memory_bytes for profiled_stage in top_level_stages), default=0) / 1e6, 3)
+                              if self.trace_memory else None,
+            "stages": [profiled_stage.to_dict() for profiled_stage in self.stages]
+        }
+
+    def write_report(self, report_file_path):
+        """将分析报告写入 JSON 文件。"""
+        with open(report_file_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=4, ensure_ascii=False)
+
+
+class _NullStage:
+    """未启用分析时 stage() 返回的对象：既是上下文管理器，也接受 set_count() 调用，什么也不做。"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set_count(self, count_name, value):
+        pass
+
+
+class _NullProfiler:
+    """未启用分析时使用的分析器。"""
+    enabled = False
+    _null_stage = _NullStage()
+
+    def stage(self, name):
+        return self._null_stage
+
+
+# 未传入分析器时使用的共享实例
+NULL_PROFILER = _NullProfiler()
@@ -0,0 +1,196 @@
+"""
+FIRM 站点数据的二进制列式中间格式 (.npz)，可代替 SpreadsheetML 数据表作为 QGIS 导出与 JSON 转换之间的中间文件
+(qgis_xml_producer_V2a.py / vector_file_xml_producer.py 写出，Highway_map_JSON_producer_4c.py 读取)。
+
+SpreadsheetML 数据表便于在 WPS/Excel 中手工修改，但每个单元格都重复 ss:StyleID / ss:Type 等属性，
+文件大、逐个元素解析慢。不需要手工修改时可以改为导出 .npz 文件 (NumPy 的 zip 压缩数组包)：
+- 所有文本放在一个字符串表中 (UTF-8 编码后连续存放，另存各字符串的起止位置)，每个不同的值只存一次；
+- 17 个标准列各存为一个 int32 编码数组，值为字符串表中的序号；线路名称、颜色、类型等大量重复的文本只占 4 字节；
+- 坐标列另存为 float64 数组，读取时不需要再解析文本；
+- 线路标题行存为 (位于第几个站点行之前, 线路名称, 线路颜色) 三个数组。
+读取时一次载入全部数组，不需要逐个元素解析，读回的数据表行与读取同一批点数据导出的 XML 完全相同 (见 firm_workbook.iter_point_rows)，
+因此两种中间格式转换得到的 JSON 逐字节相同。
+数组以 zip 压缩保存以减小文件，因此不能内存映射；全国规模的数据压缩后也只有几 MB，一次读入比流式解析XML快得多。
+本模块不依赖 QGIS；NumPy 只在写出或读取二进制中间文件时导入，只导出 XML 时不需要 NumPy。
+"""
+import os
+import zipfile
+
+from firm_workbook import XML_HEADER_DEFINITIONS, iter_point_rows
+from station_record import StationRecord
+
+# 二进制中间文件的扩展名
+STATION_NPZ_EXTENSION = ".npz"
+# 文件格式版本号。修改数组布局时必须递增，读取时拒绝其他版本的文件。
+STATION_NPZ_FORMAT_VERSION = 1
+
+# 列编码数组中的特殊值：该单元格不存在 (为空的非核心列)；该坐标单元格为数字，值在坐标数组中
+ABSENT_CELL_CODE = -1
+NUMERIC_CELL_CODE = -2
+
+# 保存为数字的坐标列及其坐标数组的名称
+_NUMERIC_VALUE_ARRAYS = {'x': 'x_values', 'y': 'y_values'}
+
+
+def is_station_npz_path(file_path):
+    """文件路径是否为二进制中间文件 (按扩展名判断)。"""
+    return file_path.lower().endswith(STATION_NPZ_EXTENSION)
+
+
+def _column_array_name(header_name):
+    return f"column_{header_name}"
+
+
+def write_station_npz(points, output_filepath):
+    """
+    将点数据写出为二进制中间文件。
+
+    参数:
+        points (list): 点数据 (StationRecord 或 dict)，应已按 firm_workbook.export_sort_key 排序。
+        output_filepath (str): 输出 .npz 文件路径。先写入临时文件，完成后再替换目标文件。
+    """
+    import numpy as np
+
+    string_codes = {} # {文本: 字符串表中的序号}
+    # 每列一项：(列名, 编码列表, 坐标列表或 None)
+    column_specs = [
+        (header_name, [], [] if header_name in _NUMERIC_VALUE_ARRAYS else None)
+        for header_name, _ in XML_HEADER_DEFINITIONS
+    ]
+    line_title_rows = [] # 线路标题行位于第几个站点行之前
+    line_title_names = []
+    line_title_colors = []
+    station_count = 0
+
+    # 按读回数据表的结果保存，读取时不需要再做写出XML时的空列省略、去空白等处理
+    for row_kind, *row_payload in iter_point_rows(points):
+        if row_kind == 'line':
+            line_name, line_color = row_payload
+            line_title_rows.append(station_count)
+            line_title_names.append(string_codes.setdefault(line_name, len(string_codes)))
+            line_title_colors.append(string_codes.setdefault(line_color, len(string_codes)))
+        elif row_kind == 'station':
+            station_info = row_payload[0]
+            for header_name, codes, numeric_values in column_specs:
+                # iter_point_rows 产出的记录只有标准列，直接读取槽位
+                value = getattr(station_info, header_name, None)
+                if numeric_values is not None:
+                    if type(value) is float:
+                        codes.append(NUMERIC_CELL_CODE)
+                        numeric_values.append(value)
+                        continue
+                    numeric_values.append(np.nan)
+                codes.append(ABSENT_CELL_CODE if value is None else string_codes.setdefault(value, len(string_codes)))
+            station_count += 1
+
+    string_table = list(string_codes) # 字典按插入顺序排列，即按序号排列
+    string_offsets = np.zeros(len(string_table) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in string_table], out=string_offsets[1:])
+
+    arrays = {
+        'format_version': np.array(STATION_NPZ_FORMAT_VERSION, dtype=np.int32),
+        # 字符串表：全部文本拼接后的 UTF-8 字节，以及各文本在拼接后文本中的起止字符位置
+        'string_table_utf8': np.frombuffer("".join(string_table).encode("utf-8"), dtype=np.uint8),
+        'string_offsets': string_offsets,
+        'line_title_rows': np.array(line_title_rows, dtype=np.int64),
+        'line_title_names': np.array(line_title_names, dtype=np.int32),
+        'line_title_colors': np.array(line_title_colors, dtype=np.int32)
+    }
+    for header_name, codes, numeric_values in column_specs:
+        arrays[_column_array_name(header_name)] = np.array(codes, dtype=np.int32)
+        if numeric_values is not None:
+            arrays[_NUMERIC_VALUE_ARRAYS[header_name]] = np.array(numeric_values, dtype=np.float64)
+
+    # 传入文件对象，避免 numpy 给临时文件名追加 .npz
+    temp_output_filepath = output_filepath + ".tmp"
+    with open(temp_output_filepath, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(temp_output_filepath, output_filepath)
+
+
+def _load_station_arrays(npz_source):
+    """
+    读取二进制中间文件中的全部数组，并将字符串表解码为文本列表。
+
+    异常:
+        ValueError: 文件不是二进制中间文件、缺少数组或格式版本不受支持。
+    """
+    import numpy as np
+
+    source_label = npz_source if isinstance(npz_source, str) else getattr(npz_source, 'name', '<npz>')
+    try:
+        loaded = np.load(npz_source, allow_pickle=False)
+        if not isinstance(loaded, np.lib.npyio.NpzFile):
+            raise ValueError("文件中只有单个数组，不是 .npz 数组包")
+        with loaded as npz_file:
+            arrays = {array_name: npz_file[array_name] for array_name in npz_file.files}
+    except (OSError, ValueError, zipfile.BadZipFile) as e:
+        raise ValueError(f"无法读取二进制中间文件 '{source_label}': {e}") from e
+
+    format_version = arrays.get('format_version')
+    if format_version is None:
+        raise ValueError(f"'{source_label}' 不是 FIRM 站点二进制中间文件。")
+    if int(format_version) != STATION_NPZ_FORMAT_VERSION:
+        raise ValueError(f"二进制中间文件 '{source_label}' 的格式版本 {int(format_version)} 不受支持 (支持的版本: {STATION_NPZ_FORMAT_VERSION})。")
+
+    required_array_names = ['string_table_utf8', 'string_offsets', 'line_title_rows', 'line_title_names', 'line_title_colors']
+    required_array_names += [_column_array_name(header_name) for header_name, _ in XML_HEADER_DEFINITIONS]
+    required_array_names += list(_NUMERIC_VALUE_ARRAYS.values())
+    missing_array_names = [array_name for array_name in required_array_names if array_name not in arrays]
+    if missing_array_names:
+        raise ValueError(f"二进制中间文件 '{source_label}' 缺少数组: {', '.join(missing_array_names)}")
+
+    # 整个字符串表只解码一次，再按字符位置切分
+    string_table_text = arrays['string_table_utf8'].tobytes().decode("utf-8")
+    string_offsets = arrays['string_offsets'].tolist()
+    arrays['string_table'] = [string_table_text[start:end] for start, end in zip(string_offsets, string_offsets[1:])]
+    return arrays
+
+
+def iter_station_npz_rows(npz_source):
+    """
+    读取二进制中间文件，产出与读取 SpreadsheetML 数据表相同的数据表行。
+
+    参数:
+        npz_source (str | file object): .npz 文件路径或已打开的二进制文件对象。
+
+    产出:
+        tuple: 与 Highway_map_JSON_producer_4c.iter_spreadsheet_rows 相同的
+               ('header', header_names)、('line', line_name, line_color)、('station', station_info)。
+
+    异常:
+        ValueError: 文件不是二进制中间文件或格式版本不受支持。
+    """
+    arrays = _load_station_arrays(npz_source)
+    string_table = arrays['string_table']
+
+    yield ('header', {column_index: header_name for header_name, column_index in XML_HEADER_DEFINITIONS})
+
+    # 每列一项：(列名, 编码列表, 坐标列表或 None)；转换为列表后逐行读取比逐个索引 NumPy 数组快得多
+    column_specs = [
+        (header_name, arrays[_column_array_name(header_name)].tolist(),
+         arrays[_NUMERIC_VALUE_ARRAYS[header_name]].tolist() if header_name in _NUMERIC_VALUE_ARRAYS else None)
+        for header_name, _ in XML_HEADER_DEFINITIONS
+    ]
+    station_count = len(column_specs[0][1])
+    line_titles = list(zip(arrays['line_title_rows'].tolist(), arrays['line_title_names'].tolist(),
+                           arrays['line_title_colors'].tolist()))
+    line_title_index = 0
+
+    for row_index in range(station_count + 1):
+        # 先产出位于当前站点行之前的线路标题行
+        while line_title_index < len(line_titles) and line_titles[line_title_index][0] <= row_index:
+            _, line_name_code, line_color_code = line_titles[line_title_index]
+            yield ('line', string_table[line_name_code], string_table[line_color_code])
+            line_title_index += 1
+        if row_index == station_count:
+            break
+
+        station_info = StationRecord()
+        for header_name, codes, numeric_values in column_specs:
+            code = codes[row_index]
+            if code >= 0:
+                setattr(station_info, header_name, string_table[code])
+            elif code == NUMERIC_CELL_CODE:
+                setattr(station_info, header_name, numeric_values[row_index])
+        yield ('station', station_info)
@@ -0,0 +1,98 @@
+"""
+站点数据记录 (qgis_xml_producer_V2a.py 与 Highway_map_JSON_producer_4c.py 共用)。
+
+两个脚本原先都用 {列名: 值} 字典保存每个站点 (约 20 个键)，全国规模的数据中这些字典占了内存的大部分。
+StationRecord 使用 __slots__ 保存 XML 的 17 个标准列，每条记录不再附带一个字典：
+- 未赋值的槽位表示该列不存在，get() 返回默认值，与原先字典中没有该键时的行为相同；
+- x / y 保存为浮点数；线路名称、颜色、方向、类型等大量重复的文本可以通过 intern_shared_text() 驻留为同一个对象；
+- 不属于标准列的其他字段 (例如 QGIS 图层中的自定义字段) 保存在 extra_fields 附加字典中，只有存在时才创建。
+
+StationRecord 提供 get / [] / in / items / update 等与字典相同的访问方式，原先按字典读取站点数据的代码无需改动。
+"""
+import sys
+
+# 标准列名，顺序与 XML 表头相同
+STATION_FIELDS = (
+    'name', 'color', 'direction', 'seq', 'type', 'name_zh', 'name_en', 'x', 'y', 'id',
+    'transfer_line_1', 'transfer_line_2', 'transfer_line_3', 'transfer_line_4', 'transfer_line_5', 'transfer_line_6',
+    'Firm_Highway_Number'
+)
+_STATION_FIELD_SET = frozenset(STATION_FIELDS)
+
+# 在大量站点之间重复出现、适合驻留的文本列
+SHARED_TEXT_FIELDS = ('name', 'color', 'direction', 'type', 'Firm_Highway_Number')
+
+# 表示槽位未赋值 (该列不存在)
+_MISSING = object()
+
+
+class StationRecord:
+    """
+    一个站点 (一行 XML 数据) 的全部字段。标准列保存在槽位中，其他字段保存在 extra_fields 中。
+    """
+    __slots__ = STATION_FIELDS + ('extra_fields',)
+
+    def __init__(self, fields=None):
+        self.extra_fields = None
+        if fields:
+            self.update(fields)
+
+    def get(self, key, default=None):
+        """与 dict.get 相同：该列不存在时返回 default。"""
+        if key in _STATION_FIELD_SET:
+            return getattr(self, key, default)
+        if self.extra_fields is None:
+            return default
+        return self.extra_fields.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in _STATION_FIELD_SET:
+            setattr(self, key, value)
+        elif self.extra_fields is None:
+            self.extra_fields = {key: value}
+        else:
+            self.extra_fields[key] = value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def update(self, fields):
+        """
+        依次写入多个字段。
+
+        参数:
+            fields (dict | iterable): {列名: 值} 字典或 (列名, 值) 序列。
+        """
+        if isinstance(fields, dict):
+            fields = fields.items()
+        for key, value in fields:
+            self[key] = value
+
+    def items(self):
+        """依次产出 (列名, 值)：先是已赋值的标准列 (按表头顺序)，然后是附加字段 (按写入顺序)。"""
+        for key in STATION_FIELDS:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                yield key, value
+        if self.extra_fields is not None:
+            yield from self.extra_fields.items()
+
+    def to_dict(self):
+        """转换为 {列名: 值} 字典，例如用于JSON序列化。"""
+        return dict(self.items())
+
+    def intern_shared_text(self):
+        """驻留线路名称、颜色、方向、类型和高速编号等重复文本，使相同的值在所有记录中共用同一个字符串对象。"""
+        for key in SHARED_TEXT_FIELDS:
+            value = getattr(self, key, None)
+            if type(value) is str:
+                setattr(self, key, sys.intern(value))
+
+    def __repr__(self):
+        return f"StationRecord({self.to_dict()!r})"
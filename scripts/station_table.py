@@ -0,0 +1,130 @@
+"""
+站点数据的列式表 (Highway_map_JSON_producer_4c.py 使用)。
+
+经纬度、SVG 坐标、线路编码和序列号排序编码保存为 NumPy 数组，站点记录 (StationRecord) 按相同顺序保存在列表中。
+按线路分组、线路内按序列号排序以及生成相邻站点之间的 (起点, 终点) 边，都通过 lexsort 和数组切片完成，
+不再对每个站点逐个比较排序键或在 Python 循环中记录每条线路的上一个站点。
+"""
+import numpy as np
+
+
+class StationTable:
+    """
+    列式站点表。第 i 行的数据为 records[i]、lons[i]、lats[i]、line_codes[i] 等。
+
+    属性:
+        records (list): 站点记录 (StationRecord)。
+        lons, lats (np.ndarray): 经纬度 (float64)。
+        line_names (list): 按名称排序的线路名称；line_codes 中的编码即为线路名称在此列表中的索引。
+        line_codes (np.ndarray): 每个站点的线路编码 (int64)，编码顺序与线路名称的排序顺序相同。
+        seq_codes (np.ndarray): 每个站点的序列号排序编码 (int64)，编码顺序与序列号排序键的顺序相同。
+        svg_xs, svg_ys (np.ndarray | None): SVG 坐标，调用 set_svg_coords 之前为 None。
+    """
+
+    def __init__(self, records, lons, lats, line_names, line_codes, seq_codes):
+        self.records = records
+        self.lons = lons
+        self.lats = lats
+        self.line_names = line_names
+        self.line_codes = line_codes
+        self.seq_codes = seq_codes
+        self.svg_xs = None
+        self.svg_ys = None
+
+    @classmethod
+    def from_records(cls, records, seq_sort_key):
+        """
+        由站点记录列表建立列式表 (保持记录原有顺序)。
+
+        参数:
+            records (list): 站点记录，x / y 为浮点数经纬度。
+            seq_sort_key (callable): 将序列号字符串转换为排序键的函数，对每个站点调用一次。
+
+        返回:
+            StationTable: 新建的列式表。
+        """
+        count = len(records)
+        lons = np.fromiter((station_info.x for station_info in records), dtype=np.float64, count=count)
+        lats = np.fromiter((station_info.y for station_info in records), dtype=np.float64, count=count)
+
+        # 线路名称和序列号排序键都先去重排序，再将每个站点的值替换为其名次，使 lexsort 的结果与按原始键排序相同
+        station_line_names = [station_info.get('name', '') for station_info in records]
+        line_names = sorted(set(station_line_names))
+        line_code_of = {line_name: line_code for line_code, line_name in enumerate(line_names)}
+        line_codes = np.fromiter((line_code_of[line_name] for line_name in station_line_names), dtype=np.int64, count=count)
+
+        station_seq_keys = [seq_sort_key(station_info.get('seq', '')) for station_info in records]
+        seq_code_of = {seq_key: seq_code for seq_code, seq_key in enumerate(sorted(set(station_seq_keys)))}
+        seq_codes = np.fromiter((seq_code_of[seq_key] for seq_key in station_seq_keys), dtype=np.int64, count=count)
+
+        return cls(records, lons, lats, line_names, line_codes, seq_codes)
+
+    def __len__(self):
+        return len(self.records)
+
+    def take(self, indexes):
+        """
+        按索引数组重新排列 (或选取) 行，返回新的列式表。
+        """
+        taken = StationTable(
+            [self.records[i] for i in indexes.tolist()],
+            self.lons[indexes], self.lats[indexes],
+            self.line_names, self.line_codes[indexes], self.seq_codes[indexes]
+        )
+        if self.svg_xs is not None:
+            taken.set_svg_coords(self.svg_xs[indexes], self.svg_ys[indexes])
+        return taken
+
+    def sorted_by_line_and_seq(self):
+        """
+        返回按 (线路名称, 序列号排序键) 排序的新列式表。
+        lexsort 是稳定排序，排序键相同的站点保持原有的先后顺序，与 list.sort 的结果相同。
+        """
+        return self.take(np.lexsort((self.seq_codes, self.line_codes)))
+
+    def set_svg_coords(self, svg_xs, svg_ys):
+        """保存每个站点的 SVG 坐标数组。"""
+        self.svg_xs = svg_xs
+        self.svg_ys = svg_ys
+
+    def line_slices(self):
+        """
+        按线路划分已排序的表。
+
+        返回:
+            list: [(线路名称, 起始行, 结束行 (不含)), ...]，按线路名称排序。
+        """
+        if not len(self):
+            return []
+        line_starts = np.flatnonzero(np.diff(self.line_codes)) + 1
+        starts = [0] + line_starts.tolist()
+        stops = line_starts.tolist() + [len(self)]
+        line_codes = self.line_codes[starts].tolist()
+        return [(self.line_names[line_code], start, stop) for line_code, start, stop in zip(line_codes, starts, stops)]
+
+    def edge_pairs(self):
+        """
+        已排序的表中同一线路相邻站点的 (起点行, 终点行) 对。
+
+        返回:
+            tuple: (起点行索引数组, 终点行索引数组)，按线路和序列号的顺序排列。
+        """
+        same_line = self.line_codes[:-1] == self.line_codes[1:]
+        source_rows = np.flatnonzero(same_line)
+        return source_rows, source_rows + 1
+
+    def edge_pairs_by_line(self):
+        """
+        将 edge_pairs 的结果按线路切分。
+
+        返回:
+            dict: {线路名称: (起点行索引数组, 终点行索引数组)}，按线路名称排序；只有一个站点的线路对应空数组。
+        """
+        source_rows, target_rows = self.edge_pairs()
+        line_slices = self.line_slices()
+        # 起点行按升序排列，每条线路的边是 source_rows 中落在该线路行范围内的一段
+        bounds = np.searchsorted(source_rows, [start for _, start, _ in line_slices] + [len(self)]).tolist()
+        return {
+            line_name: (source_rows[bounds[i]:bounds[i + 1]], target_rows[bounds[i]:bounds[i + 1]])
+            for i, (line_name, _, _) in enumerate(line_slices)
+        }
@@ -0,0 +1,533 @@
+"""
+不经过 QGIS，直接读取矢量文件中的点图层并导出为 FIRM SpreadsheetML 数据表。
+
+qgis_xml_producer_V2a.py 只能通过 QGIS 项目读取图层，每次运行都要先启动 QGIS (需要几秒)。
+本脚本直接读取 GeoPackage (.gpkg，用标准库 sqlite3) 和 GeoJSON (.geojson / .json，用 json_backend) 文件，
+字段 (name、seq、type、color、direction、FHM_No、t_line1..N、id、name_zh、name_en) 的含义及处理方式与 QGIS 导出完全相同
+(见 layer_points.py)，同一份数据导出的 XML 与 QGIS 导出的一致，启动只需几十毫秒。
+Shapefile 等其他格式通过 pyogrio 读取 (pip install pyogrio)；图层不是 WGS84 (EPSG:4326) 时用 pyproj 转换坐标 (pip install pyproj)。
+本模块不依赖 QGIS。
+
+用法:
+    python scripts/vector_file_xml_producer.py data/lines.gpkg data/extra_line.geojson -o xml_output/map.xml
+
+所有输入文件中的点/多点图层合并导出到一个 XML 文件；GeoPackage 中每个要素表是一个图层，
+GeoJSON 和 Shapefile 文件本身是一个图层，图层名称为不带扩展名的文件名。
+"""
+import argparse
+import math
+import os
+import struct
+import sqlite3
+import sys
+from urllib.request import pathname2url
+
+from json_backend import get_json_backend
+from layer_points import LayerFieldLayout, NoExportDataError, build_field_to_xml_header_map, build_layer_points, export_points_to_xml
+from stage_profiler import NULL_PROFILER, StageProfiler
+
+# 可直接读取的文件扩展名；其他扩展名的文件交给 pyogrio 读取
+GEOPACKAGE_EXTENSIONS = (".gpkg",)
+GEOJSON_EXTENSIONS = (".geojson", ".json")
+
+# 目标坐标系 WGS84 (经纬度)，以及可视为 WGS84 经纬度、无需转换的坐标系名称
+TARGET_CRS = "EPSG:4326"
+WGS84_CRS_NAMES = frozenset({"EPSG:4326", "OGC:CRS84", "urn:ogc:def:crs:EPSG::4326", "urn:ogc:def:crs:OGC:1.3:CRS84"})
+
+# WKB 几何类型代码 (ISO，不含 Z/M 维度) 对应的名称，与 QgsWkbTypes.displayString() 的名称一致
+WKB_GEOMETRY_TYPE_NAMES = {
+    0: "Unknown", 1: "Point", 2: "LineString", 3: "Polygon", 4: "MultiPoint",
+    5: "MultiLineString", 6: "MultiPolygon", 7: "GeometryCollection"
+}
+# ISO WKB 类型代码的千位表示的维度 (1001 为 PointZ，2001 为 PointM，3001 为 PointZM)
+WKB_DIMENSION_SUFFIXES = {0: "", 1: "Z", 2: "M", 3: "ZM"}
+# 只支持二维的点和多点
+SUPPORTED_GEOMETRY_TYPES = ("Point", "MultiPoint")
+
+# GeoPackage 几何头部中包络框 (envelope) 指示值对应的包络框字节数
+GPKG_ENVELOPE_SIZES = {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}
+
+# 退出码 (与 Highway_map_JSON_producer_4c.py 的批处理模式相同)
+EXIT_OK = 0 # 导出成功
+EXIT_EXPORT_FAILED = 1 # 没有生成 XML 文件
+EXIT_USAGE_ERROR = 2 # 参数错误
+
+
+class VectorFileLayer:
+    """
+    矢量文件中的一个图层。
+
+    属性:
+        file_path (str): 矢量文件路径。
+        name (str): 图层名称。
+        field_names (list): 字段名，按字段顺序排列。
+        geometry_type (str): 图层的几何类型名称 (如 'Point'、'MultiPoint'、'PointZ'、'LineString')。
+        crs (str | None): 图层坐标系 (可由 pyproj.CRS.from_user_input 解析的字符串)，WGS84 或未定义时为 None。
+    """
+    __slots__ = ('file_path', 'name', 'field_names', 'geometry_type', 'crs', '_read_features')
+
+    def __init__(self, file_path, name, field_names, geometry_type, crs, read_features):
+        self.file_path = file_path
+        self.name = name
+        self.field_names = field_names
+        self.geometry_type = geometry_type
+        self.crs = crs
+        self._read_features = read_features
+
+    def read_features(self, requested_indexes):
+        """
+        按要素顺序读取要素。
+
+        参数:
+            requested_indexes (list | None): 需要读取的字段索引，其余字段的值为 None；为 None 时读取全部字段。
+
+        返回:
+            iterable: (要素ID, 按字段顺序排列的属性列表, 几何)；几何为 (几何类型名称, [(x, y), ...])，
+                      不支持的几何类型不解析坐标 (坐标列表为 None)，几何为空时为 None。
+        """
+        return self._read_features(requested_indexes)
+
+
+def _parse_wkb(data, offset=0):
+    """
+    解析一个 WKB 几何 (支持 ISO 和 EWKB 的维度标记)。
+
+    返回:
+        tuple: ((几何类型名称, 坐标列表 或 None) 或 None (空几何), 几何结束的位置)。只解析二维点和多点的坐标。
+    """
+    byte_order = "<" if data[offset] == 1 else ">"
+    (type_code,) = struct.unpack_from(byte_order + "I", data, offset + 1)
+    # EWKB 用高位标记 Z/M 维度，ISO WKB 用千位
+    dimension = (1 if type_code & 0x80000000 else 0) + (2 if type_code & 0x40000000 else 0)
+    type_code &= 0x0FFFFFFF
+    dimension = dimension or type_code // 1000
+    base_type_name = WKB_GEOMETRY_TYPE_NAMES.get(type_code % 1000, "Unknown")
+    geometry_type = base_type_name + WKB_DIMENSION_SUFFIXES.get(dimension, "")
+    offset += 5
+    if geometry_type == "Point":
+        x, y = struct.unpack_from(byte_order + "dd", data, offset)
+        offset += 16
+        # 空的点用 NaN 坐标表示
+        if math.isnan(x) and math.isnan(y):
+            return None, offset
+        return (geometry_type, [(x, y)]), offset
+    if geometry_type == "MultiPoint":
+        (point_count,) = struct.unpack_from(byte_order + "I", data, offset)
+        offset += 4
+        points = []
+        for _ in range(point_count):
+            point_geometry, offset = _parse_wkb(data, offset)
+            if point_geometry is not None and point_geometry[1]:
+                points.extend(point_geometry[1])
+        return ((geometry_type, points) if points else None), offset
+    return (geometry_type, None), len(data)
+
+
+def _parse_gpkg_geometry(blob):
+    """
+    解析 GeoPackage 几何 (GP 头部 + WKB)。
+
+    返回:
+        tuple | None: (几何类型名称, 坐标列表 或 None)，空几何时为 None。
+    """
+    if blob is None:
+        return None
+    blob = bytes(blob)
+    if blob[:2] != b"GP":
+        raise ValueError("不是有效的 GeoPackage 几何数据")
+    flags = blob[3]
+    # 第 4 位为空几何标记，第 1-3 位为包络框类型
+    if flags & 0x10:
+        return None
+    wkb_offset = 8 + GPKG_ENVELOPE_SIZES.get((flags >> 1) & 0x07, 0)
+    geometry, _ = _parse_wkb(blob, wkb_offset)
+    return geometry
+
+
+def _quote_identifier(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _list_geopackage_layers(file_path):
+    """读取 GeoPackage 中的所有要素表。"""
+    connection = sqlite3.connect(f"file:{pathname2url(os.path.abspath(file_path))}?mode=ro", uri=True)
+    try:
+        layers = []
+        table_rows = connection.execute(
+            "SELECT c.table_name, g.column_name, g.geometry_type_name, g.z, g.m, g.srs_id "
+            "FROM gpkg_contents c JOIN gpkg_geometry_columns g ON g.table_name = c.table_name "
+            "WHERE c.data_type = 'features' ORDER BY c.rowid"
+        ).fetchall()
+        geometry_type_names = {name.upper(): name for name in WKB_GEOMETRY_TYPE_NAMES.values()}
+        for table_name, geometry_column, geometry_type_name, has_z, has_m, srs_id in table_rows:
+            # QGIS 与 OGR 一样将整数主键列 (通常为 'fid') 作为第一个字段
+            fid_column = None
+            column_names = []
+            for _, column_name, column_type, _, _, primary_key in connection.execute(f"PRAGMA table_info({_quote_identifier(table_name)})"):
+                if primary_key and column_type.upper() == "INTEGER" and fid_column is None:
+                    fid_column = column_name
+                elif column_name != geometry_column:
+                    column_names.append(column_name)
+            field_names = ([fid_column] if fid_column else []) + column_names
+
+            geometry_type = geometry_type_names.get(geometry_type_name.upper(), "Unknown")
+            geometry_type += WKB_DIMENSION_SUFFIXES[(1 if has_z else 0) + (2 if has_m else 0)]
+
+            crs = None
+            srs_row = connection.execute(
+                "SELECT organization, organization_coordsys_id, definition FROM gpkg_spatial_ref_sys WHERE srs_id = ?", (srs_id,)
+            ).fetchone()
+            # srs_id 为 0 或 -1 表示坐标系未定义，按 WGS84 经纬度处理 (QGIS 对未定义坐标系的图层同样不转换坐标)
+            if srs_row is not None and srs_id > 0:
+                organization, organization_coordsys_id, definition = srs_row
+                authid = f"{organization.upper()}:{organization_coordsys_id}" if organization and organization_coordsys_id else None
+                if authid not in WGS84_CRS_NAMES:
+                    crs = authid or definition
+
+            layers.append(VectorFileLayer(
+                file_path, table_name, field_names, geometry_type, crs,
+                _make_geopackage_reader(file_path, table_name, geometry_column, fid_column, field_names)
+            ))
+        return layers
+    finally:
+        connection.close()
+
+
+def _make_geopackage_reader(file_path, table_name, geometry_column, fid_column, field_names):
+    def read_features(requested_indexes):
+        if requested_indexes is None:
+            requested_indexes = range(len(field_names))
+        selected_columns = [fid_column or "rowid", geometry_column] + [field_names[field_index] for field_index in requested_indexes]
+        query = f"SELECT {', '.join(_quote_identifier(column) for column in selected_columns)} FROM {_quote_identifier(table_name)}"
+        connection = sqlite3.connect(f"file:{pathname2url(os.path.abspath(file_path))}?mode=ro", uri=True)
+        try:
+            for row in connection.execute(query):
+                attrs = [None] * len(field_names)
+                for field_index, value in zip(requested_indexes, row[2:]):
+                    attrs[field_index] = value
+                yield row[0], attrs, _parse_gpkg_geometry(row[1])
+        finally:
+            connection.close()
+    return read_features
+
+
+def _parse_geojson_geometry(geometry):
+    """
+    解析 GeoJSON 几何对象。
+
+    返回:
+        tuple | None: (几何类型名称, 坐标列表 或 None)，几何为 null 或空时为 None。
+    """
+    if not geometry:
+        return None
+    geometry_type = geometry.get("type", "Unknown")
+    coordinates = geometry.get("coordinates")
+    if geometry_type == "Point":
+        if not coordinates:
+            return None
+        if len(coordinates) > 2:
+            return "PointZ", None
+        return geometry_type, [(coordinates[0], coordinates[1])]
+    if geometry_type == "MultiPoint":
+        if not coordinates:
+            return None
+        if any(len(position) > 2 for position in coordinates):
+            return "MultiPointZ", None
+        return geometry_type, [(position[0], position[1]) for position in coordinates]
+    return geometry_type, None
+
+
+def _list_geojson_layers(file_path):
+    """GeoJSON 文件是一个图层：字段为所有要素 properties 中出现过的键 (按首次出现的顺序)。"""
+    with open(file_path, "rb") as f:
+        document = get_json_backend().loads(f.read())
+    if document.get("type") == "Feature":
+        features = [document]
+    elif document.get("type") == "FeatureCollection":
+        features = document.get("features") or []
+    else:
+        raise ValueError("不是 GeoJSON Feature 或 FeatureCollection")
+
+    field_index_by_name = {}
+    geometry_types = set()
+    for feature in features:
+        for field_name in feature.get("properties") or {}:
+            field_index_by_name.setdefault(field_name, len(field_index_by_name))
+        geometry = _parse_geojson_geometry(feature.get("geometry"))
+        if geometry is not None:
+            geometry_types.add(geometry[0])
+    field_names = list(field_index_by_name)
+
+    # 与 OGR 相同：点和多点混合的图层视为多点图层，含有其他几何类型的混合图层的类型未知
+    if not geometry_types or geometry_types == {"Point"}:
+        geometry_type = "Point"
+    elif geometry_types <= set(SUPPORTED_GEOMETRY_TYPES):
+        geometry_type = "MultiPoint"
+    elif len(geometry_types) == 1:
+        geometry_type = geometry_types.pop()
+    else:
+        geometry_type = "Unknown"
+
+    # RFC 7946 规定 GeoJSON 使用 WGS84 经纬度；旧版 GeoJSON 可能用 'crs' 成员声明其他坐标系
+    crs = ((document.get("crs") or {}).get("properties") or {}).get("name")
+    if crs in WGS84_CRS_NAMES:
+        crs = None
+
+    def read_features(requested_indexes):
+        requested_names = field_names if requested_indexes is None else [field_names[field_index] for field_index in requested_indexes]
+        for feature_id, feature in enumerate(features):
+            properties = feature.get("properties") or {}
+            attrs = [None] * len(field_names)
+            for field_name in requested_names:
+                attrs[field_index_by_name[field_name]] = properties.get(field_name)
+            yield feature_id, attrs, _parse_geojson_geometry(feature.get("geometry"))
+
+    layer_name = os.path.splitext(os.path.basename(file_path))[0]
+    return [VectorFileLayer(file_path, layer_name, field_names, geometry_type, crs, read_features)]
+
+
+def _import_pyogrio():
+    try:
+        import pyogrio
+        import pyogrio.raw
+    except ImportError as e:
+        raise RuntimeError("读取 GeoPackage 和 GeoJSON 以外的矢量格式 (如 Shapefile) 需要安装 pyogrio 模块 (pip install pyogrio)。") from e
+    return pyogrio
+
+
+def _list_ogr_layers(file_path):
+    """通过 pyogrio (GDAL/OGR) 读取其他格式 (如 Shapefile) 的图层。"""
+    pyogrio = _import_pyogrio()
+    layers = []
+    for layer_name, _ in pyogrio.list_layers(file_path):
+        layer_info = pyogrio.read_info(file_path, layer=layer_name)
+        field_names = [str(field_name) for field_name in layer_info["fields"]]
+        # pyogrio 的几何类型名称形如 'Point Z'，去掉空格后与 QGIS 的名称一致
+        geometry_type = (layer_info.get("geometry_type") or "Unknown").replace(" ", "")
+        crs = layer_info.get("crs")
+        if crs in WGS84_CRS_NAMES:
+            crs = None
+        layers.append(VectorFileLayer(file_path, str(layer_name), field_names, geometry_type, crs,
+                                      _make_ogr_reader(file_path, str(layer_name), field_names)))
+    return layers
+
+
+def _make_ogr_reader(file_path, layer_name, field_names):
+    def read_features(requested_indexes):
+        pyogrio = _import_pyogrio()
+        if requested_indexes is None:
+            requested_indexes = range(len(field_names))
+        requested_names = [field_names[field_index] for field_index in requested_indexes]
+        meta, feature_ids, geometries, field_data = pyogrio.raw.read(file_path, layer=layer_name, columns=requested_names, return_fids=True)
+        field_index_by_name = {field_name: field_index for field_index, field_name in enumerate(field_names)}
+        column_indexes = [field_index_by_name[str(field_name)] for field_name in meta["fields"]]
+        column_values = [column.tolist() for column in field_data]
+        for row_index, feature_id in enumerate(feature_ids.tolist()):
+            attrs = [None] * len(field_names)
+            for field_index, values in zip(column_indexes, column_values):
+                attrs[field_index] = values[row_index]
+            wkb = geometries[row_index]
+            yield feature_id, attrs, (_parse_wkb(wkb)[0] if wkb is not None else None)
+    return read_features
+
+
+def list_vector_layers(file_path):
+    """
+    列出矢量文件中的所有图层。
+
+    参数:
+        file_path (str): GeoPackage、GeoJSON 或 pyogrio 支持的其他矢量文件 (如 Shapefile) 的路径。
+
+    返回:
+        list: VectorFileLayer 列表。
+
+    异常:
+        RuntimeError: 文件不存在、无法解析，或读取该格式所需的模块未安装。
+    """
+    if not os.path.isfile(file_path):
+        raise RuntimeError(f"矢量文件不存在: '{file_path}'")
+    extension = os.path.splitext(file_path)[1].lower()
+    try:
+        if extension in GEOPACKAGE_EXTENSIONS:
+            return _list_geopackage_layers(file_path)
+        if extension in GEOJSON_EXTENSIONS:
+            return _list_geojson_layers(file_path)
+    except (sqlite3.Error, ValueError, AttributeError, struct.error) as e:
+        raise RuntimeError(f"无法读取矢量文件 '{file_path}': {type(e).__name__} - {e}") from e
+    return _list_ogr_layers(file_path)
+
+
+def _make_wgs84_transformer(crs):
+    """
+    创建从图层坐标系到 WGS84 经纬度的坐标转换器 (输入输出均为 经度/x 在前)。
+
+    返回:
+        tuple: (pyproj.Transformer, 图层坐标系的显示名称)
+
+    异常:
+        RuntimeError: 未安装 pyproj。
+    """
+    try:
+        from pyproj import CRS, Transformer
+    except ImportError as e:
+        raise RuntimeError(f"图层坐标系 '{crs}' 不是 WGS84，转换坐标需要安装 pyproj 模块 (pip install pyproj)。") from e
+    source_crs = CRS.from_user_input(crs)
+    authority = source_crs.to_authority()
+    source_crs_label = ":".join(authority) if authority else source_crs.name
+    return Transformer.from_crs(source_crs, TARGET_CRS, always_xy=True), source_crs_label
+
+
+def _iter_layer_features(layer, requested_indexes, transform_warnings):
+    """
+    按 build_layer_points 需要的格式逐个产出要素：(属性列表, WGS84 坐标列表, 几何警告 或 None)。
+    提示信息与 qgis_xml_producer_V2a.py 相同；坐标转换失败的要素与 QGIS 一样按几何为空处理。
+    """
+    features = layer.read_features(requested_indexes)
+    if layer.crs is not None:
+        transformer, source_crs_label = _make_wgs84_transformer(layer.crs)
+        # 整个图层的坐标一次性批量转换，避免逐点调用 pyproj 的开销
+        features = list(features)
+        source_points = [point for _, _, geometry in features if geometry is not None and geometry[1] for point in geometry[1]]
+        if source_points:
+            xs, ys = transformer.transform([x for x, _ in source_points], [y for _, y in source_points], errcheck=False)
+            transformed_points = iter(zip(xs, ys))
+            transformed_features = []
+            for feature_id, attrs, geometry in features:
+                if geometry is not None and geometry[1]:
+                    points = [next(transformed_points) for _ in geometry[1]]
+                    if all(math.isfinite(x) and math.isfinite(y) for x, y in points):
+                        geometry = (geometry[0], points)
+                    else:
+                        transform_warnings.append(f"警告: 要素 {feature_id} 无法从 '{source_crs_label}' 转换到 '{TARGET_CRS}'。")
+                        geometry = None
+                transformed_features.append((feature_id, attrs, geometry))
+            features = transformed_features
+
+    for feature_id, attrs, geometry in features:
+        if geometry is None:
+            yield attrs, None, f"警告: 要素 {feature_id} 几何为空或无效。跳过其点位导出。"
+        elif geometry[0] not in SUPPORTED_GEOMETRY_TYPES:
+            yield attrs, None, f"警告: 要素 {feature_id} 的几何类型 '{geometry[0]}' 不受支持。跳过。"
+        else:
+            yield attrs, geometry[1], None
+
+
+def process_and_export_vector_files_to_xml(file_paths, output_filepath, layer_names=None, num_transfer_lines=6, keep_extra_fields=False,
+                                           profile=False):
+    """
+    直接读取矢量文件中的点图层，转换为 FIRM SpreadsheetML 数据表并导出 (与 process_and_export_qgis_layers_to_xml 的处理相同)。
+
+    参数:
+        file_paths (list): 矢量文件路径列表，所有文件中的图层合并导出到一个 XML 文件。
+        output_filepath (str): 导出 XML 文件的完整路径和文件名。扩展名为 .npz 时写出二进制中间文件 (见 station_npz.py)。
+        layer_names (list | None): 只导出这些名称的图层 (按给出的顺序)，默认按文件顺序导出全部图层。
+        num_transfer_lines (int): 要处理的换乘线字段（t_lineX）的数量。
+        keep_extra_fields (bool): 是否读取并在点数据中保留与 XML 列无关的其他字段 (不会写入 XML)。
+        profile (bool): 是否按阶段 (validate_layers、extract、sort、write_xml 或 write_npz) 记录耗时、内存峰值和数据量，
+                        为 True 时将分析报告保存在 XML 文件旁边 (追加 .profile.json)，并作为返回值返回。
+
+    返回:
+        dict | None: profile 为 True 时返回分析报告 (见 StageProfiler.report)，否则返回 None。
+
+    异常:
+        NoExportDataError: 没有任何可导出的点数据 (此时不写出文件)。
+    """
+    profiler = StageProfiler() if profile else NULL_PROFILER
+    field_to_xml_header_map = build_field_to_xml_header_map(num_transfer_lines)
+    all_processed_points_for_final_export = []
+
+    with profiler.stage("validate_layers") as validate_stage:
+        available_layers = []
+        for file_path in file_paths:
+            try:
+                available_layers.extend(list_vector_layers(file_path))
+            except RuntimeError as e:
+                print(f"错误: {str(e).rstrip('。')}。跳过此文件。")
+
+        if layer_names is None:
+            selected_layers = available_layers
+        else:
+            selected_layers = []
+            for layer_name in layer_names:
+                matching_layers = [layer for layer in available_layers if layer.name == layer_name]
+                if not matching_layers:
+                    print(f"错误: 未找到图层: '{layer_name}'。跳过此图层。")
+                selected_layers.extend(matching_layers)
+
+        layers_to_export = []
+        for layer in selected_layers:
+            # 检查几何类型是否为点 (Point) 或多点 (MultiPoint)。只有这两种类型支持导出为单个点数据。
+            if layer.geometry_type not in SUPPORTED_GEOMETRY_TYPES:
+                print(f"错误: 图层 '{layer.name}' 的几何类型 '{layer.geometry_type}' 不受支持。只支持Point和MultiPoint。跳过此图层。")
+                continue
+            layers_to_export.append(layer)
+        validate_stage.set_count("layers", len(layers_to_export))
+
+    # 各图层逐个读取 (读取和解析都是纯 Python 代码，多线程并不能加快)，提示信息按图层顺序打印
+    with profiler.stage("extract") as extract_stage:
+        for layer in layers_to_export:
+            field_layout = LayerFieldLayout(layer.field_names, field_to_xml_header_map, keep_extra_fields)
+            requested_indexes = None if keep_extra_fields else field_layout.requested_indexes()
+            transform_warnings = []
+            try:
+                layer_points, layer_messages = build_layer_points(
+                    layer.name, _iter_layer_features(layer, requested_indexes, transform_warnings), field_layout, transform_warnings
+                )
+            except (RuntimeError, sqlite3.Error, ValueError, struct.error) as e:
+                print(f"错误: 读取图层 '{layer.name}' ({layer.file_path}) 失败: {str(e).rstrip('。')}。跳过此图层。")
+                continue
+            for message in layer_messages:
+                print(message)
+            all_processed_points_for_final_export.extend(layer_points)
+        extract_stage.set_count("points", len(all_processed_points_for_final_export))
+
+    # --- 最终导出前，对所有点进行统一排序并写出 ---
+    return export_points_to_xml(all_processed_points_for_final_export, output_filepath, profiler)
+
+
+def build_argument_parser():
+    parser = argparse.ArgumentParser(
+        description="不经过 QGIS，直接读取 GeoPackage / GeoJSON / Shapefile 中的点图层并导出为 FIRM SpreadsheetML (Excel XML) 数据表。"
+    )
+    parser.add_argument("inputs", nargs="+", help="矢量文件 (.gpkg、.geojson/.json，或 pyogrio 支持的其他格式如 .shp)")
+    parser.add_argument("-o", "--output", required=True, help="输出 XML 文件路径 (扩展名为 .npz 时写出二进制中间文件)")
+    parser.add_argument("--layers", help="只导出这些图层 (逗号分隔的图层名称)，默认导出输入文件中的全部图层")
+    parser.add_argument("--num-transfer-lines", type=int, default=6, help="要处理的换乘线字段 (t_lineX) 的数量 (默认: 6)")
+    parser.add_argument("--profile", action="store_true", help="在 XML 旁保存阶段性能分析报告 (.profile.json)")
+    return parser
+
+
+def run_cli(args):
+    """
+    导出所有输入文件中的点图层。
+
+    返回:
+        int: 退出码 (EXIT_OK / EXIT_EXPORT_FAILED / EXIT_USAGE_ERROR)。
+    """
+    if args.num_transfer_lines < 0:
+        print("错误: --num-transfer-lines 不能小于 0。", file=sys.stderr)
+        return EXIT_USAGE_ERROR
+
+    layer_names = [layer_name.strip() for layer_name in args.layers.split(",") if layer_name.strip()] if args.layers else None
+    output_directory = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(output_directory, exist_ok=True)
+    try:
+        process_and_export_vector_files_to_xml(
+            args.inputs,
+            args.output,
+            layer_names=layer_names,
+            num_transfer_lines=args.num_transfer_lines,
+            profile=args.profile
+        )
+    except NoExportDataError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return EXIT_EXPORT_FAILED
+    return EXIT_OK
+
+
+def main(argv=None):
+    return run_cli(build_argument_parser().parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())